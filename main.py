@@ -6,24 +6,35 @@ Life is Short - Runway Worker 통합 실행
 2. FastAPI 서버 (알리고 프록시)
 3. Healthchecks.io Ping (Worker 생존 모니터링)
 4. IP Monitor (IP 변경 감지 및 Slack 알림)
+
+PROXY_MODE=process로 실행하면 슈퍼바이저 모드로 동작합니다.
+프록시(uvicorn, PROXY_WORKERS개 워커)와 Runway Worker가 각각 별도 프로세스로 실행되며,
+크래시 시 자동 재시작되고 종료 신호를 받으면 함께 종료됩니다.
+
+WORKER_POOL_SIZE=N(N>1)이면 슈퍼바이저가 Runway Worker 프로세스를 N개 실행합니다 (풀 모드).
+worker_id는 {WORKER_ID}-1 ... {WORKER_ID}-N으로 파생되고, 프록시 하나, 로그 파일 하나,
+/metrics 엔드포인트 하나를 함께 사용합니다.
+
+종료 신호(SIGTERM)는 Worker가 드레인으로 처리합니다: 새 작업을 받지 않고, 생성 전 작업은
+리스를 반환하고, 생성 중 작업은 drain_grace_seconds까지 기다린 뒤 체크포인트로 남깁니다.
 """
 import sys
 import os
-import signal
+import shutil
+import tempfile
 import threading
 import logging
-from pathlib import Path
-
-# Worker 모듈 임포트를 위해 경로 추가
-sys.path.insert(0, str(Path(__file__).parent))
+from typing import Optional
 
-from worker.worker import RunwayWorker
-from worker.healthcheck import start_healthcheck_pinger, stop_healthcheck_pinger
-from worker.ip_monitor import start_ip_monitor, stop_ip_monitor
 from worker.logger import setup_logger
-import uvicorn
+from worker.supervisor import ProcessSupervisor
+from worker.scheduler import shutdown_scheduler
 from dotenv import load_dotenv
 
+# 무거운 의존성(runwayml, fastapi/httpx, uvicorn, requests)은 해당 기능이 시작될 때 임포트합니다.
+# 슈퍼바이저 모드의 자식 프로세스(spawn)는 이 모듈을 다시 임포트하므로,
+# 프록시 프로세스는 Worker 의존성을, Worker 프로세스는 uvicorn/fastapi를 로드하지 않습니다.
+
 # 환경 변수 로드
 load_dotenv()
 
@@ -35,6 +46,7 @@ def start_fastapi_server():
     """
     FastAPI 서버를 별도 스레드에서 실행
     """
+    import uvicorn
     from worker.api_server import app
 
     # 환경변수로 로그 레벨 제어 (기본값: info)
@@ -43,6 +55,145 @@ def start_fastapi_server():
     uvicorn.run(app, host="0.0.0.0", port=8000, log_level=log_level)
 
 
+def run_proxy_process(workers: int):
+    """
+    슈퍼바이저 모드: FastAPI 서버 프로세스 진입점
+
+    여러 워커를 쓰려면 uvicorn에 앱 import 문자열을 넘겨야 합니다.
+    """
+    import uvicorn
+
+    log_level = os.getenv("UVICORN_LOG_LEVEL", "info").lower()
+    logger.info(f"🚀 FastAPI 서버 프로세스 시작 (포트 8000, 워커 {workers}개, 로그 레벨: {log_level})...")
+    uvicorn.run("worker.api_server:app", host="0.0.0.0", port=8000, log_level=log_level, workers=workers)
+
+
+def run_worker_process(config_path: str, worker_index: Optional[int] = None, log_queue=None):
+    """
+    슈퍼바이저 모드: Runway Worker 프로세스 진입점
+
+    SIGTERM은 RunwayWorker가 직접 처리합니다 (드레인). 자식 프로세스는 별도 프로세스 그룹에서
+    실행되므로 Ctrl-C는 슈퍼바이저만 받고, 슈퍼바이저가 SIGTERM 한 번으로 전달합니다.
+
+    Args:
+        config_path: config.yaml 경로
+        worker_index: 풀 모드에서 Worker 번호 (1..N)
+        log_queue: 풀 모드에서 공유 로그 싱크 큐
+    """
+    from worker.worker import RunwayWorker
+
+    worker = RunwayWorker(config_path, worker_index=worker_index, log_queue=log_queue)
+    worker.run()
+
+
+def start_monitors(healthcheck_url, slack_webhook_url):
+    """Healthcheck pinger와 IP 모니터 시작"""
+    # 1. Healthchecks.io Ping 시작 (60초마다)
+    if healthcheck_url:
+        from worker.healthcheck import start_healthcheck_pinger
+        start_healthcheck_pinger(healthcheck_url, interval_seconds=60)
+
+    # 2. IP Monitor 시작 (1시간마다)
+    if slack_webhook_url:
+        from worker.ip_monitor import start_ip_monitor
+        start_ip_monitor(slack_webhook_url, check_interval_seconds=3600)
+
+
+def stop_monitors():
+    """Healthcheck pinger와 IP 모니터 중지 (시작하지 않았다면 모듈을 임포트하지 않음)"""
+    healthcheck = sys.modules.get("worker.healthcheck")
+    if healthcheck is not None:
+        healthcheck.stop_healthcheck_pinger()
+
+    ip_monitor = sys.modules.get("worker.ip_monitor")
+    if ip_monitor is not None:
+        ip_monitor.stop_ip_monitor()
+
+
+def main_supervisor(config_path: str, pool_size: int = 1):
+    """
+    슈퍼바이저 모드 메인 함수
+
+    프록시와 Worker를 별도 프로세스로 실행하므로 Worker 부하가 프록시 지연에 영향을 주지 않고,
+    한쪽이 크래시되어도 다른 쪽은 계속 동작합니다.
+
+    Args:
+        config_path: config.yaml 경로
+        pool_size: 실행할 Runway Worker 프로세스 수
+    """
+    from worker.config import load_config
+
+    proxy_workers = int(os.getenv("PROXY_WORKERS", "1"))
+    shutdown_timeout = float(os.getenv("SUPERVISOR_SHUTDOWN_TIMEOUT", "30"))
+
+    # 설정 오류는 자식 프로세스를 띄우기 전에 여기서 드러나게 함
+    config = load_config(config_path)
+
+    # Worker는 생성 대기(drain_grace_seconds) 후 업로드/보고까지 마칠 시간이 필요
+    worker_shutdown_timeout = config["drain_grace_seconds"] + shutdown_timeout
+
+    supervisor = ProcessSupervisor(
+        restart_backoff_max=float(os.getenv("SUPERVISOR_RESTART_BACKOFF_MAX", "60")),
+        shutdown_timeout=shutdown_timeout,
+        # worker.supervisor 로거에는 핸들러가 없으므로 프로세스 시작/크래시/재시작 로그를 main 로거로 남김
+        log=logger
+    )
+    # 프록시 프로세스는 Worker 메모리를 볼 수 없으므로 Worker 수와 관계없이 스냅샷 디렉토리로
+    # 메트릭/상태를 전달 (/metrics, /worker/status, /health의 degraded 판정)
+    # 자식 프로세스(spawn)는 시작 시점의 환경 변수를 상속
+    from worker.snapshots import SNAPSHOT_DIR_ENV
+    snapshot_path = tempfile.mkdtemp(prefix="runway-worker-snapshots-")
+    os.environ[SNAPSHOT_DIR_ENV] = snapshot_path
+    os.environ["WORKER_POOL_SIZE"] = str(pool_size)
+
+    # 백프레셔 한도는 uvicorn 워커(프로세스)마다 따로 적용되므로, 설정한 값이 프록시 전체의
+    # 한도가 되도록 워커 수로 나눠서 전달 (토큰 캐시는 나눌 수 없어 워커마다 따로 유지됨)
+    if proxy_workers > 1:
+        concurrency = max(1, int(os.getenv("ALIGO_PROXY_CONCURRENCY", "20")) // proxy_workers)
+        queue_size = max(1, int(os.getenv("ALIGO_PROXY_QUEUE_SIZE", "200")) // proxy_workers)
+        rps = float(os.getenv("ALIGO_PROXY_RPS", "0")) / proxy_workers
+        os.environ["ALIGO_PROXY_CONCURRENCY"] = str(concurrency)
+        os.environ["ALIGO_PROXY_QUEUE_SIZE"] = str(queue_size)
+        os.environ["ALIGO_PROXY_RPS"] = str(rps)
+        logger.info(f"프록시 워커별 백프레셔 한도: 동시 {concurrency}개, 초당 {rps:g}건, 대기열 {queue_size}개")
+
+    # 프록시는 Worker 드레인이 끝난 뒤 종료
+    supervisor.add("aligo-proxy", run_proxy_process, (proxy_workers,), stop_last=True)
+
+    if pool_size > 1:
+        from worker.logger import start_log_sink
+
+        # 모든 Worker의 로그를 이 프로세스가 {log_dir}/{worker_id}.log 하나에 기록
+        log_queue = supervisor.create_queue(10000)
+        start_log_sink(
+            log_queue, config["log_dir"], config["worker_id"],
+            log_format=config["log_format"], rotation=config["log_rotation"],
+            retention=config["log_retention"], max_bytes=config["log_max_bytes"]
+        )
+
+        for index in range(1, pool_size + 1):
+            supervisor.add(
+                f"runway-worker-{index}", run_worker_process, (config_path, index, log_queue),
+                forward_sighup=True, shutdown_timeout=worker_shutdown_timeout
+            )
+        logger.info(f"🧭 슈퍼바이저 모드: 프록시 프로세스(워커 {proxy_workers}개) + Worker 풀 {pool_size}개 "
+                    f"({config['worker_id']}-1 ~ {config['worker_id']}-{pool_size})")
+    else:
+        supervisor.add(
+            "runway-worker", run_worker_process, (config_path,),
+            forward_sighup=True, shutdown_timeout=worker_shutdown_timeout
+        )
+        logger.info(f"🧭 슈퍼바이저 모드: 프록시 프로세스(워커 {proxy_workers}개) + Worker 프로세스")
+
+    try:
+        supervisor.run()
+    finally:
+        stop_monitors()
+        shutdown_scheduler()
+        shutil.rmtree(snapshot_path, ignore_errors=True)
+        logger.info("슈퍼바이저 종료됨")
+
+
 def main():
     """메인 함수"""
     logger.info("=" * 60)
@@ -53,18 +204,23 @@ def main():
     healthcheck_url = os.getenv("HEALTHCHECK_PING_URL")
     slack_webhook_url = os.getenv("SLACK_WEBHOOK_URL")
     worker_id = os.getenv("WORKER_ID", "runway-worker-001")
+    proxy_mode = os.getenv("PROXY_MODE", "thread").lower()
+    pool_size = max(1, int(os.getenv("WORKER_POOL_SIZE", "1")))
 
     logger.info(f"Worker ID: {worker_id}")
     logger.info(f"Healthcheck Ping: {'✅ 활성화' if healthcheck_url else '⚠️ 비활성화'}")
     logger.info(f"IP Monitor: {'✅ 활성화' if slack_webhook_url else '⚠️ 비활성화'}")
+    logger.info(f"Proxy Mode: {proxy_mode}")
+    logger.info(f"Worker Pool: {pool_size}")
 
-    # 1. Healthchecks.io Ping 시작 (60초마다)
-    if healthcheck_url:
-        start_healthcheck_pinger(healthcheck_url, interval_seconds=60)
+    start_monitors(healthcheck_url, slack_webhook_url)
 
-    # 2. IP Monitor 시작 (1시간마다)
-    if slack_webhook_url:
-        start_ip_monitor(slack_webhook_url, check_interval_seconds=3600)
+    config_path = sys.argv[1] if len(sys.argv) > 1 else "worker/config.yaml"
+
+    # 풀 모드는 항상 슈퍼바이저로 실행
+    if proxy_mode == "process" or pool_size > 1:
+        main_supervisor(config_path, pool_size)
+        return
 
     # 3. FastAPI 서버 시작 (별도 스레드)
     fastapi_thread = threading.Thread(target=start_fastapi_server, daemon=True)
@@ -72,20 +228,12 @@ def main():
     logger.info("✅ FastAPI 서버 스레드 시작됨")
 
     # 4. Runway Worker 시작 (메인 스레드)
-    config_path = sys.argv[1] if len(sys.argv) > 1 else "worker/config.yaml"
-
+    # SIGINT/SIGTERM은 RunwayWorker.run()이 드레인으로 처리하고, 드레인이 끝나면 run()이 반환됩니다.
+    # (프록시 스레드는 드레인 동안 계속 응답)
     try:
-        worker = RunwayWorker(config_path)
-
-        # Graceful shutdown 핸들러
-        def signal_handler(signum, frame):
-            logger.info("\n⚠️ 종료 신호 수신됨. Worker를 종료합니다...")
-            stop_healthcheck_pinger()
-            stop_ip_monitor()
-            sys.exit(0)
+        from worker.worker import RunwayWorker
 
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        worker = RunwayWorker(config_path)
 
         logger.info("🚀 Runway Worker 메인 루프 시작...")
         worker.run()
@@ -95,8 +243,8 @@ def main():
     except Exception as e:
         logger.error(f"❌ Worker 실행 오류: {e}", exc_info=True)
     finally:
-        stop_healthcheck_pinger()
-        stop_ip_monitor()
+        stop_monitors()
+        shutdown_scheduler()
         logger.info("Worker 종료됨")
 
 
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Local stand-ins for the services the worker talks to
+
+Usage:
+    python scripts/fake_stack.py --tasks 20                 # serve until Ctrl+C
+    python scripts/fake_stack.py --queue-latency 5 --run-latency 30 --rate-429 0.1
+
+Three HTTP servers on 127.0.0.1, each on its own port:
+- Next.js worker API: next-task, presign, heartbeat, report, release
+- Runway API: /v1/uploads, /v1/image_to_video, /v1/tasks/{id} with
+  configurable queue/run latency, account concurrency, 429s and failures
+- Presigned object store: GET/PUT/POST /objects/{key}
+
+Point a worker at it with vercel_api_url = the printed Next API URL and
+runway_base_url = the printed Runway URL (scripts/load_test.py does this).
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+MODELS = ("gen4_turbo", "gen4.5_turbo", "veo3.1", "veo3.1_fast")
+
+
+class Handler(BaseHTTPRequestHandler):
+    """Shared request plumbing; the server's `app` attribute handles routing"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is exercised
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return b"".join(chunks)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def _handle(self):
+        body = self._read_body()
+        status, payload, content_type = self.server.app.handle(self.command, urlparse(self.path).path, body)
+        if isinstance(payload, (dict, list)):
+            payload = json.dumps(payload).encode()
+            content_type = "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type or "application/octet-stream")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_PUT = do_POST = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+def serve(app) -> str:
+    """Start a threaded server for app on a free port; returns its base URL"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.app = app
+    app.server = server
+    threading.Thread(target=server.serve_forever, name=type(app).__name__, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+class ObjectStore:
+    """Presigned-URL object store: inputs are kept, uploaded outputs only counted"""
+
+    def __init__(self, latency: float = 0.0, video_bytes: int = 2 * 1024 * 1024):
+        self.latency = latency
+        self.video = b"\0" * video_bytes
+        self.objects: Dict[str, bytes] = {}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.url = ""
+
+    def put(self, key: str, data: bytes):
+        self.objects[key] = data
+
+    def handle(self, method: str, path: str, body: bytes) -> Tuple[int, Any, Optional[str]]:
+        if self.latency:
+            time.sleep(self.latency)
+        key = path[len("/objects/"):]
+        if method in ("PUT", "POST"):
+            self.bytes_in += len(body)
+            return 200, b"", None
+        data = self.objects.get(key)
+        if data is None and key.startswith("videos/"):
+            data = self.video
+        if data is None:
+            return 404, b"not found", "text/plain"
+        self.bytes_out += len(data)
+        return 200, data, "application/octet-stream"
+
+
+class FakeRunway:
+    """Runway API with a queue, an account concurrency limit, 429s and failures"""
+
+    def __init__(self, store: ObjectStore, queue_latency: float = 2.0, run_latency: float = 10.0,
+                 jitter: float = 0.3, concurrency: int = 5, rate_429: float = 0.0,
+                 failure_rate: float = 0.0):
+        """
+        Args:
+            store: Object store serving the generated videos
+            queue_latency: Mean seconds a task stays PENDING
+            run_latency: Mean seconds a 5-second clip stays RUNNING (scaled by the requested duration)
+            jitter: Relative standard deviation of both latencies
+            concurrency: Tasks RUNNING at once; the rest wait as THROTTLED
+            rate_429: Fraction of create calls answered with 429
+            failure_rate: Fraction of tasks ending FAILED
+        """
+        self.store = store
+        self.queue_latency = queue_latency
+        self.run_latency = run_latency
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.rate_429 = rate_429
+        self.failure_rate = failure_rate
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.counts = {"created": 0, "429": 0, "succeeded": 0, "failed": 0, "polls": 0}
+        self._lock = threading.Lock()
+        self.url = ""
+
+    def _sample(self, mean: float) -> float:
+        return max(0.0, random.gauss(mean, mean * self.jitter))
+
+    def _advance(self, now: float):
+        """Move tasks along PENDING/THROTTLED -> RUNNING -> SUCCEEDED/FAILED"""
+        running = sum(1 for t in self.tasks.values() if t["status"] == "RUNNING")
+        for task in self.tasks.values():
+            if task["status"] == "RUNNING" and now >= task["finish_at"]:
+                failed = random.random() < self.failure_rate
+                task["status"] = "FAILED" if failed else "SUCCEEDED"
+                self.counts["failed" if failed else "succeeded"] += 1
+                running -= 1
+        for task in self.tasks.values():
+            if task["status"] in ("PENDING", "THROTTLED") and now >= task["ready_at"]:
+                if running < self.concurrency:
+                    task["status"] = "RUNNING"
+                    task["finish_at"] = now + self._sample(self.run_latency) * task["run_scale"]
+                    running += 1
+                else:
+                    task["status"] = "THROTTLED"
+
+    def handle(self, method: str, path: str, body: bytes) -> Tuple[int, Any, Optional[str]]:
+        now = time.time()
+        if method == "POST" and path == "/v1/uploads":
+            upload_id = uuid.uuid4().hex
+            return 200, {
+                "uploadUrl": f"{self.store.url}/objects/runway-uploads/{upload_id}",
+                "fields": {"key": upload_id},
+                "runwayUri": f"runway://{upload_id}",
+            }, None
+
+        if method == "POST" and path == "/v1/image_to_video":
+            if random.random() < self.rate_429:
+                with self._lock:
+                    self.counts["429"] += 1
+                return 429, {"error": "Too many requests"}, None
+            task_id = str(uuid.uuid4())
+            duration = json.loads(body or b"{}").get("duration") or 5
+            with self._lock:
+                self.counts["created"] += 1
+                self.tasks[task_id] = {
+                    "status": "PENDING",
+                    "created_at": now,
+                    "ready_at": now + self._sample(self.queue_latency),
+                    "finish_at": None,
+                    "run_scale": duration / 5,
+                }
+            return 200, {"id": task_id}, None
+
+        if method == "GET" and path.startswith("/v1/tasks/"):
+            task_id = path[len("/v1/tasks/"):]
+            with self._lock:
+                self.counts["polls"] += 1
+                self._advance(now)
+                task = self.tasks.get(task_id)
+                if task is None:
+                    return 404, {"error": "Task not found"}, None
+                result = {
+                    "id": task_id,
+                    "status": task["status"],
+                    "createdAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(task["created_at"])),
+                }
+            if result["status"] == "SUCCEEDED":
+                result["output"] = [f"{self.store.url}/objects/videos/{task_id}.mp4"]
+            elif result["status"] == "FAILED":
+                result["failure"] = "Simulated failure"
+            return 200, result, None
+
+        return 404, {"error": f"No route for {method} {path}"}, None
+
+
+class FakeNextAPI:
+    """Next.js worker API serving a fixed backlog of items"""
+
+    def __init__(self, store: ObjectStore, tasks: int = 20, groups: int = 5,
+                 models: Tuple[str, ...] = MODELS, photo_bytes: int = 500 * 1024, latency: float = 0.0):
+        """
+        Args:
+            store: Object store holding input photos and receiving outputs
+            tasks: Items in the backlog
+            groups: Items are spread round-robin over this many group_ids
+            models: inference_provider values, assigned round-robin
+            photo_bytes: Size of each input photo
+            latency: Seconds added to every API call
+        """
+        self.store = store
+        self.latency = latency
+        self.queue: List[Dict[str, Any]] = []
+        self.tasks: Dict[str, Dict[str, Any]] = {}
+        self.items: Dict[str, Dict[str, Any]] = {}
+        self.counts = {"next_task": 0, "empty": 0, "heartbeat": 0, "release": 0}
+        self._lock = threading.Lock()
+        self.url = ""
+
+        photo = bytes(random.getrandbits(8) for _ in range(min(photo_bytes, 4096)))
+        photo = (photo * (photo_bytes // len(photo) + 1))[:photo_bytes]
+        for index in range(tasks):
+            item_id = f"item-{index:05d}"
+            storage_path = f"photos/{item_id}.jpg"
+            store.put(storage_path, photo)
+            self.tasks[item_id] = {
+                "item_id": item_id,
+                "group_id": f"group-{index % groups:03d}",
+                "photo_id": f"photo-{index:05d}",
+                "prompt": "A short cinematic camera move",
+                "photo_storage_path": storage_path,
+                "inference_provider": models[index % len(models)],
+                "frame_num": random.choice((48, 120, 240)),
+            }
+        self.queue = list(self.tasks.values())
+        self.total = tasks
+
+    def done(self) -> bool:
+        """True when every item has a final report"""
+        return sum(1 for i in self.items.values() if i.get("status")) >= self.total
+
+    def results(self) -> List[Dict[str, Any]]:
+        return list(self.items.values())
+
+    def handle(self, method: str, path: str, body: bytes) -> Tuple[int, Any, Optional[str]]:
+        if self.latency:
+            time.sleep(self.latency)
+        payload = json.loads(body or b"{}")
+        now = time.time()
+
+        if path.endswith("/worker/next-task"):
+            with self._lock:
+                self.counts["next_task"] += 1
+                if not self.queue:
+                    self.counts["empty"] += 1
+                    return 200, {"success": True, "data": None}, None
+                task = dict(self.queue.pop(0))
+                lease = payload.get("lease_duration_seconds", 600)
+                task["leased_until"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(now + lease))
+                record = self.items.setdefault(task["item_id"], {"item_id": task["item_id"], "leases": 0})
+                record.update(worker_id=payload.get("worker_id"), leased_at=now, model=task["inference_provider"],
+                              group_id=task["group_id"])
+                record["leases"] += 1
+            return 200, {"success": True, "data": task}, None
+
+        if path.endswith("/worker/presign"):
+            if payload.get("operation") == "download":
+                url = f"{self.store.url}/objects/{payload['storage_path']}"
+                return 200, {"data": {"url": url}}, None
+            storage_path = f"videos/{payload['video_item_id']}.{payload.get('file_extension', 'mp4')}"
+            return 200, {"data": {"url": f"{self.store.url}/objects/{storage_path}",
+                                  "storage_path": storage_path}}, None
+
+        if path.endswith("/worker/heartbeat"):
+            with self._lock:
+                self.counts["heartbeat"] += 1
+            return 200, {"success": True}, None
+
+        if path.endswith("/worker/report"):
+            with self._lock:
+                record = self.items.setdefault(payload["item_id"], {"item_id": payload["item_id"], "leases": 0})
+                record.update(status=payload["status"], reported_at=now, error=payload.get("error_message"),
+                              model=payload.get("model"))
+            return 200, {"success": True}, None
+
+        if path.endswith("/worker/release"):
+            with self._lock:
+                self.counts["release"] += 1
+                task = self.tasks.get(payload["item_id"])
+                if task is not None:
+                    self.queue.insert(0, task)
+            return 200, {"success": True}, None
+
+        return 404, {"error": f"No route for {method} {path}"}, None
+
+
+class FakeStack:
+    """Object store + Runway + Next API, started together"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.store = ObjectStore(latency=args.store_latency, video_bytes=args.video_bytes)
+        self.runway = FakeRunway(
+            self.store, queue_latency=args.queue_latency, run_latency=args.run_latency,
+            jitter=args.jitter, concurrency=args.concurrency, rate_429=args.rate_429,
+            failure_rate=args.failure_rate
+        )
+        self.next_api = FakeNextAPI(
+            self.store, tasks=args.tasks, groups=args.groups, models=tuple(args.models.split(",")),
+            photo_bytes=args.photo_bytes, latency=args.api_latency
+        )
+
+    def start(self):
+        self.store.url = serve(self.store)
+        self.runway.url = serve(self.runway)
+        self.next_api.url = serve(self.next_api)
+        return self
+
+    def stop(self):
+        for app in (self.next_api, self.runway, self.store):
+            app.server.shutdown()
+
+
+def add_stack_arguments(parser: argparse.ArgumentParser):
+    """Options shared by this script and load_test.py"""
+    group = parser.add_argument_group("fake stack")
+    group.add_argument("--tasks", type=int, default=20, help="Items in the fake backlog")
+    group.add_argument("--groups", type=int, default=5, help="Distinct group_ids")
+    group.add_argument("--models", default=",".join(MODELS), help="Comma-separated inference_provider values")
+    group.add_argument("--photo-bytes", type=int, default=500 * 1024, help="Input photo size")
+    group.add_argument("--video-bytes", type=int, default=2 * 1024 * 1024, help="Generated video size")
+    group.add_argument("--queue-latency", type=float, default=2.0, help="Mean Runway queue seconds")
+    group.add_argument("--run-latency", type=float, default=10.0, help="Mean Runway run seconds")
+    group.add_argument("--jitter", type=float, default=0.3, help="Relative std-dev of Runway latencies")
+    group.add_argument("--concurrency", type=int, default=5, help="Runway tasks running at once")
+    group.add_argument("--rate-429", type=float, default=0.0, help="Fraction of create calls answered 429")
+    group.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of Runway tasks that fail")
+    group.add_argument("--api-latency", type=float, default=0.0, help="Seconds added to Next API calls")
+    group.add_argument("--store-latency", type=float, default=0.0, help="Seconds added to object store calls")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run fake Next API, Runway API and object store locally")
+    add_stack_arguments(parser)
+    args = parser.parse_args()
+
+    stack = FakeStack(args).start()
+    print(f"Next API:     {stack.next_api.url}")
+    print(f"Runway API:   {stack.runway.url}")
+    print(f"Object store: {stack.store.url}")
+    print("Ctrl+C to stop")
+    try:
+        while True:
+            time.sleep(10)
+            print(f"reported {sum(1 for i in stack.next_api.results() if i.get('status'))}/{args.tasks}, "
+                  f"runway {stack.runway.counts}")
+    except KeyboardInterrupt:
+        stack.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test of the worker against the local fake stack
+
+Usage:
+    python scripts/load_test.py --tasks 50                       # python -m worker.worker
+    python scripts/load_test.py --mode process --tasks 50        # main.py, PROXY_MODE=process
+    python scripts/load_test.py --mode pool --pool-size 4 --tasks 200 --concurrency 4
+    python scripts/load_test.py --rate-429 0.1 --failure-rate 0.05 --run-latency 30
+    python scripts/load_test.py --local-queue 5 --policies fifo,group,sjf,group_fair --tasks 40
+
+Starts scripts/fake_stack.py servers in this process, runs the worker in
+the chosen engine mode as a subprocess until every item is reported (or
+--timeout), then drains it with SIGTERM and prints:
+
+- tasks/hour over the run (first lease to last report)
+- per-step latency p50/p95/p99 from the worker's task history database
+- CPU seconds and peak RSS of the worker process tree (Linux /proc)
+- mean group completion time (run start until a group's last item is
+  reported), the number users feel when they wait for a whole group
+
+With several --policies, each policy gets its own run on a fresh backlog
+and a comparison table is printed at the end. Each run is appended to
+logs/load_test.jsonl so engine modes and changes can be compared offline.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import signal
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+
+from fake_stack import FakeStack, add_stack_arguments
+from trace_report import percentile
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+MODES = ("worker", "thread", "process", "pool")
+
+
+def worker_command(mode: str, config_path: Path):
+    """Command line for one engine mode"""
+    if mode == "worker":
+        return [sys.executable, "-m", "worker.worker", str(config_path)]
+    return [sys.executable, "main.py", str(config_path)]
+
+
+def worker_env(mode: str, pool_size: int):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(PROJECT_ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    # Keep monitors off even if .env enables them (load_dotenv does not override)
+    env["HEALTHCHECK_PING_URL"] = ""
+    env["SLACK_WEBHOOK_URL"] = ""
+    env["PROXY_MODE"] = "process" if mode in ("process", "pool") else "thread"
+    env["WORKER_POOL_SIZE"] = str(pool_size if mode == "pool" else 1)
+    return env
+
+
+def write_config(workdir: Path, stack: FakeStack, args: argparse.Namespace, policy: str) -> Path:
+    # YAML is a superset of JSON, so the worker can load this directly
+    config_path = workdir / "config.yaml"
+    config_path.write_text(json.dumps({
+        "vercel_api_url": stack.next_api.url,
+        "worker_token": "load-test",
+        "runway_api_key": "load-test",
+        "runway_base_url": stack.runway.url,
+        "worker_id": "load-test",
+        "temp_dir": str(workdir / "temp"),
+        "log_dir": str(workdir / "logs"),
+        "history_db": str(workdir / "task_history.db"),
+        "wakeup_port": 0,
+        "api_timeout": 10,
+        "heartbeat_interval": 30,
+        "runway_poll_interval": args.poll_interval,
+        "polling_interval_fast": 1,
+        "polling_interval_slow": 2,
+        "drain_grace_seconds": 30,
+        "local_queue_size": args.local_queue,
+        "local_queue_policy": policy,
+    }), encoding="utf-8")
+    return config_path
+
+
+def process_tree(root_pid: int):
+    """PIDs of root_pid and all its descendants (empty where /proc is unavailable)"""
+    children = defaultdict(list)
+    for stat in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        children[int(fields[1])].append(int(stat.parent.name))
+    pids, stack = [], [root_pid]
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+def sample_usage(root_pid: int):
+    """(CPU seconds, RSS bytes) summed over the process tree"""
+    ticks = os.sysconf("SC_CLK_TCK")
+    page = os.sysconf("SC_PAGE_SIZE")
+    cpu = rss = 0.0
+    for pid in process_tree(root_pid):
+        try:
+            fields = Path(f"/proc/{pid}/stat").read_text().rsplit(")", 1)[1].split()
+        except OSError:
+            continue
+        # utime, stime, cutime, cstime are fields 14-17 (11-14 after the command)
+        cpu += sum(int(v) for v in fields[11:15]) / ticks
+        rss += int(fields[21]) * page
+    return cpu, rss
+
+
+def step_latencies(db_path: Path):
+    """{step: [durations]} and task durations from the history database"""
+    steps = defaultdict(list)
+    tasks = []
+    if not db_path.exists():
+        return steps, tasks
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True, timeout=30)
+    try:
+        for step, duration in conn.execute("SELECT step, duration FROM task_steps"):
+            steps[step].append(duration)
+        tasks = [row[0] for row in conn.execute("SELECT duration FROM tasks WHERE status = 'completed'")]
+    finally:
+        conn.close()
+    return steps, tasks
+
+
+def group_completion(results, started: float):
+    """Seconds from the start of the run until each group's last item was reported"""
+    finished = {}
+    for record in results:
+        if record.get("reported_at") and record.get("group_id"):
+            finished[record["group_id"]] = max(finished.get(record["group_id"], 0.0), record["reported_at"] - started)
+    return finished
+
+
+def run_once(args: argparse.Namespace, policy: str):
+    """One load-test run against a fresh fake stack; returns the result record"""
+    # Same backlog (frame_num, latencies) for every policy in a comparison
+    random.seed(args.seed)
+    stack = FakeStack(args).start()
+    workdir = Path(tempfile.mkdtemp(prefix="runway-load-test-"))
+    config_path = write_config(workdir, stack, args, policy)
+    keep = args.keep
+
+    print(f"Mode {args.mode}" + (f" x{args.pool_size}" if args.mode == "pool" else "")
+          + f", {args.tasks} tasks in {args.groups} groups, local queue {args.local_queue} ({policy}), "
+          f"Runway queue {args.queue_latency}s / run {args.run_latency}s, "
+          f"concurrency {args.concurrency}, 429 {args.rate_429:.0%}, failures {args.failure_rate:.0%}")
+    print(f"Work directory: {workdir}")
+
+    started = time.time()
+    process = subprocess.Popen(
+        worker_command(args.mode, config_path), cwd=PROJECT_ROOT,
+        env=worker_env(args.mode, args.pool_size), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    peak_rss = cpu_seconds = 0.0
+    try:
+        last_print = 0.0
+        while not stack.next_api.done() and time.time() - started < args.timeout:
+            if process.poll() is not None:
+                print(f"❌ Worker exited early (exitcode={process.returncode}), see {workdir / 'logs'}")
+                keep = True
+                break
+            cpu, rss = sample_usage(process.pid)
+            cpu_seconds = max(cpu_seconds, cpu)
+            peak_rss = max(peak_rss, rss)
+            if time.time() - last_print >= 10:
+                reported = sum(1 for i in stack.next_api.results() if i.get("status"))
+                print(f"  {time.time() - started:6.0f}s  reported {reported}/{args.tasks}")
+                last_print = time.time()
+            time.sleep(0.5)
+    finally:
+        if process.poll() is None:
+            cpu, _ = sample_usage(process.pid)
+            cpu_seconds = max(cpu_seconds, cpu)
+            process.send_signal(signal.SIGTERM)
+            try:
+                process.wait(timeout=120)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        stack.stop()
+
+    results = stack.next_api.results()
+    completed = [r for r in results if r.get("status") == "completed"]
+    failed = [r for r in results if r.get("status") == "failed"]
+    leased = [r["leased_at"] for r in results if r.get("leased_at")]
+    reported = [r["reported_at"] for r in results if r.get("reported_at")]
+    span = (max(reported) - min(leased)) if leased and reported else 0.0
+    tasks_per_hour = len(completed) * 3600 / span if span else 0.0
+    steps, task_durations = step_latencies(workdir / "task_history.db")
+    groups = group_completion(results, min(leased) if leased else started)
+    mean_group = statistics.fmean(groups.values()) if groups else 0.0
+    mean_item = statistics.fmean(r - min(leased) for r in reported) if reported else 0.0
+
+    print()
+    print(f"Completed {len(completed)}, failed {len(failed)}, not reported {args.tasks - len(completed) - len(failed)}")
+    print(f"Throughput: {tasks_per_hour:.1f} tasks/hour over {span:.0f}s")
+    print(f"Mean group completion: {mean_group:.0f}s over {len(groups)} groups (mean item completion {mean_item:.0f}s)")
+    print(f"Worker CPU: {cpu_seconds:.1f}s ({cpu_seconds / max(span, 1e-9) * 100:.1f}% of one core), "
+          f"peak RSS {peak_rss / 1024 / 1024:.0f} MiB")
+    print(f"Runway: {stack.runway.counts}")
+    print(f"Next API: {stack.next_api.counts}")
+    print()
+    print(f"{'step':<20} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for step, values in sorted(steps.items()) + [("(task)", task_durations)]:
+        if values:
+            print(f"{step:<20} {len(values):>6} {percentile(values, 50):>8.2f} "
+                  f"{percentile(values, 95):>8.2f} {percentile(values, 99):>8.2f}")
+    print()
+
+    if not keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "mode": args.mode,
+        "pool_size": args.pool_size if args.mode == "pool" else 1,
+        "local_queue": args.local_queue,
+        "policy": policy,
+        "tasks": args.tasks,
+        "groups": args.groups,
+        "completed": len(completed),
+        "failed": len(failed),
+        "tasks_per_hour": round(tasks_per_hour, 1),
+        "mean_group_completion_seconds": round(mean_group, 1),
+        "mean_item_completion_seconds": round(mean_item, 1),
+        "cpu_seconds": round(cpu_seconds, 2),
+        "peak_rss_mb": round(peak_rss / 1024 / 1024, 1),
+        "stack": {k: getattr(args, k) for k in ("queue_latency", "run_latency", "concurrency",
+                                                 "rate_429", "failure_rate", "photo_bytes", "video_bytes")},
+        "steps": {step: {"p50": round(percentile(v, 50), 3), "p95": round(percentile(v, 95), 3)}
+                  for step, v in steps.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the worker against local fakes")
+    parser.add_argument("--mode", choices=MODES, default="worker", help="Engine mode to run")
+    parser.add_argument("--pool-size", type=int, default=2, help="Workers in --mode pool")
+    parser.add_argument("--local-queue", type=int, default=1, help="local_queue_size (leases held per worker)")
+    parser.add_argument("--policies", default="fifo",
+                        help="Comma-separated local_queue_policy values, one run each (fifo,group,sjf,group_fair)")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the fake backlog and latencies")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="runway_poll_interval for the run")
+    parser.add_argument("--timeout", type=float, default=900, help="Give up after this many seconds")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directory (logs, traces, history)")
+    parser.add_argument("--history", default=str(PROJECT_ROOT / "logs" / "load_test.jsonl"),
+                        help="JSONL file results are appended to")
+    add_stack_arguments(parser)
+    args = parser.parse_args()
+
+    runs = []
+    history = Path(args.history)
+    history.parent.mkdir(parents=True, exist_ok=True)
+    for policy in args.policies.split(","):
+        result = run_once(args, policy)
+        runs.append(result)
+        with open(history, "a", encoding="utf-8") as f:
+            f.write(json.dumps(result) + "\n")
+
+    if len(runs) > 1:
+        print(f"{'policy':<12} {'tasks/h':>8} {'group s':>8} {'item s':>8} {'failed':>7}")
+        for result in runs:
+            print(f"{result['policy']:<12} {result['tasks_per_hour']:>8.1f} "
+                  f"{result['mean_group_completion_seconds']:>8.0f} {result['mean_item_completion_seconds']:>8.0f} "
+                  f"{result['failed']:>7}")
+
+    if any(r["completed"] + r["failed"] < args.tasks for r in runs):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Load benchmark of the Aligo proxy against a local fake kakaoapi.aligo.in
+
+Usage:
+    python scripts/proxy_benchmark.py                          # levels 1,10,50,100,250,500
+    python scripts/proxy_benchmark.py --levels 1,20,100 --duration 20 --latency 0.05
+    python scripts/proxy_benchmark.py --error-rate 0.02 --proxy-workers 2
+
+1. Starts a fake Aligo upstream (asyncio, keep-alive, configurable latency
+   and error rate) in a subprocess, so it does not share a CPU with the
+   load generator.
+2. Starts worker.api_server under uvicorn with ALIGO_API_BASE pointing at it.
+3. For each concurrency level, runs a closed loop of N clients for
+   --duration seconds, first directly against the upstream (baseline),
+   then through the proxy. Added latency is proxy minus baseline.
+
+Reported per level: RPS, p50/p99 latency, added p50/p99, upstream
+connections opened per request, non-2xx responses, and proxy RSS.
+Results are appended to logs/proxy_benchmark.jsonl. Exits with 1 if a level
+listed in scripts/proxy_budget.json is over budget.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+from load_test import sample_usage
+from trace_report import percentile
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BUDGET_PATH = Path(__file__).resolve().parent / "proxy_budget.json"
+SEND_PATH = "akv10/alimtalk/send/"
+SEND_BODY = ("apikey=benchmark&userid=benchmark&token=benchmark&senderkey=benchmark&tpl_code=TP_0001"
+             "&sender=0212345678&receiver_1=01012345678&subject_1=test&message_1=" + "x" * 400)
+
+
+# ---------------------------------------------------------------- fake upstream
+
+class FakeAligo:
+    """Minimal HTTP/1.1 keep-alive server answering every POST like Aligo's send API"""
+
+    def __init__(self, latency: float, error_rate: float):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.connections = 0
+        self.requests = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                if headers.get("transfer-encoding", "").lower() == "chunked":
+                    while True:
+                        size = int((await reader.readline()).split(b";")[0], 16)
+                        await reader.readexactly(size + 2)
+                        if size == 0:
+                            break
+                else:
+                    await reader.readexactly(int(headers.get("content-length", 0)))
+
+                if request_line.startswith(b"GET /__stats"):
+                    status, body = 200, json.dumps({"connections": self.connections, "requests": self.requests})
+                else:
+                    self.requests += 1
+                    if self.latency:
+                        await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency)
+                    if random.random() < self.error_rate:
+                        status, body = 500, json.dumps({"code": -99, "message": "Simulated upstream error"})
+                    else:
+                        status, body = 200, json.dumps({"code": 0, "message": "성공적으로 전송요청 하였습니다.",
+                                                        "info": {"type": "AT", "mid": 123456789, "scnt": 1}})
+                payload = body.encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(payload)}\r\n\r\n".encode() + payload
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def serve_upstream(port: int, latency: float, error_rate: float):
+    """Entry point of the upstream subprocess"""
+    async def run():
+        server = await asyncio.start_server(FakeAligo(latency, error_rate).handle, "127.0.0.1", port, backlog=2048)
+        async with server:
+            await server.serve_forever()
+    asyncio.run(run())
+
+
+# ---------------------------------------------------------------- helpers
+
+def free_port() -> int:
+    import socket
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url: str, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def upstream_stats(base_url: str):
+    with urllib.request.urlopen(f"{base_url}/__stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+async def run_level(url: str, concurrency: int, duration: float):
+    """Closed loop of `concurrency` clients posting for `duration` seconds"""
+    import httpx
+
+    latencies, statuses = [], {}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Content-Type": "application/x-www-form-urlencoded"}
+    async with httpx.AsyncClient(limits=limits, timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def client_loop():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(url, content=SEND_BODY, headers=headers)
+                    status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return latencies, statuses, elapsed
+
+
+def summarize(latencies, elapsed):
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True
+        ).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+# ---------------------------------------------------------------- main
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Aligo proxy against a fake upstream")
+    parser.add_argument("--levels", default="1,10,50,100,250,500", help="Comma-separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per level and target")
+    parser.add_argument("--latency", type=float, default=0.03, help="Mean upstream latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of upstream 500s")
+    parser.add_argument("--proxy-workers", type=int, default=1, help="uvicorn workers for the proxy")
+    parser.add_argument("--skip-baseline", action="store_true", help="Do not measure the upstream directly")
+    parser.add_argument("--history", default=str(PROJECT_ROOT / "logs" / "proxy_benchmark.jsonl"),
+                        help="JSONL file results are appended to")
+    parser.add_argument("--serve-upstream", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_upstream:
+        serve_upstream(args.serve_upstream, args.latency, args.error_rate)
+        return
+
+    levels = [int(level) for level in args.levels.split(",")]
+    upstream_port, proxy_port = free_port(), free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}"
+    proxy_url = f"http://127.0.0.1:{proxy_port}"
+
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(PROJECT_ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    env["ALIGO_API_BASE"] = upstream_url
+    env.setdefault("UVICORN_LOG_LEVEL", "warning")
+
+    upstream = subprocess.Popen(
+        [sys.executable, __file__, "--serve-upstream", str(upstream_port),
+         "--latency", str(args.latency), "--error-rate", str(args.error_rate)]
+    )
+    proxy = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "worker.api_server:app", "--host", "127.0.0.1",
+         "--port", str(proxy_port), "--workers", str(args.proxy_workers), "--log-level", "warning",
+         "--no-access-log"],
+        cwd=PROJECT_ROOT, env=env
+    )
+
+    budget = json.loads(BUDGET_PATH.read_text(encoding="utf-8")) if BUDGET_PATH.exists() else {}
+    result = {"timestamp": datetime.now().isoformat(timespec="seconds"), "revision": git_revision(),
+              "upstream_latency_ms": args.latency * 1000, "error_rate": args.error_rate,
+              "proxy_workers": args.proxy_workers, "levels": {}}
+    over_budget = []
+
+    try:
+        wait_for(f"{upstream_url}/__stats")
+        wait_for(f"{proxy_url}/health")
+        print(f"Upstream latency {args.latency * 1000:.0f}ms, errors {args.error_rate:.0%}, "
+              f"proxy workers {args.proxy_workers}, {args.duration:.0f}s per level\n")
+        print(f"{'conc':>5} {'rps':>8} {'p50':>8} {'p99':>8} {'+p50':>8} {'+p99':>8} "
+              f"{'conn/req':>9} {'non-2xx':>8} {'rss MiB':>8}")
+
+        for concurrency in levels:
+            baseline = None
+            if not args.skip_baseline:
+                latencies, _, elapsed = asyncio.run(run_level(f"{upstream_url}/{SEND_PATH}", concurrency, args.duration))
+                baseline = summarize(latencies, elapsed)
+
+            before = upstream_stats(upstream_url)
+            latencies, statuses, elapsed = asyncio.run(
+                run_level(f"{proxy_url}/proxy/aligo/{SEND_PATH}", concurrency, args.duration)
+            )
+            after = upstream_stats(upstream_url)
+            _, rss = sample_usage(proxy.pid)
+
+            level = summarize(latencies, elapsed)
+            upstream_requests = after["requests"] - before["requests"]
+            level["connections_per_request"] = round(
+                (after["connections"] - before["connections"]) / max(upstream_requests, 1), 4
+            )
+            level["non_2xx"] = sum(count for status, count in statuses.items()
+                                   if not (isinstance(status, int) and 200 <= status < 300))
+            level["statuses"] = {str(k): v for k, v in statuses.items()}
+            level["rss_mb"] = round(rss / 1024 / 1024, 1)
+            if baseline is not None:
+                level["baseline"] = baseline
+                level["added_p50_ms"] = round(level["p50_ms"] - baseline["p50_ms"], 2)
+                level["added_p99_ms"] = round(level["p99_ms"] - baseline["p99_ms"], 2)
+            result["levels"][str(concurrency)] = level
+
+            print(f"{concurrency:>5} {level['rps']:>8.1f} {level['p50_ms']:>8.2f} {level['p99_ms']:>8.2f} "
+                  f"{level.get('added_p50_ms', float('nan')):>8.2f} {level.get('added_p99_ms', float('nan')):>8.2f} "
+                  f"{level['connections_per_request']:>9.4f} {level['non_2xx']:>8} {level['rss_mb']:>8.1f}")
+
+            limits = budget.get("levels", {}).get(str(concurrency), {})
+            for key, limit in limits.items():
+                if key in level and level[key] > limit:
+                    over_budget.append(f"{key}={level[key]} at concurrency {concurrency} (budget {limit})")
+    finally:
+        for process in (proxy, upstream):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    history = Path(args.history)
+    history.parent.mkdir(parents=True, exist_ok=True)
+    with open(history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+    if over_budget:
+        print("\n❌ Over budget:\n  " + "\n  ".join(over_budget))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark: import time and time to first lease request
+
+Usage:
+    python scripts/startup_benchmark.py              # measure, compare to budget
+    python scripts/startup_benchmark.py --runs 5 --top 15
+
+1. Import time: runs `python -X importtime -c "import <module>"` in a fresh
+   interpreter for each entry point and sums the self time of every import.
+2. Time to first lease: starts `python -m worker.worker` against a local fake
+   Next.js API and measures how long until POST /worker/next-task arrives.
+
+Each run is appended to logs/startup_benchmark.jsonl so the numbers can be
+tracked over time. Exits with 1 if the median exceeds the budget in
+scripts/startup_budget.json.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+BUDGET_PATH = Path(__file__).resolve().parent / "startup_budget.json"
+ENTRY_POINTS = ("main", "worker.worker", "worker.api_server")
+
+
+def subprocess_env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = str(PROJECT_ROOT) + os.pathsep + env.get("PYTHONPATH", "")
+    env.setdefault("PYTHONDONTWRITEBYTECODE", "1")
+    return env
+
+
+def measure_imports(module: str, workdir: str):
+    """
+    Import one module in a fresh interpreter
+
+    Returns:
+        (total milliseconds, {top-level package: self milliseconds})
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=workdir, env=subprocess_env(), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    total_us = 0
+    by_package = defaultdict(int)
+    for line in result.stderr.splitlines():
+        # "import time:   self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, _, name = line[len("import time:"):].split("|")
+            self_us = int(self_us)
+        except ValueError:
+            continue
+        total_us += self_us
+        by_package[name.strip().split(".")[0]] += self_us
+    return total_us / 1000, {name: us / 1000 for name, us in by_package.items()}
+
+
+class FakeNextAPI(BaseHTTPRequestHandler):
+    """Answers next-task with "no task" and remembers when the first poll arrived"""
+
+    first_poll_at = None
+    first_poll = threading.Event()
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self.path.endswith("/worker/next-task") and not FakeNextAPI.first_poll.is_set():
+            FakeNextAPI.first_poll_at = time.perf_counter()
+            FakeNextAPI.first_poll.set()
+        body = json.dumps({"success": True, "data": None}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure_first_lease(workdir: str, timeout: float = 60.0) -> float:
+    """Milliseconds from process start until the worker's first next-task request"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeNextAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    FakeNextAPI.first_poll_at = None
+    FakeNextAPI.first_poll.clear()
+
+    # YAML is a superset of JSON, so the worker can load this directly
+    config_path = Path(workdir) / "config.yaml"
+    config_path.write_text(json.dumps({
+        "vercel_api_url": f"http://127.0.0.1:{server.server_address[1]}",
+        "worker_token": "benchmark",
+        "runway_api_key": "benchmark",
+        "worker_id": "startup-benchmark",
+        "api_timeout": 10,
+        "temp_dir": str(Path(workdir) / "temp"),
+        "log_dir": str(Path(workdir) / "logs"),
+        "wakeup_port": 0,
+        "polling_interval_slow": 60,
+    }), encoding="utf-8")
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "worker.worker", str(config_path)],
+        cwd=workdir, env=subprocess_env(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        if not FakeNextAPI.first_poll.wait(timeout):
+            process.kill()
+            _, stderr = process.communicate()
+            raise RuntimeError(f"worker did not poll within {timeout}s:\n{stderr.decode(errors='replace')[-2000:]}")
+        return (FakeNextAPI.first_poll_at - started) * 1000
+    finally:
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        server.shutdown()
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, capture_output=True, text=True
+        ).stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import time and time to first lease")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per measurement (median is reported)")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list per entry point")
+    parser.add_argument("--skip-lease", action="store_true", help="Only measure import time")
+    parser.add_argument("--history", default=str(PROJECT_ROOT / "logs" / "startup_benchmark.jsonl"),
+                        help="JSONL file results are appended to")
+    args = parser.parse_args()
+
+    budget = json.loads(BUDGET_PATH.read_text(encoding="utf-8")) if BUDGET_PATH.exists() else {}
+    result = {"timestamp": datetime.now().isoformat(timespec="seconds"), "revision": git_revision(),
+              "python": sys.version.split()[0], "import_ms": {}}
+    over_budget = []
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for module in ENTRY_POINTS:
+            runs = [measure_imports(module, workdir) for _ in range(args.runs)]
+            total = statistics.median(r[0] for r in runs)
+            result["import_ms"][module] = round(total, 1)
+            limit = budget.get("import_ms", {}).get(module)
+            mark = "" if limit is None else (" ✅" if total <= limit else " ❌")
+            print(f"import {module:<20} {total:>8.1f} ms" + (f"  (budget {limit} ms){mark}" if limit else ""))
+            if limit is not None and total > limit:
+                over_budget.append(f"import {module}")
+            for name, ms in sorted(runs[0][1].items(), key=lambda item: item[1], reverse=True)[:args.top]:
+                print(f"    {name:<28} {ms:>8.1f} ms")
+
+        if not args.skip_lease:
+            first_lease = statistics.median(measure_first_lease(workdir) for _ in range(args.runs))
+            result["first_lease_ms"] = round(first_lease, 1)
+            limit = budget.get("first_lease_ms")
+            mark = "" if limit is None else (" ✅" if first_lease <= limit else " ❌")
+            print(f"time to first lease request {first_lease:>8.1f} ms" + (f"  (budget {limit} ms){mark}" if limit else ""))
+            if limit is not None and first_lease > limit:
+                over_budget.append("first lease")
+
+    history = Path(args.history)
+    history.parent.mkdir(parents=True, exist_ok=True)
+    with open(history, "a", encoding="utf-8") as f:
+        f.write(json.dumps(result) + "\n")
+
+    if over_budget:
+        print(f"❌ Over budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Summarize worker trace files (logs/traces/trace_YYYYMMDD.jsonl)
+
+Usage:
+    python scripts/trace_report.py                       # logs/traces, all files
+    python scripts/trace_report.py logs/traces --since 2
+    python scripts/trace_report.py --item <item_id>      # span tree of one task
+
+Prints per-model/per-step latency percentiles, the slowest tasks and the
+time spent repeating calls (an attempt > 1, or the same span name opened
+again inside one task).
+"""
+import argparse
+import json
+import math
+import sys
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of floats"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, math.ceil(pct / 100.0 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def load_spans(path: Path, since_days: int):
+    """Read spans from a trace file or every trace_*.jsonl in a directory"""
+    files = sorted(path.glob("trace_*.jsonl")) if path.is_dir() else [path]
+    if since_days:
+        cutoff = (datetime.now() - timedelta(days=since_days)).strftime("%Y%m%d")
+        files = [f for f in files if f.stem[len("trace_"):len("trace_") + 8] >= cutoff]
+
+    spans = []
+    for file in files:
+        with open(file, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue  # Partially written line
+    return spans
+
+
+def print_step_table(spans):
+    groups = defaultdict(list)
+    for span in spans:
+        if span["name"].startswith(("step.", "runway.", "http.")):
+            groups[(span.get("model") or "-", span["name"])].append(span["duration"])
+
+    print("Per-model / per-step latency (seconds)")
+    print(f"{'model':<14} {'span':<28} {'count':>6} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for (model, name), values in sorted(groups.items()):
+        print(f"{model:<14} {name:<28} {len(values):>6} "
+              f"{percentile(values, 50):>9.2f} {percentile(values, 95):>9.2f} "
+              f"{percentile(values, 99):>9.2f} {max(values):>9.2f}")
+    print()
+
+
+def print_slowest(spans, by_trace, top):
+    roots = sorted((s for s in spans if s["name"] == "task"), key=lambda s: s["duration"], reverse=True)
+    print(f"Slowest tasks (top {top})")
+    for root in roots[:top]:
+        steps = [s for s in by_trace[root["trace_id"]] if s["name"].startswith("step.")]
+        slowest_step = max(steps, key=lambda s: s["duration"], default=None)
+        where = f"{slowest_step['name']} {slowest_step['duration']:.1f}s" if slowest_step else "-"
+        status = root.get("attrs", {}).get("status") or root["status"]
+        print(f"  {root['trace_id']:<38} {root.get('model') or '-':<14} {root['duration']:>8.1f}s  "
+              f"{status:<10} slowest: {where}")
+    print()
+
+
+def print_retries(by_trace):
+    retry_time = defaultdict(float)
+    retry_count = defaultdict(int)
+    for trace_spans in by_trace.values():
+        seen = set()
+        for span in sorted(trace_spans, key=lambda s: s["start"]):
+            if span["name"] == "task":
+                continue
+            attempt = span.get("attrs", {}).get("attempt")
+            repeated = (span["parent_id"], span["name"]) in seen
+            seen.add((span["parent_id"], span["name"]))
+            if (attempt is not None and attempt > 1) or repeated:
+                retry_time[span["name"]] += span["duration"]
+                retry_count[span["name"]] += 1
+
+    print("Time spent in retries")
+    if not retry_time:
+        print("  (no repeated calls recorded)")
+    for name, total in sorted(retry_time.items(), key=lambda item: item[1], reverse=True):
+        print(f"  {name:<28} {retry_count[name]:>6} retries {total:>10.1f}s")
+    print()
+
+
+def print_item(by_trace, item_id):
+    spans = by_trace.get(item_id)
+    if not spans:
+        print(f"No spans for item {item_id}")
+        return
+
+    children = defaultdict(list)
+    for span in spans:
+        children[span["parent_id"]].append(span)
+
+    def walk(parent_id, depth):
+        for span in sorted(children[parent_id], key=lambda s: s["start"]):
+            started = datetime.fromtimestamp(span["start"]).strftime("%H:%M:%S")
+            error = f" [{span['error']}]" if span.get("error") else ""
+            print(f"  {started} {'  ' * depth}{span['name']:<{32 - 2 * depth}} {span['duration']:>9.2f}s{error}")
+            walk(span["span_id"], depth + 1)
+
+    walk(None, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize Runway worker trace files")
+    parser.add_argument("path", nargs="?", default="logs/traces", help="Trace file or directory")
+    parser.add_argument("--since", type=int, default=0, help="Only read files from the last N days")
+    parser.add_argument("--top", type=int, default=10, help="Number of slowest tasks to list")
+    parser.add_argument("--item", help="Print the span tree of one item_id")
+    args = parser.parse_args()
+
+    path = Path(args.path)
+    if not path.exists():
+        print(f"❌ Trace path not found: {path}")
+        sys.exit(1)
+
+    spans = load_spans(path, args.since)
+    if not spans:
+        print("No spans found")
+        return
+
+    by_trace = defaultdict(list)
+    for span in spans:
+        by_trace[span["trace_id"]].append(span)
+
+    if args.item:
+        print_item(by_trace, args.item)
+        return
+
+    print(f"{len(by_trace)} tasks, {len(spans)} spans\n")
+    print_step_table(spans)
+    print_slowest(spans, by_trace, args.top)
+    print_retries(by_trace)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ Next.js API Client for Runway Worker
 import requests
 from typing import Optional, Dict, Any
 
+from .tracing import TRACER
+
 
 class VercelAPIClient:
     """Client for communicating with Next.js backend API"""
@@ -31,10 +33,17 @@ class VercelAPIClient:
             'Content-Type': 'application/json'
         })
 
-    def get_next_task(self, lease_duration_seconds: int = 600) -> Optional[Dict[str, Any]]:
+    def get_next_task(self, lease_duration_seconds: int = 600,
+                      wait_seconds: int = 0) -> Optional[Dict[str, Any]]:
         """
         Request next available task from the queue
 
+        Args:
+            lease_duration_seconds: Lease length for the returned task
+            wait_seconds: Long-poll: ask the API to hold the request open up to
+                this many seconds until a task arrives (0 = return immediately).
+                APIs that ignore the field simply answer right away.
+
         Returns:
             Task dict with keys: item_id, group_id, photo_id, prompt,
                                 photo_storage_path, leased_until, inference_provider, frame_num
@@ -46,9 +55,12 @@ class VercelAPIClient:
             "worker_type": self.worker_type,  # 🆕 Runway worker type
             "lease_duration_seconds": lease_duration_seconds
         }
+        if wait_seconds > 0:
+            payload["wait_seconds"] = wait_seconds
 
         try:
-            response = self.session.post(url, json=payload, timeout=self.timeout)
+            with TRACER.span("http.next_task"):
+                response = self.session.post(url, json=payload, timeout=self.timeout + wait_seconds)
             response.raise_for_status()
 
             result = response.json()
@@ -71,7 +83,8 @@ class VercelAPIClient:
         }
 
         try:
-            response = self.session.post(url, json=payload, timeout=self.timeout)
+            with TRACER.span("http.presign_download"):
+                response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             result = response.json()
             return result['data']
@@ -89,7 +102,8 @@ class VercelAPIClient:
         }
 
         try:
-            response = self.session.post(url, json=payload, timeout=self.timeout)
+            with TRACER.span("http.presign_upload"):
+                response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             result = response.json()
             return result['data']
@@ -99,7 +113,8 @@ class VercelAPIClient:
 
     def report_task_result(self, item_id: str, status: str,
                           video_storage_path: str = None, error_message: str = None,
-                          runway_task_id: str = None) -> bool:
+                          runway_task_id: str = None, model: str = None,
+                          requested_model: str = None) -> bool:
         """
         Report task completion result
 
@@ -109,6 +124,8 @@ class VercelAPIClient:
             video_storage_path: Storage path for output video
             error_message: Error message (for failed status)
             runway_task_id: Runway task ID for tracking
+            model: Model the video was generated with
+            requested_model: Model the task asked for (sent only when a fallback was used)
         """
         url = f"{self.base_url}/worker/report"
         payload = {
@@ -128,8 +145,14 @@ class VercelAPIClient:
                 raise ValueError("error_message required for status=failed")
             payload["error_message"] = error_message
 
+        if model:
+            payload["model"] = model
+            if requested_model and requested_model != model:
+                payload["requested_model"] = requested_model
+
         try:
-            response = self.session.post(url, json=payload, timeout=self.timeout)
+            with TRACER.span("http.report"):
+                response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             return True
 
@@ -146,10 +169,44 @@ class VercelAPIClient:
         }
 
         try:
-            response = self.session.post(url, json=payload, timeout=self.timeout)
+            with TRACER.span("http.heartbeat"):
+                response = self.session.post(url, json=payload, timeout=self.timeout)
             response.raise_for_status()
             return True
 
         except requests.exceptions.RequestException as e:
             # Heartbeat is optional, don't raise exception
             return False
+
+    def release_task(self, item_id: str, reason: str = "drain",
+                     runway_task_id: Optional[str] = None) -> bool:
+        """
+        Hand a leased task back to the queue without marking it failed
+
+        Args:
+            item_id: Item ID
+            reason: Why the lease is released (logged by the API)
+            runway_task_id: Runway task already generating for this item, if any
+
+        Returns:
+            True if the API accepted the release. On False the lease simply
+            expires and the item is picked up again after leased_until.
+        """
+        url = f"{self.base_url}/worker/release"
+        payload = {
+            "item_id": item_id,
+            "worker_id": self.worker_id,
+            "reason": reason
+        }
+        if runway_task_id:
+            payload["runway_task_id"] = runway_task_id
+
+        try:
+            with TRACER.span("http.release"):
+                response = self.session.post(url, json=payload, timeout=self.timeout)
+            response.raise_for_status()
+            return True
+
+        except requests.exceptions.RequestException:
+            # Release is best effort, the lease expires on its own
+            return False
@@ -3,33 +3,411 @@
 
 Vercel에서 알리고 API를 호출할 때 이 서버를 통해 프록시합니다.
 친구 컴퓨터의 고정 IP를 알리고 화이트리스트에 등록하여 사용합니다.
+
+단독 실행 (프로젝트 루트에서 패키지로 실행):
+    python -m worker.api_server
+    uvicorn worker.api_server:app --host 0.0.0.0 --port 8000
 """
+import os
+import re
+import signal
+import time
+import asyncio
+import hashlib
+import json
+import math
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+from urllib.parse import parse_qsl
+
 import httpx
 from fastapi import FastAPI, Request, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 import logging
 
+from .metrics import (
+    REGISTRY, PROXY_UPSTREAM_DURATION, PROXY_QUEUE_WAIT, PROXY_REQUESTS
+)
+from .worker_status import WORKER_STATUS
+from .wakeup import DEFAULT_WAKEUP_HOST, send_wakeup
+from .snapshots import snapshot_dir, read_snapshots, pool_metrics_source
+from .profiling import PROFILER
+
 # 로거 설정
 logger = logging.getLogger(__name__)
 
+# 알리고 API 기본 URL
+ALIGO_API_BASE = os.getenv("ALIGO_API_BASE", "https://kakaoapi.aligo.in")
+
+# 업스트림 커넥션 풀 설정 (환경변수로 조정 가능)
+ALIGO_PROXY_TIMEOUT = float(os.getenv("ALIGO_PROXY_TIMEOUT", "30"))
+ALIGO_PROXY_MAX_CONNECTIONS = int(os.getenv("ALIGO_PROXY_MAX_CONNECTIONS", "100"))
+ALIGO_PROXY_MAX_KEEPALIVE = int(os.getenv("ALIGO_PROXY_MAX_KEEPALIVE", "20"))
+ALIGO_PROXY_KEEPALIVE_EXPIRY = float(os.getenv("ALIGO_PROXY_KEEPALIVE_EXPIRY", "30"))
+
+# 토큰 캐시 설정 (기본 비활성화)
+ALIGO_TOKEN_CACHE_ENABLED = os.getenv("ALIGO_TOKEN_CACHE", "false").lower() in ("1", "true", "yes")
+ALIGO_TOKEN_CACHE_MARGIN = float(os.getenv("ALIGO_TOKEN_CACHE_MARGIN", "5"))
+
+# 업스트림 백프레셔 설정
+# - 동시 요청 수 / 초당 요청 수(0이면 무제한) / 대기열 크기 / 최대 대기 시간(초)
+ALIGO_PROXY_CONCURRENCY = int(os.getenv("ALIGO_PROXY_CONCURRENCY", "20"))
+ALIGO_PROXY_RPS = float(os.getenv("ALIGO_PROXY_RPS", "0"))
+ALIGO_PROXY_QUEUE_SIZE = int(os.getenv("ALIGO_PROXY_QUEUE_SIZE", "200"))
+ALIGO_PROXY_QUEUE_TIMEOUT = float(os.getenv("ALIGO_PROXY_QUEUE_TIMEOUT", "10"))
+
+# Worker 웨이크업 설정 (config.yaml의 wakeup_port와 같아야 함)
+WORKER_WAKE_PORT = int(os.getenv("WORKER_WAKE_PORT", "8001"))
+WORKER_API_KEY = os.getenv("WORKER_API_KEY")
+
+# 풀 모드: Worker i(1..N)는 WORKER_WAKE_PORT + i 포트에서 웨이크업을 받음
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "1"))
+
+# 슈퍼바이저 모드에서 Worker 프로세스들이 메트릭/상태를 기록하는 디렉토리 (main.py가 설정)
+WORKER_SNAPSHOT_DIR = snapshot_dir()
+
+# akv10/token/create/{숫자}/{단위}/ - 단위: y(년) m(월) d(일) h(시) i(분) s(초)
+TOKEN_CREATE_PATTERN = re.compile(r"^akv10/token/create/(\d+)/([ymdhis])/?$")
+TOKEN_UNIT_SECONDS = {
+    "s": 1,
+    "i": 60,
+    "h": 3600,
+    "d": 86400,
+    "m": 30 * 86400,
+    "y": 365 * 86400,
+}
+
+
+@dataclass
+class CachedResponse:
+    """캐시에 보관하는 알리고 응답"""
+    status_code: int
+    content: bytes
+    content_type: str
+
+
+class FetchAbandoned(Exception):
+    """업스트림을 호출하던 요청이 취소되어, 합쳐진 대기자가 직접 다시 호출해야 함"""
+
+
+class AligoTokenCache:
+    """
+    알리고 토큰 생성 응답 캐시 (single-flight)
+
+    같은 경로 + 같은 인증 바디에 대한 요청은 토큰 유효기간 동안 캐시된 응답을 반환하고,
+    동시에 들어온 동일 요청은 업스트림 호출 한 번으로 합칩니다.
+    """
+
+    def __init__(self, safety_margin: float = 5.0):
+        """
+        Args:
+            safety_margin: 토큰 만료 전에 캐시를 비울 여유 시간 (초)
+        """
+        self.safety_margin = safety_margin
+        self._entries: Dict[str, tuple] = {}  # key -> (expires_at, CachedResponse)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def token_lifetime(path: str) -> Optional[int]:
+        """토큰 생성 경로면 유효기간(초), 아니면 None"""
+        match = TOKEN_CREATE_PATTERN.match(path)
+        if not match:
+            return None
+        return int(match.group(1)) * TOKEN_UNIT_SECONDS[match.group(2)]
+
+    @staticmethod
+    def make_key(path: str, body: bytes) -> str:
+        """경로 + 인증 바디로 캐시 키 생성 (필드 순서 무시, 원문은 보관하지 않음)"""
+        fields = sorted(parse_qsl(body.decode("utf-8", errors="replace"), keep_blank_values=True))
+        digest = hashlib.sha256(repr(fields).encode("utf-8")).hexdigest()
+        return f"{path.strip('/')}:{digest}"
+
+    async def get_or_fetch(
+        self,
+        key: str,
+        ttl: float,
+        fetch: Callable[[], Awaitable[CachedResponse]]
+    ) -> tuple:
+        """
+        캐시된 응답을 반환하거나 업스트림을 한 번만 호출
+
+        Returns:
+            (CachedResponse, 캐시 상태 문자열 "HIT" | "MISS" | "COALESCED")
+        """
+        while True:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                return entry[1], "HIT"
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            try:
+                return await asyncio.shield(inflight), "COALESCED"
+            except FetchAbandoned:
+                # 호출하던 요청만 취소됨: 이 요청은 살아 있으므로 다시 시도
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            # future.cancel()은 대기자에게 CancelledError를 전파하므로 재시도 신호로 대신함
+            future.set_exception(FetchAbandoned())
+            future.exception()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 대기자가 없으면 "exception never retrieved" 경고 방지
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if self._is_cacheable(result) and ttl - self.safety_margin > 0:
+                self._purge_expired(now)
+                self._entries[key] = (time.monotonic() + ttl - self.safety_margin, result)
+            return result, "MISS"
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _is_cacheable(result: CachedResponse) -> bool:
+        """알리고가 토큰을 정상 발급한 응답(code == 0)만 캐시"""
+        if result.status_code != 200:
+            return False
+        try:
+            payload = json.loads(result.content)
+        except ValueError:
+            return False
+        return isinstance(payload, dict) and str(payload.get("code")) == "0" and bool(payload.get("token"))
+
+    def _purge_expired(self, now: float):
+        """만료된 캐시 항목 제거"""
+        for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+            del self._entries[key]
+
+
+class ProxyOverloaded(Exception):
+    """대기열이 가득 찼거나 대기 시간을 초과해 요청을 거절할 때 발생"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class UpstreamLimiter:
+    """
+    알리고 업스트림 요청 백프레셔
+
+    동시 요청 수(세마포어)와 초당 요청 수(토큰 버킷)를 제한하고,
+    대기열이 가득 차면 즉시 ProxyOverloaded를 발생시켜 429로 응답하게 합니다.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 20,
+        rate_per_second: float = 0.0,
+        max_queue: int = 200,
+        queue_timeout: float = 10.0
+    ):
+        """
+        Args:
+            max_concurrency: 동시에 업스트림으로 보낼 최대 요청 수
+            rate_per_second: 초당 최대 요청 수 (0이면 무제한)
+            max_queue: 대기 가능한 최대 요청 수 (초과 시 즉시 거절)
+            queue_timeout: 대기열에서 기다릴 최대 시간 (초)
+        """
+        self.max_concurrency = max_concurrency
+        self.rate_per_second = rate_per_second
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tokens = max(1.0, rate_per_second)
+        self._last_refill = time.monotonic()
+        self._rate_lock = asyncio.Lock()
+
+        self.queued = 0
+        self.in_flight = 0
+        self.admitted_total = 0
+        self.shed_total = 0
+        self._recent_waits = deque(maxlen=1000)
+
+    async def acquire(self) -> float:
+        """
+        업스트림 요청 슬롯 획득
+
+        Returns:
+            대기한 시간 (초)
+
+        Raises:
+            ProxyOverloaded: 대기열이 가득 찼거나 queue_timeout을 초과한 경우
+        """
+        started = time.monotonic()
+
+        if not self._semaphore.locked():
+            # 빈 슬롯이 있으면 대기열을 거치지 않음
+            await self._semaphore.acquire()
+        else:
+            if self.queued >= self.max_queue:
+                self.shed_total += 1
+                raise ProxyOverloaded("queue full", self._retry_after())
+
+            self.queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.shed_total += 1
+                raise ProxyOverloaded("queue timeout", self._retry_after())
+            finally:
+                self.queued -= 1
+
+        try:
+            await self._wait_for_rate_token()
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+        waited = time.monotonic() - started
+        self.in_flight += 1
+        self.admitted_total += 1
+        self._recent_waits.append(waited)
+        PROXY_QUEUE_WAIT.observe(waited)
+        return waited
+
+    def release(self):
+        """업스트림 요청 슬롯 반환"""
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    async def _wait_for_rate_token(self):
+        """토큰 버킷에서 토큰 하나를 받을 때까지 대기 (rate_per_second=0이면 즉시 반환)"""
+        if self.rate_per_second <= 0:
+            return
+
+        async with self._rate_lock:
+            while True:
+                now = time.monotonic()
+                capacity = max(1.0, self.rate_per_second)
+                self._tokens = min(capacity, self._tokens + (now - self._last_refill) * self.rate_per_second)
+                self._last_refill = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                await asyncio.sleep((1.0 - self._tokens) / self.rate_per_second)
+
+    def _retry_after(self) -> int:
+        """현재 대기열을 비우는 데 걸릴 예상 시간 (초, Retry-After 헤더용)"""
+        if self.rate_per_second > 0:
+            return max(1, math.ceil((self.queued + self.in_flight) / self.rate_per_second))
+        return 1
+
+    def collect_metrics(self):
+        """/metrics 렌더링 시 대기열 상태를 게이지로 제공"""
+        return [
+            ("aligo_proxy_queue_depth", "gauge", "Requests waiting for an upstream slot", [({}, self.queued)]),
+            ("aligo_proxy_upstream_in_flight", "gauge", "Requests currently sent upstream", [({}, self.in_flight)]),
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """대기열 상태 및 최근 대기 시간 통계"""
+        waits = list(self._recent_waits)
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rate_per_second": self.rate_per_second,
+            "admitted_total": self.admitted_total,
+            "shed_total": self.shed_total,
+            "wait_ms_avg": round(sum(waits) / len(waits) * 1000, 1) if waits else 0.0,
+            "wait_ms_max": round(max(waits) * 1000, 1) if waits else 0.0,
+        }
+
+
+def create_aligo_client() -> httpx.AsyncClient:
+    """
+    알리고 API용 공유 AsyncClient 생성
+
+    keep-alive 커넥션 풀을 사용하므로 요청마다 TCP/TLS 핸드셰이크를 하지 않습니다.
+    """
+    return httpx.AsyncClient(
+        base_url=ALIGO_API_BASE,
+        timeout=httpx.Timeout(ALIGO_PROXY_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=ALIGO_PROXY_MAX_CONNECTIONS,
+            max_keepalive_connections=ALIGO_PROXY_MAX_KEEPALIVE,
+            keepalive_expiry=ALIGO_PROXY_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """앱 수명 동안 알리고 클라이언트를 하나만 유지"""
+    app.state.aligo_client = create_aligo_client()
+    app.state.token_cache = AligoTokenCache(ALIGO_TOKEN_CACHE_MARGIN) if ALIGO_TOKEN_CACHE_ENABLED else None
+    app.state.upstream_limiter = UpstreamLimiter(
+        max_concurrency=ALIGO_PROXY_CONCURRENCY,
+        rate_per_second=ALIGO_PROXY_RPS,
+        max_queue=ALIGO_PROXY_QUEUE_SIZE,
+        queue_timeout=ALIGO_PROXY_QUEUE_TIMEOUT
+    )
+    REGISTRY.register_collector(app.state.upstream_limiter.collect_metrics)
+    if WORKER_SNAPSHOT_DIR is not None:
+        REGISTRY.register_source(pool_metrics_source(WORKER_SNAPSHOT_DIR))
+    logger.info(
+        f"알리고 클라이언트 생성 (max_connections={ALIGO_PROXY_MAX_CONNECTIONS}, "
+        f"keepalive={ALIGO_PROXY_MAX_KEEPALIVE})"
+    )
+    try:
+        yield
+    finally:
+        await app.state.aligo_client.aclose()
+        logger.info("알리고 클라이언트 종료됨")
+
+
 # FastAPI 앱 생성
 app = FastAPI(
     title="Life is Short - Aligo Proxy",
     description="알리고 카카오 API 프록시 서버",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# 알리고 API 기본 URL
-ALIGO_API_BASE = "https://kakaoapi.aligo.in"
-
 
 @app.get("/health")
 async def health_check():
     """
     헬스체크 엔드포인트
 
-    UptimeRobot 등 외부 모니터링 서비스에서 사용
+    UptimeRobot 등 외부 모니터링 서비스에서 사용.
+    Worker 메인 루프가 예상 시간 안에 진행하지 못하면 503 degraded를 반환합니다.
+    (풀 모드에서는 Worker 프로세스 중 하나라도 멈추면 degraded)
     """
+    stalled = []
+    if WORKER_STATUS.is_stalled():
+        stalled.append(f"{WORKER_STATUS.worker_id} (state: {WORKER_STATUS.state})")
+    if WORKER_SNAPSHOT_DIR is not None:
+        for snapshot in await asyncio.to_thread(read_snapshots, WORKER_SNAPSHOT_DIR):
+            if snapshot.get("stalled"):
+                stalled.append(f"{snapshot['worker_id']} (state: {snapshot['status'].get('state')})")
+
+    if stalled:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "degraded",
+                "service": "aligo-proxy",
+                "message": f"Worker main loop stalled: {', '.join(stalled)}"
+            }
+        )
+
     return {
         "status": "ok",
         "service": "aligo-proxy",
@@ -37,6 +415,85 @@ async def health_check():
     }
 
 
+@app.get("/worker/status")
+async def worker_status():
+    """
+    Worker 실시간 상태
+
+    폴링 간격, 처리 중인 작업(단계, 경과 시간, Runway task ID, lease 만료),
+    최근 처리량과 에러 클래스를 반환합니다.
+    풀 모드에서는 {"workers": [Worker별 상태, ...]}를 반환합니다.
+    """
+    if WORKER_STATUS.attached:
+        return WORKER_STATUS.snapshot()
+
+    if WORKER_SNAPSHOT_DIR is not None:
+        snapshots = await asyncio.to_thread(read_snapshots, WORKER_SNAPSHOT_DIR)
+        if snapshots:
+            return {"workers": [snapshot["status"] for snapshot in snapshots]}
+
+    return JSONResponse(
+            status_code=404,
+            content={"error": "No worker is running in this process"}
+        )
+
+
+@app.post("/worker/wake")
+async def worker_wake(request: Request):
+    """
+    Worker 즉시 폴링 요청
+
+    Next.js 백엔드가 새 task를 넣은 직후 호출하면 Worker가 폴링 간격을 기다리지 않고
+    바로 next-task를 요청합니다. WORKER_API_KEY가 설정되어 있으면
+    `Authorization: Worker <token>` 헤더가 일치해야 합니다.
+    """
+    if WORKER_API_KEY and request.headers.get("authorization") != f"Worker {WORKER_API_KEY}":
+        return JSONResponse(status_code=401, content={"error": "Unauthorized"})
+
+    # 풀 모드에서는 모든 Worker를 깨움 (task를 먼저 lease한 Worker가 처리)
+    if WORKER_POOL_SIZE > 1:
+        ports = [WORKER_WAKE_PORT + index for index in range(1, WORKER_POOL_SIZE + 1)]
+    else:
+        ports = [WORKER_WAKE_PORT]
+    sent = [send_wakeup(DEFAULT_WAKEUP_HOST, port) for port in ports]
+    if not any(sent):
+        return JSONResponse(status_code=503, content={"error": "Failed to signal worker"})
+
+    return {"status": "ok"}
+
+
+@app.post("/debug/profile")
+async def debug_profile(request: Request, seconds: Optional[float] = None):
+    """
+    스레드 스택 덤프 + 샘플링 프로파일 요청
+
+    이 프로세스의 모든 스레드 스택을 기록하고 `seconds`초(기본값: profile_sample_seconds) 동안
+    샘플링합니다. 결과는 log_dir/profiles에 기록됩니다.
+    PROXY_MODE=thread에서는 Worker도 같은 프로세스이므로 함께 기록되고,
+    풀 모드에서는 각 Worker 프로세스에 SIGUSR1을 보내 Worker별로 기록합니다.
+    인증은 /worker/wake와 같습니다.
+    """
+    if WORKER_API_KEY and request.headers.get("authorization") != f"Worker {WORKER_API_KEY}":
+        return JSONResponse(status_code=401, content={"error": "Unauthorized"})
+    if seconds is not None and not 1 <= seconds <= 600:
+        return JSONResponse(status_code=400, content={"error": "seconds must be between 1 and 600"})
+
+    started = PROFILER.trigger(seconds)
+
+    signalled = []
+    if WORKER_SNAPSHOT_DIR is not None and hasattr(signal, "SIGUSR1"):
+        for snapshot in await asyncio.to_thread(read_snapshots, WORKER_SNAPSHOT_DIR):
+            try:
+                os.kill(snapshot["pid"], signal.SIGUSR1)
+                signalled.append(snapshot["worker_id"])
+            except (KeyError, OSError):
+                pass
+
+    if not started and not signalled:
+        return JSONResponse(status_code=409, content={"error": "A sampling profile is already running"})
+    return {"status": "ok", "pid": os.getpid(), "local": started, "workers": signalled}
+
+
 @app.post("/proxy/aligo/{path:path}")
 async def proxy_aligo(path: str, request: Request):
     """
@@ -45,6 +502,8 @@ async def proxy_aligo(path: str, request: Request):
     POST /proxy/aligo/akv10/token/create/30/s/
     → https://kakaoapi.aligo.in/akv10/token/create/30/s/
 
+    요청/응답 바디는 버퍼링하지 않고 스트리밍으로 전달합니다.
+
     Args:
         path: 알리고 API 경로 (예: akv10/token/create/30/s/)
         request: FastAPI Request 객체
@@ -52,44 +511,83 @@ async def proxy_aligo(path: str, request: Request):
     Returns:
         알리고 API 응답
     """
+    client: httpx.AsyncClient = request.app.state.aligo_client
+    token_cache: Optional[AligoTokenCache] = request.app.state.token_cache
+    limiter: UpstreamLimiter = request.app.state.upstream_limiter
+
     try:
-        # 요청 바디 읽기
-        body = await request.body()
-
-        # 알리고 API URL 구성
-        aligo_url = f"{ALIGO_API_BASE}/{path}"
-
-        # 알리고 API로 요청 전달
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                aligo_url,
-                content=body,
-                headers={
-                    "Content-Type": request.headers.get("content-type", "application/x-www-form-urlencoded"),
-                }
+        headers = {
+            "Content-Type": request.headers.get("content-type", "application/x-www-form-urlencoded"),
+        }
+
+        # 토큰 생성 요청은 캐시 사용 (opt-in)
+        lifetime = AligoTokenCache.token_lifetime(path) if token_cache else None
+        if lifetime is not None:
+            return await _proxy_token_create(
+                client, token_cache, limiter, path, lifetime, headers, await request.body()
             )
 
-        logger.info(f"Aligo API 프록시: {path} - Status {response.status_code}")
+        # Content-Length를 그대로 넘겨야 chunked 전송으로 바뀌지 않음
+        content_length = request.headers.get("content-length")
+        if content_length is not None:
+            headers["Content-Length"] = content_length
+
+        # 업스트림 슬롯 대기 (대기열이 가득 차면 ProxyOverloaded)
+        waited = await limiter.acquire()
+
+        # 알리고 API로 요청 전달 (바디 스트리밍)
+        try:
+            upstream_request = client.build_request(
+                "POST",
+                f"/{path}",
+                content=request.stream(),
+                headers=headers
+            )
+            upstream_started = time.perf_counter()
+            response = await client.send(upstream_request, stream=True)
+        except BaseException:
+            limiter.release()
+            raise
+
+        PROXY_UPSTREAM_DURATION.observe(
+            time.perf_counter() - upstream_started, kind="passthrough", status=str(response.status_code)
+        )
+        PROXY_REQUESTS.inc(outcome="forwarded")
+
+        logger.info(f"Aligo API 프록시: {path} - Status {response.status_code} (대기 {waited * 1000:.0f}ms)")
 
         # 알리고 API 응답 반환
         # Content-Length와 Transfer-Encoding 충돌 방지를 위해 필요한 헤더만 전달
         response_headers = {
             "content-type": response.headers.get("content-type", "application/json"),
+            "x-proxy-queue-wait-ms": f"{waited * 1000:.0f}",
         }
 
-        return Response(
-            content=response.content,
+        release = _UpstreamRelease(response, limiter)
+        return _UpstreamStreamingResponse(
+            _stream_upstream(response, release, path),
+            release,
             status_code=response.status_code,
             headers=response_headers
         )
 
+    except ProxyOverloaded as e:
+        PROXY_REQUESTS.inc(outcome="shed")
+        logger.warning(f"Aligo API 프록시 과부하 ({e.reason}): {path} - Retry-After {e.retry_after}s")
+        return JSONResponse(
+            status_code=429,
+            content={"error": f"Proxy overloaded: {e.reason}"},
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except httpx.TimeoutException:
+        PROXY_REQUESTS.inc(outcome="timeout")
         logger.error(f"Aligo API 타임아웃: {path}")
         return JSONResponse(
             status_code=504,
             content={"error": "Aligo API timeout"}
         )
     except Exception as e:
+        PROXY_REQUESTS.inc(outcome="error")
         logger.error(f"Aligo API 프록시 오류: {path} - {str(e)}")
         return JSONResponse(
             status_code=500,
@@ -97,6 +595,126 @@ async def proxy_aligo(path: str, request: Request):
         )
 
 
+class _UpstreamRelease:
+    """업스트림 응답(커넥션)과 대기열 슬롯을 한 번만 반환"""
+
+    def __init__(self, response: httpx.Response, limiter: UpstreamLimiter):
+        self.response = response
+        self.limiter = limiter
+        self.released = False
+
+    async def __call__(self):
+        if self.released:
+            return
+        self.released = True
+        try:
+            await self.response.aclose()
+        finally:
+            self.limiter.release()
+
+
+class _UpstreamStreamingResponse(StreamingResponse):
+    """
+    응답 전송이 어떻게 끝나든 업스트림 자원을 반환하는 StreamingResponse
+
+    클라이언트가 첫 청크 전에 연결을 끊으면 바디 제너레이터가 시작되지 않아
+    제너레이터의 finally가 실행되지 않으므로, 여기서도 반환합니다.
+    """
+
+    def __init__(self, content: AsyncIterator[bytes], release: _UpstreamRelease, **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.release()
+
+
+async def _stream_upstream(response: httpx.Response, release: _UpstreamRelease, path: str) -> AsyncIterator[bytes]:
+    """
+    업스트림 응답 바디를 전달하고, 끝나면 커넥션과 슬롯 반환
+
+    바디 도중 업스트림 오류(ReadTimeout 등)가 나도 슬롯이 반환되도록 finally에서 정리합니다.
+    """
+    try:
+        async for chunk in response.aiter_bytes():
+            yield chunk
+    except httpx.HTTPError as e:
+        PROXY_REQUESTS.inc(outcome="error")
+        logger.error(f"Aligo API 응답 전달 중 오류: {path} - {type(e).__name__}: {e}")
+        raise
+    finally:
+        await release()
+
+
+async def _proxy_token_create(
+    client: httpx.AsyncClient,
+    token_cache: AligoTokenCache,
+    limiter: UpstreamLimiter,
+    path: str,
+    lifetime: int,
+    headers: Dict[str, str],
+    body: bytes
+) -> Response:
+    """토큰 생성 요청을 캐시를 거쳐 전달 (바디가 작으므로 버퍼링)"""
+
+    async def fetch() -> CachedResponse:
+        await limiter.acquire()
+        try:
+            upstream_started = time.perf_counter()
+            response = await client.post(f"/{path}", content=body, headers=headers)
+        finally:
+            limiter.release()
+        PROXY_UPSTREAM_DURATION.observe(
+            time.perf_counter() - upstream_started, kind="token", status=str(response.status_code)
+        )
+        logger.info(f"Aligo API 프록시: {path} - Status {response.status_code}")
+        return CachedResponse(
+            status_code=response.status_code,
+            content=response.content,
+            content_type=response.headers.get("content-type", "application/json")
+        )
+
+    key = AligoTokenCache.make_key(path, body)
+    cached, cache_status = await token_cache.get_or_fetch(key, lifetime, fetch)
+    PROXY_REQUESTS.inc(outcome=f"token_cache_{cache_status.lower()}")
+    if cache_status != "MISS":
+        logger.debug(f"Aligo 토큰 캐시 {cache_status}: {path}")
+
+    return Response(
+        content=cached.content,
+        status_code=cached.status_code,
+        headers={
+            "content-type": cached.content_type,
+            "x-proxy-cache": cache_status,
+        }
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus 메트릭 엔드포인트
+
+    같은 프로세스에서 실행 중인 Worker의 파이프라인 메트릭과 프록시 메트릭을 함께 제공합니다.
+    풀 모드에서는 Worker 프로세스별 메트릭을 worker 라벨로 구분해 합쳐서 제공합니다.
+    """
+    if WORKER_SNAPSHOT_DIR is not None:
+        # Worker 스냅샷 파일 읽기가 이벤트 루프를 막지 않도록
+        content = await asyncio.to_thread(REGISTRY.render)
+    else:
+        content = REGISTRY.render()
+    return Response(content=content, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/proxy/stats")
+async def proxy_stats(request: Request):
+    """프록시 대기열 상태 (대기 중/처리 중 요청 수, 거절 수, 최근 대기 시간)"""
+    return request.app.state.upstream_limiter.stats()
+
+
 @app.get("/")
 async def root():
     """루트 엔드포인트"""
@@ -105,11 +723,17 @@ async def root():
         "status": "running",
         "endpoints": {
             "health": "/health",
-            "proxy": "/proxy/aligo/{path}"
+            "worker_status": "/worker/status",
+            "worker_wake": "/worker/wake",
+            "debug_profile": "/debug/profile",
+            "proxy": "/proxy/aligo/{path}",
+            "stats": "/proxy/stats",
+            "metrics": "/metrics"
         }
     }
 
 
 if __name__ == "__main__":
+    # 상대 임포트를 쓰므로 python -m worker.api_server로 실행
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
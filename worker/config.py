@@ -0,0 +1,342 @@
+"""
+Worker configuration: schema, validation and hot reload
+
+config.yaml is checked against SCHEMA when it is loaded: every known key gets
+its type coerced, its range checked and its default filled in, and all
+problems are reported together in one ConfigError. ${VAR} and ${VAR:-default}
+are expanded anywhere inside string values (not only when they are the whole
+value).
+
+Keys marked reloadable can change while the worker runs. ConfigWatcher
+re-reads the file when it changes or on SIGHUP and hands the changed
+reloadable values to a callback; changes to other keys are reported and
+ignored until the next restart, so a reload never disturbs running tasks.
+"""
+import logging
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import yaml
+
+from .model_routing import parse_fallbacks
+
+logger = logging.getLogger(__name__)
+
+ENV_PATTERN = re.compile(r"\$\{([A-Za-z_][A-Za-z0-9_]*)(?::-([^}]*))?\}")
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+
+class ConfigError(ValueError):
+    """Raised when config.yaml is missing or does not match the schema"""
+
+
+@dataclass
+class Field:
+    """Schema entry for one config key"""
+    type: type
+    default: Any = None
+    required: bool = False
+    reloadable: bool = False
+    min: Optional[float] = None
+    max: Optional[float] = None
+    choices: Optional[Sequence[Any]] = None
+
+
+SCHEMA: Dict[str, Field] = {
+    # Connection (restart required)
+    "vercel_api_url": Field(str, required=True),
+    "worker_token": Field(str, required=True),
+    "runway_api_key": Field(str, required=True),
+    "worker_id": Field(str, required=True),
+    "worker_type": Field(str, "runway", choices=("runway", "wan")),
+    "runway_model": Field(str, "gen4_turbo"),
+    "runway_base_url": Field(str, None),
+    # Extra Runway keys, comma-separated, "key:N" for an account running N at once (see runway_keys.py)
+    "runway_api_keys": Field(str, None),
+    "runway_key_concurrency": Field(int, 1, min=1, max=100),
+    "runway_key_cooldown_seconds": Field(float, 60, reloadable=True, min=1),
+
+    # Fallback to an equivalent model while the requested one is degraded (see model_routing.py)
+    "model_fallbacks": Field(str, None, reloadable=True),
+    "model_fallback_queue_seconds": Field(float, 300, reloadable=True, min=0),
+    "model_fallback_error_rate": Field(float, 0.5, reloadable=True, min=0, max=1),
+    "model_fallback_window_seconds": Field(float, 900, reloadable=True, min=60),
+    "model_fallback_min_samples": Field(int, 3, reloadable=True, min=1),
+    "wakeup_port": Field(int, 8001, min=0, max=65535),
+
+    # Timeouts and leases
+    "api_timeout": Field(int, 30, reloadable=True, min=1, max=600),
+    "lease_duration_seconds": Field(int, 600, reloadable=True, min=60),
+    "heartbeat_interval": Field(int, 120, reloadable=True, min=5),
+    "runway_timeout": Field(int, 600, reloadable=True, min=30),
+    "runway_poll_interval": Field(float, 5, reloadable=True, min=0.5, max=60),
+    "next_task_long_poll_seconds": Field(int, 0, reloadable=True, min=0, max=60),
+
+    # Local scheduling of leased tasks (see local_queue.py)
+    "local_queue_size": Field(int, 1, reloadable=True, min=1, max=20),
+    "local_queue_policy": Field(str, "fifo", reloadable=True, choices=("fifo", "group", "sjf", "group_fair")),
+    "local_queue_max_wait_seconds": Field(float, 1800, reloadable=True, min=0),
+
+    # Generation defaults
+    "runway_default_duration": Field(float, 5.0, reloadable=True, min=2, max=10),
+    "runway_default_ratio": Field(str, "1280:720", reloadable=True),
+
+    # Files
+    "temp_dir": Field(str, "./temp"),
+    "log_dir": Field(str, "./logs"),
+    "auto_cleanup_temp": Field(bool, True, reloadable=True),
+    "workspace_quota_bytes": Field(int, 5 * 1024 ** 3, reloadable=True, min=0),
+    "workspace_task_reserve_bytes": Field(int, 100 * 1024 * 1024, reloadable=True, min=0),
+    "workspace_tmpfs_dir": Field(str, None),
+    "workspace_tmpfs_max_input_bytes": Field(int, 20 * 1024 * 1024, reloadable=True, min=0),
+
+    # Input photo cache (see photo_cache.py)
+    "photo_cache_enabled": Field(bool, False),
+    "photo_cache_dir": Field(str, None),
+    "photo_cache_max_bytes": Field(int, 1024 ** 3, reloadable=True, min=0),
+    "photo_cache_revalidate": Field(bool, False, reloadable=True),
+
+    # Generation result cache (see result_cache.py)
+    "result_cache_mode": Field(str, "off", choices=("off", "local", "storage_path")),
+    "result_cache_dir": Field(str, None),
+    "result_cache_max_bytes": Field(int, 2 * 1024 ** 3, reloadable=True, min=0),
+    "result_cache_ttl_days": Field(float, 7, reloadable=True, min=0),
+
+    # Logging
+    "log_level": Field(str, "INFO", reloadable=True, choices=LOG_LEVELS),
+    "log_format": Field(str, "text", choices=("text", "json")),
+    "log_rotation": Field(str, "time", choices=("time", "size")),
+    "log_retention": Field(int, 14, min=1),
+    "log_max_bytes": Field(int, 50 * 1024 * 1024, min=1024 * 1024),
+    "idle_log_interval": Field(float, 120, reloadable=True, min=0),
+
+    # Tracing and history
+    "tracing_enabled": Field(bool, True),
+    "trace_retention_days": Field(int, 14, min=1),
+    "history_enabled": Field(bool, True),
+    "history_db": Field(str, None),
+    "history_retention_days": Field(int, 90, min=1),
+
+    # Polling
+    "polling_interval_slow": Field(float, 60, reloadable=True, min=1),
+    "polling_interval_fast": Field(float, 5, reloadable=True, min=1),
+    "fast_polling_duration": Field(float, 1800, reloadable=True, min=0),
+    "polling_strategy": Field(str, "fast_after_task", choices=("fast_after_task", "arrival_rate")),
+    "polling_target_fraction": Field(float, 0.2, reloadable=True, min=0.01, max=1),
+    "polling_jitter": Field(float, 0.2, reloadable=True, min=0, max=0.9),
+
+    # Hot reload
+    "config_watch_interval": Field(float, 5, min=1),
+
+    # Shutdown
+    "drain_grace_seconds": Field(float, 240, reloadable=True, min=0),
+
+    # Profiling (writes under log_dir/profiles)
+    "profile_task_sample_rate": Field(float, 0.0, reloadable=True, min=0, max=1),
+    "profile_sample_seconds": Field(float, 30, reloadable=True, min=1, max=600),
+    "tracemalloc_enabled": Field(bool, False),
+}
+
+
+def expand_env(value: Any) -> Any:
+    """Expand ${VAR} / ${VAR:-default} inside strings (recursively for lists and dicts)"""
+    if isinstance(value, str):
+        def replace(match: "re.Match") -> str:
+            name, default = match.group(1), match.group(2)
+            if name in os.environ:
+                return os.environ[name]
+            return default if default is not None else match.group(0)
+        return ENV_PATTERN.sub(replace, value)
+    if isinstance(value, list):
+        return [expand_env(v) for v in value]
+    if isinstance(value, dict):
+        return {k: expand_env(v) for k, v in value.items()}
+    return value
+
+
+def _coerce(key: str, field: Field, value: Any) -> Tuple[Any, Optional[str]]:
+    """Convert value to the field type; returns (value, error message or None)"""
+    if field.type is bool:
+        if isinstance(value, bool):
+            return value, None
+        if isinstance(value, str) and value.lower() in ("1", "true", "yes", "on", "0", "false", "no", "off"):
+            return value.lower() in ("1", "true", "yes", "on"), None
+        return value, f"{key}: expected true/false, got {value!r}"
+
+    if field.type in (int, float):
+        if isinstance(value, bool):
+            return value, f"{key}: expected a number, got {value!r}"
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            return value, f"{key}: expected a number, got {value!r}"
+        if field.type is int:
+            if not number.is_integer():
+                return value, f"{key}: expected an integer, got {value!r}"
+            number = int(number)
+        if field.min is not None and number < field.min:
+            return value, f"{key}: {number} is below the minimum {field.min}"
+        if field.max is not None and number > field.max:
+            return value, f"{key}: {number} is above the maximum {field.max}"
+        return number, None
+
+    if not isinstance(value, str):
+        value = str(value)
+    if key == "log_level":
+        value = value.upper()
+    if field.choices is not None and value not in field.choices:
+        return value, f"{key}: {value!r} is not one of {', '.join(map(str, field.choices))}"
+    return value, None
+
+
+def validate_config(raw: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Check a raw config dict against SCHEMA
+
+    Args:
+        raw: Parsed YAML with environment variables expanded
+
+    Returns:
+        Config dict with defaults filled in (unknown keys are kept as-is)
+
+    Raises:
+        ConfigError listing every problem found
+    """
+    config = dict(raw)
+    errors: List[str] = []
+
+    for key, field in SCHEMA.items():
+        value = raw.get(key)
+        if value is None or value == "":
+            if field.required:
+                errors.append(f"{key}: required")
+            config[key] = field.default
+            continue
+        if field.required and isinstance(value, str) and ENV_PATTERN.search(value):
+            errors.append(f"{key}: environment variable in {value!r} is not set")
+            continue
+        config[key], error = _coerce(key, field, value)
+        if error:
+            errors.append(error)
+
+    if not errors and config["polling_interval_fast"] > config["polling_interval_slow"]:
+        errors.append("polling_interval_fast must not be greater than polling_interval_slow")
+
+    try:
+        parse_fallbacks(config.get("model_fallbacks"))
+    except ValueError as e:
+        errors.append(f"model_fallbacks: {e}")
+
+    unknown = sorted(set(raw) - set(SCHEMA))
+    if unknown:
+        logger.warning(f"Unknown config keys (ignored by validation): {', '.join(unknown)}")
+
+    if errors:
+        raise ConfigError("Invalid configuration:\n  - " + "\n  - ".join(errors))
+    return config
+
+
+def load_config(config_path: str) -> Dict[str, Any]:
+    """
+    Read, expand and validate a YAML config file
+
+    Raises:
+        ConfigError if the file is missing, unreadable or invalid
+    """
+    config_file = Path(config_path)
+    if not config_file.exists():
+        raise ConfigError(f"Config file not found: {config_path}")
+
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            raw = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as e:
+        raise ConfigError(f"Cannot read {config_path}: {e}")
+
+    if not isinstance(raw, dict):
+        raise ConfigError(f"{config_path} must contain a mapping of keys to values")
+
+    return validate_config(expand_env(raw))
+
+
+class ConfigWatcher:
+    """Re-reads the config file on change or on request and reports reloadable changes"""
+
+    def __init__(self, config_path: str, current: Dict[str, Any],
+                 on_change: Callable[[Dict[str, Any]], None], log: Optional[logging.Logger] = None):
+        """
+        Args:
+            config_path: File to watch
+            current: Config currently in use
+            on_change: Called with {key: new value} for changed reloadable keys
+            log: Logger for reload results (defaults to this module's logger)
+        """
+        self.config_path = Path(config_path)
+        self.current = current
+        self.on_change = on_change
+        self.log = log or logger
+        self.reload_requested = False
+        self._mtime = self._read_mtime()
+        # key -> file value that needs a restart and was already warned about
+        self._restart_pending: Dict[str, Any] = {}
+
+    def _read_mtime(self) -> Optional[float]:
+        try:
+            return self.config_path.stat().st_mtime
+        except OSError:
+            return None
+
+    def request_reload(self):
+        """Mark a reload for the next check (safe to call from a signal handler)"""
+        self.reload_requested = True
+
+    def check(self):
+        """Reload if the file changed or a reload was requested (scheduler job)"""
+        mtime = self._read_mtime()
+        if not self.reload_requested and mtime == self._mtime:
+            return
+        self.reload_requested = False
+        self._mtime = mtime
+        self.reload()
+
+    def reload(self) -> Dict[str, Any]:
+        """
+        Apply the file's reloadable values
+
+        Returns:
+            {key: new value} that were applied (empty if invalid or unchanged)
+        """
+        try:
+            new_config = load_config(str(self.config_path))
+        except ConfigError as e:
+            self.log.error(f"Config reload rejected, keeping current settings. {e}")
+            return {}
+
+        changed = {}
+        restart_needed = []
+        for key, value in new_config.items():
+            if self.current.get(key) == value:
+                self._restart_pending.pop(key, None)
+                continue
+            field = SCHEMA.get(key)
+            if field is not None and field.reloadable:
+                changed[key] = value
+            elif key not in self._restart_pending or self._restart_pending[key] != value:
+                # warn once per distinct value, not on every later reload
+                self._restart_pending[key] = value
+                restart_needed.append(key)
+
+        if restart_needed:
+            self.log.warning(f"Config changes need a restart and were not applied: {', '.join(sorted(restart_needed))}")
+        if not changed:
+            self.log.info("Config reloaded: no runtime-tunable changes")
+            return {}
+
+        self.current = {**self.current, **changed}
+        self.on_change(changed)
+        self.log.info("Config reloaded: " + ", ".join(f"{k}={v}" for k, v in sorted(changed.items())))
+        return changed
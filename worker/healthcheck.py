@@ -1,15 +1,15 @@
 """
-Healthchecks.io Ping 스레드
+Healthchecks.io Ping 작업
 
 60초마다 Healthchecks.io에 ping을 보내 Worker가 살아있음을 알립니다.
 3분 이상 ping이 없으면 Healthchecks.io가 Slack으로 알림을 보냅니다.
 """
-import time
-import threading
 import requests
 import logging
 from typing import Optional
 
+from .scheduler import get_scheduler, ScheduledJob
+
 logger = logging.getLogger(__name__)
 
 
@@ -27,10 +27,10 @@ class HealthcheckPinger:
         self.ping_url = ping_url
         self.interval_seconds = interval_seconds
         self.running = False
-        self.thread: Optional[threading.Thread] = None
+        self.job: Optional[ScheduledJob] = None
 
     def start(self):
-        """백그라운드 스레드 시작"""
+        """공용 스케줄러에 ping 작업 등록"""
         if not self.ping_url:
             logger.warning("⚠️ HEALTHCHECK_PING_URL이 설정되지 않았습니다. Healthcheck ping을 건너뜁니다.")
             return
@@ -40,30 +40,25 @@ class HealthcheckPinger:
             return
 
         self.running = True
-        self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
+        self.job = get_scheduler().add_job("healthcheck-ping", self._run, self.interval_seconds)
         logger.info(f"✅ Healthcheck pinger 시작 (간격: {self.interval_seconds}초)")
 
     def stop(self):
-        """백그라운드 스레드 중지"""
+        """ping 작업 취소 (대기 없이 즉시 반환)"""
         if not self.running:
             return
 
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=5)
+        get_scheduler().cancel(self.job)
+        self.job = None
         logger.info("Healthcheck pinger 중지됨")
 
     def _run(self):
-        """백그라운드 스레드 메인 루프"""
-        while self.running:
-            try:
-                self._send_ping()
-            except Exception as e:
-                logger.error(f"Healthcheck ping 오류: {e}")
-
-            # 다음 ping까지 대기
-            time.sleep(self.interval_seconds)
+        """스케줄러가 interval_seconds마다 호출"""
+        try:
+            self._send_ping()
+        except Exception as e:
+            logger.error(f"Healthcheck ping 오류: {e}")
 
     def _send_ping(self):
         """Healthchecks.io에 ping 전송"""
@@ -0,0 +1,226 @@
+"""
+Local history of task outcomes in SQLite
+
+One row per processed item (model, wall time, bytes moved, retries, final
+status) plus one row per pipeline step timing. Rows are handed to a
+background thread through a queue, so the pipeline never waits on disk or on
+a SQLite lock; that thread owns the only connection. Old rows are deleted by
+a periodic compaction job (retention_days) and freed pages are returned to
+the file system with incremental vacuum.
+
+Example queries (sqlite3 logs/task_history.db):
+    SELECT model, COUNT(*), AVG(duration) FROM tasks
+     WHERE finished_at >= strftime('%s', 'now', '-1 day') GROUP BY model;
+    SELECT step, AVG(duration) FROM task_steps
+     WHERE model = 'veo3.1' AND finished_at >= strftime('%s', 'now', '-7 day') GROUP BY step;
+"""
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .metrics import DROPPED_RECORDS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    item_id TEXT NOT NULL,
+    group_id TEXT,
+    worker_id TEXT,
+    model TEXT,
+    status TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    duration REAL NOT NULL,
+    video_seconds REAL,
+    input_bytes INTEGER,
+    output_bytes INTEGER,
+    retries INTEGER NOT NULL DEFAULT 0,
+    runway_task_id TEXT,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_finished_at ON tasks (finished_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_model_finished_at ON tasks (model, finished_at);
+CREATE INDEX IF NOT EXISTS idx_tasks_item_id ON tasks (item_id);
+
+CREATE TABLE IF NOT EXISTS task_steps (
+    item_id TEXT NOT NULL,
+    model TEXT,
+    step TEXT NOT NULL,
+    duration REAL NOT NULL,
+    finished_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_task_steps_model_step ON task_steps (model, step, finished_at);
+CREATE INDEX IF NOT EXISTS idx_task_steps_finished_at ON task_steps (finished_at);
+"""
+
+# Sentinel commands for the writer thread
+_COMPACT = "compact"
+_STOP = "stop"
+
+
+class TaskHistory:
+    """Asynchronous writer (and small query helper) for the history database"""
+
+    def __init__(self, db_path: str, retention_days: int = 90, queue_size: int = 1000):
+        """
+        Args:
+            db_path: SQLite file (created if missing)
+            retention_days: Rows older than this are deleted on compact()
+            queue_size: Pending records kept before new ones are dropped
+                (counted in runway_worker_dropped_records_total{sink="history"})
+        """
+        self.db_path = Path(db_path)
+        self.retention_days = retention_days
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def start(self):
+        """Create the schema and start the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._write_loop, name="task-history", daemon=True)
+        self._thread.start()
+
+    def record_task(self, item_id: str, model: Optional[str], status: str, started_at: float,
+                    finished_at: float, steps: Optional[Dict[str, float]] = None, **fields):
+        """
+        Queue one finished task (never blocks)
+
+        Args:
+            item_id: Item ID
+            model: Runway model
+            status: "completed" or "failed"
+            started_at: Epoch seconds when processing started
+            finished_at: Epoch seconds when processing ended
+            steps: Step name -> duration in seconds
+            **fields: Other tasks columns (group_id, worker_id, video_seconds,
+                input_bytes, output_bytes, retries, runway_task_id, error)
+        """
+        record = {
+            "item_id": item_id,
+            "model": model,
+            "status": status,
+            "started_at": started_at,
+            "finished_at": finished_at,
+            "duration": finished_at - started_at,
+            "steps": steps or {},
+            **fields,
+        }
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            DROPPED_RECORDS.inc(sink="history")
+
+    def compact(self):
+        """Ask the writer to apply the retention policy"""
+        try:
+            self._queue.put_nowait(_COMPACT)
+        except queue.Full:
+            pass
+
+    def stop(self, timeout: float = 5.0):
+        """Write what is queued, then stop the writer"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+        self._thread = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        # auto_vacuum only applies to a new file, so set it before the schema exists
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _write_loop(self):
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            logger.error(f"Task history disabled, cannot open {self.db_path}: {e}")
+            return
+
+        while True:
+            item = self._queue.get()
+            if item == _STOP:
+                break
+            try:
+                if item == _COMPACT:
+                    self._compact(conn)
+                else:
+                    self._insert(conn, item)
+            except sqlite3.Error as e:
+                logger.error(f"Task history write failed: {e}")
+        conn.close()
+
+    @staticmethod
+    def _insert(conn: sqlite3.Connection, record: Dict[str, Any]):
+        steps = record.pop("steps")
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO tasks (item_id, group_id, worker_id, model, status, started_at, finished_at,
+                                   duration, video_seconds, input_bytes, output_bytes, retries,
+                                   runway_task_id, error)
+                VALUES (:item_id, :group_id, :worker_id, :model, :status, :started_at, :finished_at,
+                        :duration, :video_seconds, :input_bytes, :output_bytes, :retries,
+                        :runway_task_id, :error)
+                """,
+                {
+                    "group_id": None, "worker_id": None, "video_seconds": None, "input_bytes": None,
+                    "output_bytes": None, "retries": 0, "runway_task_id": None, "error": None,
+                    **record,
+                }
+            )
+            conn.executemany(
+                "INSERT INTO task_steps (item_id, model, step, duration, finished_at) VALUES (?, ?, ?, ?, ?)",
+                [(record["item_id"], record["model"], step, duration, record["finished_at"])
+                 for step, duration in steps.items()]
+            )
+
+    def _compact(self, conn: sqlite3.Connection):
+        cutoff = time.time() - self.retention_days * 86400
+        with conn:
+            tasks = conn.execute("DELETE FROM tasks WHERE finished_at < ?", (cutoff,)).rowcount
+            steps = conn.execute("DELETE FROM task_steps WHERE finished_at < ?", (cutoff,)).rowcount
+        conn.execute("PRAGMA incremental_vacuum").fetchall()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if tasks or steps:
+            logger.info(f"Task history compacted: {tasks} tasks, {steps} step rows older than {self.retention_days}d")
+
+    def seconds_per_video_second(self, since: float) -> Dict[str, float]:
+        """
+        Mean processing time per second of generated video, by model
+
+        Only completed tasks finished since `since` (epoch seconds) count.
+        """
+        if not self.db_path.exists():
+            return {}
+        conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, timeout=30)
+        try:
+            rows = conn.execute(
+                """
+                SELECT model, AVG(duration / video_seconds)
+                  FROM tasks
+                 WHERE status = 'completed' AND video_seconds > 0 AND finished_at >= ?
+                 GROUP BY model
+                HAVING COUNT(*) >= 5
+                """,
+                (since,)
+            ).fetchall()
+            return {model: rate for model, rate in rows}
+        finally:
+            conn.close()
@@ -4,13 +4,13 @@ IP 변경 감지 및 Slack 알림
 1시간마다 공인 IP를 확인하고, 변경되면 Slack으로 알림을 보냅니다.
 알리고 화이트리스트를 수동으로 재등록해야 함을 알립니다.
 """
-import time
-import threading
 import requests
 import logging
 from typing import Optional
 import json
 
+from .scheduler import get_scheduler, ScheduledJob
+
 logger = logging.getLogger(__name__)
 
 
@@ -28,11 +28,12 @@ class IPMonitor:
         self.slack_webhook_url = slack_webhook_url
         self.check_interval_seconds = check_interval_seconds
         self.running = False
-        self.thread: Optional[threading.Thread] = None
+        self.job: Optional[ScheduledJob] = None
         self.last_known_ip: Optional[str] = None
+        self._announced = False
 
     def start(self):
-        """백그라운드 스레드 시작"""
+        """공용 스케줄러에 IP 체크 작업 등록"""
         if not self.slack_webhook_url:
             logger.warning("⚠️ SLACK_WEBHOOK_URL이 설정되지 않았습니다. IP 모니터링을 건너뜁니다.")
             return
@@ -42,38 +43,35 @@ class IPMonitor:
             return
 
         self.running = True
-        self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
+        self.job = get_scheduler().add_job("ip-monitor", self._run, self.check_interval_seconds)
         logger.info(f"✅ IP 모니터 시작 (체크 간격: {self.check_interval_seconds}초)")
 
     def stop(self):
-        """백그라운드 스레드 중지"""
+        """IP 체크 작업 취소 (대기 없이 즉시 반환)"""
         if not self.running:
             return
 
         self.running = False
-        if self.thread:
-            self.thread.join(timeout=5)
+        get_scheduler().cancel(self.job)
+        self.job = None
         logger.info("IP 모니터 중지됨")
 
     def _run(self):
-        """백그라운드 스레드 메인 루프"""
-        # 시작 시 현재 IP 확인
-        self.last_known_ip = self._get_public_ip()
-        if self.last_known_ip:
-            logger.info(f"📍 현재 공인 IP: {self.last_known_ip}")
-            self._send_slack_notification(
-                f"🟢 Worker 시작됨\n현재 공인 IP: `{self.last_known_ip}`\n알리고 화이트리스트에 등록되어 있는지 확인하세요."
-            )
-
-        while self.running:
-            try:
-                self._check_ip_change()
-            except Exception as e:
-                logger.error(f"IP 체크 오류: {e}")
+        """스케줄러가 check_interval_seconds마다 호출"""
+        # 첫 실행 시 현재 IP 확인 및 알림
+        if not self._announced:
+            self._announced = True
+            self.last_known_ip = self._get_public_ip()
+            if self.last_known_ip:
+                logger.info(f"📍 현재 공인 IP: {self.last_known_ip}")
+                self._send_slack_notification(
+                    f"🟢 Worker 시작됨\n현재 공인 IP: `{self.last_known_ip}`\n알리고 화이트리스트에 등록되어 있는지 확인하세요."
+                )
 
-            # 다음 체크까지 대기
-            time.sleep(self.check_interval_seconds)
+        try:
+            self._check_ip_change()
+        except Exception as e:
+            logger.error(f"IP 체크 오류: {e}")
 
     def _check_ip_change(self):
         """IP 변경 확인 및 알림"""
@@ -0,0 +1,197 @@
+"""
+Local scheduling of leased tasks
+
+With local_queue_size > 1 the worker leases up to that many tasks and keeps
+the ones it is not working on yet in a LocalTaskQueue (their leases are
+extended by heartbeats). The policy decides which held task runs next:
+
+- "fifo": lease order, the same as holding a single task
+- "group": finish groups together. The group in progress is continued; when
+  it has nothing left here, the group with the least expected remaining work
+  goes next (shortest remaining group first minimizes mean group completion)
+- "sjf": shortest expected job first, by model and clip length
+- "group_fair": round robin over groups by expected work served, so one
+  large group cannot hold back all the others
+
+Whatever the policy, a task held longer than max_wait_seconds goes first,
+so short jobs or small groups never starve a long one.
+
+Expected job time is seconds of processing per second of video for the
+model (from the task history when there is enough of it, otherwise a
+built-in estimate) times the clip length, plus a fixed transfer overhead.
+
+Group completion is measured locally: from the first lease of a group's item
+until the last of its items held here finishes. It is observed per policy in
+runway_worker_group_completion_seconds.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .metrics import GROUP_COMPLETION, LOCAL_QUEUE_DEPTH
+
+POLICIES = ("fifo", "group", "sjf", "group_fair")
+
+# Seconds of processing per second of video, used until the history has real numbers
+DEFAULT_SECONDS_PER_VIDEO_SECOND = {
+    "gen4_turbo": 8.0,
+    "gen4.5_turbo": 12.0,
+    "gen3a_turbo": 6.0,
+    "veo3": 15.0,
+    "veo3.1": 15.0,
+    "veo3.1_fast": 8.0,
+}
+TRANSFER_OVERHEAD_SECONDS = 15.0
+
+
+class JobEstimator:
+    """Expected processing time of a task from its model and clip length"""
+
+    def __init__(self, default_duration: float = 5.0):
+        self.default_duration = default_duration
+        self.rates: Dict[str, float] = dict(DEFAULT_SECONDS_PER_VIDEO_SECOND)
+
+    def update(self, rates: Dict[str, float]):
+        """Replace built-in rates with measured ones (model -> seconds per video second)"""
+        self.rates.update({model: rate for model, rate in rates.items() if model and rate and rate > 0})
+
+    def video_seconds(self, task: Dict[str, Any]) -> float:
+        """Clip length the worker will request (frame_num at 24fps, clamped to 2-10s)"""
+        frame_num = task.get("frame_num")
+        if frame_num:
+            return max(2.0, min(10.0, frame_num / 24.0))
+        return self.default_duration
+
+    def estimate(self, task: Dict[str, Any]) -> float:
+        model = task.get("inference_provider", "gen4_turbo")
+        rate = self.rates.get(model, DEFAULT_SECONDS_PER_VIDEO_SECOND["gen4_turbo"])
+        return TRANSFER_OVERHEAD_SECONDS + rate * self.video_seconds(task)
+
+
+@dataclass
+class HeldTask:
+    """A leased task waiting in the local queue"""
+    task: Dict[str, Any]
+    sequence: int
+    held_since: float
+    expected_seconds: float
+
+    @property
+    def group_id(self) -> str:
+        return self.task.get("group_id") or "unknown"
+
+
+@dataclass
+class _GroupProgress:
+    started: float
+    outstanding: int = 0
+    served_seconds: float = 0.0
+
+
+class LocalTaskQueue:
+    """Leased tasks held by this worker and the policy choosing the next one"""
+
+    def __init__(self, policy: str = "fifo", estimator: Optional[JobEstimator] = None,
+                 max_wait_seconds: float = 1800):
+        """
+        Args:
+            policy: One of POLICIES
+            estimator: Expected job time model (defaults to built-in rates)
+            max_wait_seconds: Held tasks older than this run first regardless of policy
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown local queue policy: {policy}")
+        self.policy = policy
+        self.estimator = estimator or JobEstimator()
+        self.max_wait_seconds = max_wait_seconds
+        self._held: List[HeldTask] = []
+        self._groups: Dict[str, _GroupProgress] = {}
+        self._current_group: Optional[str] = None
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._held)
+
+    def item_ids(self) -> List[str]:
+        return [held.task["item_id"] for held in self._held]
+
+    def add(self, task: Dict[str, Any]):
+        """Hold a newly leased task"""
+        now = time.monotonic()
+        self._sequence += 1
+        held = HeldTask(task, self._sequence, now, self.estimator.estimate(task))
+        self._held.append(held)
+        progress = self._groups.setdefault(held.group_id, _GroupProgress(started=now))
+        progress.outstanding += 1
+        LOCAL_QUEUE_DEPTH.set(len(self._held))
+
+    def pop(self) -> Optional[Dict[str, Any]]:
+        """Remove and return the task to run next (None when empty)"""
+        if not self._held:
+            return None
+        held = self._overdue() or self._choose()
+        self._held.remove(held)
+        self._current_group = held.group_id
+        self._groups[held.group_id].served_seconds += held.expected_seconds
+        LOCAL_QUEUE_DEPTH.set(len(self._held))
+        return held.task
+
+    def drain(self) -> List[Dict[str, Any]]:
+        """Remove and return every held task (to release them on shutdown)"""
+        tasks = [held.task for held in sorted(self._held, key=lambda h: h.sequence)]
+        self._held.clear()
+        self._groups.clear()
+        self._current_group = None
+        LOCAL_QUEUE_DEPTH.set(0)
+        return tasks
+
+    def task_finished(self, task: Dict[str, Any]) -> Optional[float]:
+        """
+        Account a processed task to its group
+
+        Returns:
+            Seconds since the group's first lease here, if this was the
+            group's last task held by this worker; otherwise None
+        """
+        group_id = task.get("group_id") or "unknown"
+        progress = self._groups.get(group_id)
+        if progress is None:
+            return None
+        progress.outstanding -= 1
+        if progress.outstanding > 0:
+            return None
+        del self._groups[group_id]
+        elapsed = time.monotonic() - progress.started
+        GROUP_COMPLETION.observe(elapsed, policy=self.policy)
+        return elapsed
+
+    def _overdue(self) -> Optional[HeldTask]:
+        if self.max_wait_seconds <= 0:
+            return None
+        cutoff = time.monotonic() - self.max_wait_seconds
+        overdue = [held for held in self._held if held.held_since <= cutoff]
+        return min(overdue, key=lambda h: h.sequence) if overdue else None
+
+    def _choose(self) -> HeldTask:
+        if self.policy == "sjf":
+            return min(self._held, key=lambda h: (h.expected_seconds, h.sequence))
+
+        if self.policy == "group":
+            in_group = [held for held in self._held if held.group_id == self._current_group]
+            if not in_group:
+                remaining: Dict[str, float] = {}
+                for held in self._held:
+                    remaining[held.group_id] = remaining.get(held.group_id, 0.0) + held.expected_seconds
+                first_seen = {}
+                for held in self._held:
+                    first_seen.setdefault(held.group_id, held.sequence)
+                group_id = min(remaining, key=lambda g: (remaining[g], first_seen[g]))
+                in_group = [held for held in self._held if held.group_id == group_id]
+            return min(in_group, key=lambda h: (h.expected_seconds, h.sequence))
+
+        if self.policy == "group_fair":
+            served = {held.group_id: self._groups[held.group_id].served_seconds for held in self._held}
+            group_id = min(served, key=lambda g: (served[g], min(h.sequence for h in self._held if h.group_id == g)))
+            return min((held for held in self._held if held.group_id == group_id), key=lambda h: h.sequence)
+
+        return min(self._held, key=lambda h: h.sequence)
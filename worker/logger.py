@@ -1,59 +1,244 @@
 """
 Logging utilities for Runway Worker
 """
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
+from contextvars import ContextVar
 from pathlib import Path
-from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 
+from .metrics import DROPPED_RECORDS
 
-def setup_logger(log_dir: str, worker_id: str, log_level: int = logging.INFO) -> logging.Logger:
+# Per-task fields attached to every record (shown in JSON output)
+_log_context: ContextVar[Dict[str, Optional[str]]] = ContextVar("log_context", default={})
+CONTEXT_FIELDS = ("item_id", "model", "step")
+
+# Background listeners that write records off the calling thread
+_listeners: Dict[str, logging.handlers.QueueListener] = {}
+
+
+class ContextFilter(logging.Filter):
+    """Copy the current task context (item_id, model, step) onto each record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        context = _log_context.get()
+        for field in CONTEXT_FIELDS:
+            setattr(record, field, context.get(field))
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that drops records instead of blocking when the queue is full
+
+    Dropped records are counted in runway_worker_dropped_records_total{sink="log"}.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            DROPPED_RECORDS.inc(sink="log")
+
+
+def set_log_context(**fields):
+    """Set task context fields for subsequent log records (None removes a field)"""
+    context = dict(_log_context.get())
+    for key, value in fields.items():
+        if value is None:
+            context.pop(key, None)
+        else:
+            context[key] = value
+    _log_context.set(context)
+
+
+def clear_log_context():
+    """Remove all task context fields"""
+    _log_context.set({})
+
+
+def _build_formatter(log_format: str) -> logging.Formatter:
+    """Text formatter, or JSON (python-json-logger) carrying the context fields"""
+    if log_format == "json":
+        try:
+            from pythonjsonlogger import jsonlogger
+            return jsonlogger.JsonFormatter(
+                '%(asctime)s %(levelname)s %(name)s %(message)s %(item_id)s %(model)s %(step)s',
+                datefmt='%Y-%m-%dT%H:%M:%S%z'
+            )
+        except ImportError:
+            pass  # Fall back to text output
+
+    return logging.Formatter(
+        '%(asctime)s [%(levelname)s] [%(name)s] %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S'
+    )
+
+
+def _build_file_handler(log_path: Path, rotation: str, retention: int, max_bytes: int) -> logging.Handler:
+    """Rotating file handler: daily at midnight ("time") or by size ("size")"""
+    if rotation == "size":
+        return logging.handlers.RotatingFileHandler(
+            log_path, maxBytes=max_bytes, backupCount=retention, encoding='utf-8'
+        )
+    return logging.handlers.TimedRotatingFileHandler(
+        log_path, when="midnight", backupCount=retention, encoding='utf-8'
+    )
+
+
+def _build_output_handlers(log_dir: str, name: str, log_level: int, log_format: str,
+                           rotation: str, retention: int, max_bytes: int):
+    """Rotating file handler ({log_dir}/{name}.log) and stdout handler"""
+    Path(log_dir).mkdir(parents=True, exist_ok=True)
+
+    file_handler = _build_file_handler(Path(log_dir) / f"{name}.log", rotation, retention, max_bytes)
+    file_handler.setLevel(log_level)
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(log_level)
+
+    formatter = _build_formatter(log_format)
+    file_handler.setFormatter(formatter)
+    console_handler.setFormatter(formatter)
+    return file_handler, console_handler
+
+
+def start_log_sink(log_queue, log_dir: str, name: str, log_format: str = "text",
+                   rotation: str = "time", retention: int = 14,
+                   max_bytes: int = 50 * 1024 * 1024) -> logging.handlers.QueueListener:
+    """
+    Write records that other processes put on log_queue to one log file
+
+    Pool workers call setup_logger(..., log_queue=log_queue) so a single
+    process owns {log_dir}/{name}.log and its rotation. Handlers accept every
+    level; each worker's logger level decides what is sent.
+
+    Args:
+        log_queue: multiprocessing queue shared with the workers
+        log_dir: Directory to save log files
+        name: Log file name without extension
+    """
+    handlers = _build_output_handlers(log_dir, name, logging.NOTSET, log_format, rotation, retention, max_bytes)
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[f"sink:{name}"] = listener
+    return listener
+
+
+def setup_logger(log_dir: str, worker_id: str, log_level: int = logging.INFO,
+                 log_format: str = "text", rotation: str = "time", retention: int = 14,
+                 max_bytes: int = 50 * 1024 * 1024, queue_size: int = 10000,
+                 log_queue=None) -> logging.Logger:
     """
     Setup logger with file and console handlers
 
+    Records are put on an in-memory queue and written by a background
+    QueueListener, so log I/O never blocks the caller. If the queue is full
+    records are dropped rather than stalling the pipeline.
+
     Args:
         log_dir: Directory to save log files
         worker_id: Worker ID for log filename
         log_level: Logging level (default: INFO)
+        log_format: "text" or "json" (JSON needs python-json-logger)
+        rotation: "time" (daily at midnight) or "size" (every max_bytes)
+        retention: Number of rotated files to keep
+        max_bytes: Rotation size for rotation="size"
+        queue_size: Maximum records buffered before dropping
+        log_queue: Queue of a log sink in another process (see start_log_sink);
+            when given, records are sent there instead of to local handlers
 
     Returns:
         Configured logger instance
     """
-    # Create log directory
-    Path(log_dir).mkdir(parents=True, exist_ok=True)
-
     # Create logger
     logger = logging.getLogger(worker_id)
     logger.setLevel(log_level)
 
-    # Clear existing handlers
+    # Clear existing handlers (and stop the listener of a previous setup)
     logger.handlers.clear()
+    previous = _listeners.pop(worker_id, None)
+    if previous is not None:
+        previous.stop()
 
-    # File handler
-    log_filename = f"{worker_id}_{datetime.now().strftime('%Y%m%d')}.log"
-    log_path = Path(log_dir) / log_filename
+    if log_queue is not None:
+        queue_handler = NonBlockingQueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+        logger.addHandler(queue_handler)
+        return logger
 
-    file_handler = logging.FileHandler(log_path, encoding='utf-8')
-    file_handler.setLevel(log_level)
+    file_handler, console_handler = _build_output_handlers(
+        log_dir, worker_id, log_level, log_format, rotation, retention, max_bytes
+    )
 
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(log_level)
+    # Queue handler on the logger, real handlers on the listener thread
+    queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
 
-    # Formatter
-    formatter = logging.Formatter(
-        '%(asctime)s [%(levelname)s] [%(name)s] %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
+    listener = logging.handlers.QueueListener(
+        queue_handler.queue, file_handler, console_handler, respect_handler_level=True
     )
+    listener.start()
+    _listeners[worker_id] = listener
 
-    file_handler.setFormatter(formatter)
-    console_handler.setFormatter(formatter)
+    return logger
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
 
-    return logger
+def set_log_level(logger: logging.Logger, log_level: int):
+    """Change the level of a logger created by setup_logger and of its handlers"""
+    logger.setLevel(log_level)
+    listener = _listeners.get(logger.name)
+    if listener is not None:
+        for handler in listener.handlers:
+            handler.setLevel(log_level)
+
+
+@atexit.register
+def stop_log_listeners():
+    """Flush queued records and stop all listener threads"""
+    while _listeners:
+        _, listener = _listeners.popitem()
+        listener.stop()
+
+
+class RateLimitedLog:
+    """Emit a repetitive message at INFO at most once per interval, otherwise at DEBUG"""
+
+    def __init__(self, logger: logging.Logger, interval_seconds: float):
+        self.logger = logger
+        self.interval_seconds = interval_seconds
+        self._last_info_at: Optional[float] = None
+        self.suppressed = 0
+
+    def log(self, message: str, now: float):
+        """
+        Args:
+            message: Message to log
+            now: Current timestamp
+        """
+        if self._last_info_at is None or now - self._last_info_at >= self.interval_seconds:
+            if self.suppressed:
+                message = f"{message} ({self.suppressed} similar messages suppressed)"
+            self.logger.info(message)
+            self._last_info_at = now
+            self.suppressed = 0
+        else:
+            self.suppressed += 1
+            self.logger.debug(message)
+
+    def reset(self):
+        """Log the next message at INFO again (e.g. after activity)"""
+        self._last_info_at = None
+        self.suppressed = 0
 
 
 def log_task_start(logger: logging.Logger, item_id: str, group_id: str):
@@ -73,6 +258,7 @@ def log_task_complete(logger: logging.Logger, item_id: str, status: str):
 
 def log_step(logger: logging.Logger, step: int, message: str):
     """Log processing step"""
+    set_log_context(step=str(step))
     logger.info(f"[STEP {step}/6] {message}")
 
 
@@ -0,0 +1,392 @@
+"""
+Lightweight Prometheus-style metrics for Runway Worker
+
+Metrics are recorded in-process with a lock per metric, so recording from the
+worker thread costs a dict lookup and a few additions. The FastAPI server
+renders them in Prometheus text exposition format on GET /metrics.
+
+Registry.collect() returns the same data as plain lists, which is how worker
+processes in pool mode hand their metrics to the proxy process (see
+snapshots.py); families with the same name are merged when rendering.
+"""
+import time
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Default histogram buckets (seconds): covers fast API calls up to long generations
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+# A collector yields (name, type, help, [(labels, value), ...]) at render time
+Sample = Tuple[Dict[str, str], float]
+CollectorResult = Iterable[Tuple[str, str, str, List[Sample]]]
+
+# A family as returned by collect(): (name, type, help, [(sample name, labels, value), ...])
+Family = Tuple[str, str, str, List[Tuple[str, Dict[str, str], float]]]
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Render labels as {k="v",...}"""
+    if not labels:
+        return ""
+    parts = []
+    for key, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        parts.append(f'{key}="{escaped}"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Base class for labeled metrics"""
+
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self.samples()]
+
+
+class Counter(_Metric):
+    """Monotonically increasing counter"""
+
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, self._labels(k), v) for k, v in items]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down"""
+
+    type_name = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = list(self._values.items())
+        return [(self.name, self._labels(k), v) for k, v in items]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed buckets"""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [bucket counts..., sum, count]
+                state = [0] * len(self.buckets) + [0.0, 0]
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with-block (also on exceptions)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[Tuple[str, Dict[str, str], float]]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        samples = []
+        for key, state in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for i, bound in enumerate(self.buckets):
+                cumulative += state[i]
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, state[-1]))
+            samples.append((f"{self.name}_sum", labels, state[-2]))
+            samples.append((f"{self.name}_count", labels, state[-1]))
+        return samples
+
+
+class Registry:
+    """Holds metrics and render-time collectors"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], CollectorResult]] = []
+        self._sources: List[Callable[[], List[Family]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name: str, help_text: str, labelnames: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], CollectorResult]):
+        """Register a callback evaluated on every render (for values read on demand)"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def register_source(self, source: Callable[[], List[Family]]):
+        """Register a callback returning whole families (e.g. metrics of other processes)"""
+        with self._lock:
+            self._sources.append(source)
+
+    def collect(self, include_sources: bool = True) -> List[Family]:
+        """
+        Current value of every metric and collector as plain lists
+
+        Args:
+            include_sources: Also include families from register_source callbacks
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+            sources = list(self._sources) if include_sources else []
+
+        families: List[Family] = [
+            (metric.name, metric.type_name, metric.help_text, metric.samples()) for metric in metrics
+        ]
+        for collector in collectors:
+            try:
+                for name, type_name, help_text, samples in collector():
+                    families.append((name, type_name, help_text, [(name, labels, value) for labels, value in samples]))
+            except Exception:
+                continue  # A broken collector must never break the endpoint
+        for source in sources:
+            try:
+                families.extend(source())
+            except Exception:
+                continue
+        return families
+
+    def render(self) -> str:
+        """Render all metrics in Prometheus text exposition format"""
+        # Families with the same name (e.g. one per worker process) share one HELP/TYPE block
+        merged: Dict[str, list] = {}
+        for name, type_name, help_text, samples in self.collect():
+            if name in merged:
+                merged[name][2].extend(samples)
+            else:
+                merged[name] = [type_name, help_text, list(samples)]
+
+        lines = []
+        for name, (type_name, help_text, samples) in merged.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {type_name}")
+            for sample_name, labels, value in samples:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Worker pipeline
+STEP_DURATION = REGISTRY.histogram(
+    "runway_worker_step_duration_seconds",
+    "Duration of each pipeline step",
+    ("step", "model")
+)
+TASKS_IN_FLIGHT = REGISTRY.gauge(
+    "runway_worker_tasks_in_flight",
+    "Tasks currently being processed"
+)
+TASKS_TOTAL = REGISTRY.counter(
+    "runway_worker_tasks_total",
+    "Processed tasks by final status",
+    ("model", "status")
+)
+LEASE_EXTENSIONS = REGISTRY.counter(
+    "runway_worker_lease_extensions_total",
+    "Heartbeat lease extension attempts",
+    ("result",)
+)
+BYTES_TRANSFERRED = REGISTRY.counter(
+    "runway_worker_bytes_transferred_total",
+    "Bytes moved by file transfers",
+    ("operation",)
+)
+POLLS_TOTAL = REGISTRY.counter(
+    "runway_worker_polls_total",
+    "next-task polls by result",
+    ("result",)
+)
+POLLING_INTERVAL = REGISTRY.gauge(
+    "runway_worker_polling_interval_seconds",
+    "Current wait between next-task polls"
+)
+EXPECTED_PICKUP_LATENCY = REGISTRY.gauge(
+    "runway_worker_expected_pickup_latency_seconds",
+    "Expected delay between a task arriving and being leased at the current interval"
+)
+ARRIVAL_RATE = REGISTRY.gauge(
+    "runway_worker_estimated_arrival_rate_per_hour",
+    "Task arrival rate estimated by the polling model"
+)
+LOCAL_QUEUE_DEPTH = REGISTRY.gauge(
+    "runway_worker_local_queue_depth",
+    "Leased tasks held locally, waiting to be processed"
+)
+GROUP_COMPLETION = REGISTRY.histogram(
+    "runway_worker_group_completion_seconds",
+    "Time from a group's first local lease until its last local item finished",
+    ("policy",),
+    buckets=(30, 60, 120, 300, 600, 1200, 1800, 3600, 7200, 14400)
+)
+WORKSPACE_BYTES = REGISTRY.gauge(
+    "runway_worker_workspace_bytes",
+    "Bytes used or reserved by task files in the temp workspace"
+)
+PHOTO_CACHE_LOOKUPS = REGISTRY.counter(
+    "runway_worker_photo_cache_lookups_total",
+    "Input photo cache lookups by result",
+    ("result",)
+)
+RESULT_CACHE_LOOKUPS = REGISTRY.counter(
+    "runway_worker_result_cache_lookups_total",
+    "Generation result cache lookups by result",
+    ("result",)
+)
+RUNWAY_KEY_IN_FLIGHT = REGISTRY.gauge(
+    "runway_worker_runway_key_in_flight",
+    "Generations this worker is running per Runway API key",
+    ("key",)
+)
+RUNWAY_KEY_EVENTS = REGISTRY.counter(
+    "runway_worker_runway_key_events_total",
+    "Runway API key health events (throttled, rate_limited, no_credits, auth_failed)",
+    ("key", "event")
+)
+MODEL_FALLBACKS = REGISTRY.counter(
+    "runway_worker_model_fallbacks_total",
+    "Tasks generated with a fallback model because the requested one was degraded",
+    ("requested", "chosen")
+)
+DROPPED_RECORDS = REGISTRY.counter(
+    "runway_worker_dropped_records_total",
+    "Records dropped because a background writer's queue was full",
+    ("sink",)
+)
+
+# Aligo proxy
+PROXY_UPSTREAM_DURATION = REGISTRY.histogram(
+    "aligo_proxy_upstream_duration_seconds",
+    "Time until the Aligo upstream returned response headers",
+    ("kind", "status"),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+PROXY_QUEUE_WAIT = REGISTRY.histogram(
+    "aligo_proxy_queue_wait_seconds",
+    "Time spent waiting for an upstream slot",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+PROXY_REQUESTS = REGISTRY.counter(
+    "aligo_proxy_requests_total",
+    "Proxy requests by outcome",
+    ("outcome",)
+)
+
+
+def session_pool_collector(name: str, session_getter: Callable[[], Optional[object]]) -> Callable[[], CollectorResult]:
+    """
+    Build a collector reporting connection reuse of a requests.Session
+
+    urllib3 pools count every new connection (num_connections) and every
+    request (num_requests); their ratio shows how often keep-alive is reused.
+
+    Args:
+        name: Client label (e.g. "next_api")
+        session_getter: Returns the session to inspect (or None)
+    """
+    def collect() -> CollectorResult:
+        session = session_getter()
+        if session is None:
+            return []
+        opened = 0
+        requests_sent = 0
+        for adapter in session.adapters.values():
+            poolmanager = getattr(adapter, "poolmanager", None)
+            if poolmanager is None:
+                continue
+            for key in list(poolmanager.pools.keys()):
+                pool = poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                opened += pool.num_connections
+                requests_sent += pool.num_requests
+        labels = {"client": name}
+        return [
+            ("runway_worker_http_connections_opened", "gauge",
+             "Connections opened by live pools of the HTTP client", [(labels, opened)]),
+            ("runway_worker_http_requests_sent", "gauge",
+             "Requests sent through live pools of the HTTP client", [(labels, requests_sent)]),
+        ]
+
+    return collect
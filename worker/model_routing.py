@@ -0,0 +1,131 @@
+"""
+Latency-aware model fallback
+
+Each task names its model through inference_provider. When a model's Runway
+queue gets long (veo3.1 at peak times), its items wait a long time even
+though an equivalent model would take them right away. With model_fallbacks
+set, a task for a listed model is sent to its fallback while the requested
+model is degraded:
+
+    model_fallbacks: "veo3.1=veo3.1_fast, veo3=veo3.1_fast"
+
+A model is degraded when, over the last model_fallback_window_seconds and
+with at least model_fallback_min_samples generations, its mean queue wait
+(PENDING/THROTTLED before RUNNING) exceeds model_fallback_queue_seconds or
+its share of failed generations exceeds model_fallback_error_rate. The
+fallback is only used while it is not degraded itself.
+
+Once tasks go to the fallback the requested model gets no new samples, so
+its old ones age out of the window and the next task probes it again. The
+window is kept per worker process; pool workers decide independently.
+
+The model actually used is sent with the report (model, plus
+requested_model when it differs).
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+from .metrics import MODEL_FALLBACKS
+
+logger = logging.getLogger(__name__)
+
+RUNWAY_MODELS = ("gen4_turbo", "gen4.5_turbo", "gen3a_turbo", "veo3", "veo3.1", "veo3.1_fast")
+
+
+def parse_fallbacks(value: Optional[str]) -> Dict[str, str]:
+    """
+    "model=fallback" pairs, comma-separated
+
+    Raises:
+        ValueError on malformed pairs or unknown models
+    """
+    fallbacks: Dict[str, str] = {}
+    for entry in (value or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        model, sep, fallback = (part.strip() for part in entry.partition("="))
+        if not sep or not model or not fallback:
+            raise ValueError(f"expected model=fallback, got {entry!r}")
+        for name in (model, fallback):
+            if name not in RUNWAY_MODELS:
+                raise ValueError(f"unknown model {name!r}")
+        if model == fallback:
+            raise ValueError(f"{model} cannot fall back to itself")
+        fallbacks[model] = fallback
+    return fallbacks
+
+
+class ModelRouter:
+    """Recent queue waits and failures per model, and the fallback decision"""
+
+    def __init__(self, fallbacks: Dict[str, str], queue_seconds: float = 300,
+                 error_rate: float = 0.5, window_seconds: float = 900, min_samples: int = 3):
+        """
+        Args:
+            fallbacks: Requested model -> equivalent model (see parse_fallbacks)
+            queue_seconds: Mean queue wait above which a model is degraded (0 = ignore)
+            error_rate: Failure share above which a model is degraded (1 = ignore)
+            window_seconds: How far back generations count
+            min_samples: Fewer generations in the window never trigger a fallback
+        """
+        self.fallbacks = fallbacks
+        self.queue_seconds = queue_seconds
+        self.error_rate = error_rate
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        # model -> (finished_at, queue wait or None, failed)
+        self._samples: Dict[str, Deque[Tuple[float, Optional[float], bool]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, model: str, queue_seconds: Optional[float], failed: bool):
+        """Account one finished (or failed) generation"""
+        with self._lock:
+            self._samples.setdefault(model, deque()).append((time.monotonic(), queue_seconds, failed))
+
+    def stats(self, model: str) -> Tuple[int, Optional[float], float]:
+        """(samples, mean queue wait, failure share) within the window"""
+        cutoff = time.monotonic() - self.window_seconds
+        with self._lock:
+            samples = self._samples.get(model)
+            if not samples:
+                return 0, None, 0.0
+            while samples and samples[0][0] < cutoff:
+                samples.popleft()
+            waits = [wait for _, wait, _ in samples if wait is not None]
+            failed = sum(1 for _, _, failed in samples if failed)
+            count = len(samples)
+        return count, (sum(waits) / len(waits) if waits else None), (failed / count if count else 0.0)
+
+    def degraded(self, model: str) -> Optional[str]:
+        """Why a model should be avoided right now, or None"""
+        count, mean_wait, error_rate = self.stats(model)
+        if count < self.min_samples:
+            return None
+        if self.queue_seconds > 0 and mean_wait is not None and mean_wait > self.queue_seconds:
+            return f"mean queue wait {mean_wait:.0f}s > {self.queue_seconds:.0f}s over {count} generations"
+        if error_rate > self.error_rate:
+            return f"error rate {error_rate:.0%} > {self.error_rate:.0%} over {count} generations"
+        return None
+
+    def route(self, model: str) -> Tuple[str, Optional[str]]:
+        """
+        Model to generate with
+
+        Returns:
+            (model, reason): the fallback and why, or the requested model and None
+        """
+        fallback = self.fallbacks.get(model)
+        if fallback is None:
+            return model, None
+        reason = self.degraded(model)
+        if reason is None:
+            return model, None
+        if self.degraded(fallback) is not None:
+            logger.debug(f"{model} is degraded ({reason}) but so is {fallback}, keeping {model}")
+            return model, None
+        MODEL_FALLBACKS.inc(requested=model, chosen=fallback)
+        return fallback, reason
@@ -0,0 +1,168 @@
+"""
+On-disk cache of downloaded input photos
+
+Retries and several items of the same group often use the same
+photo_storage_path. Photos are kept under photo_cache_dir, keyed by storage
+path, so repeated work skips the presign call and the download (steps 1-2).
+
+Storage paths of uploaded photos are treated as immutable. A cached file is
+only used if it still has the size recorded at download time and, when the
+storage returned a plain MD5 ETag (single-part S3/R2 uploads), the same
+content hash; anything else is dropped and downloaded again. With
+photo_cache_revalidate the worker still presigns and sends If-None-Match,
+so a changed object is noticed and only the download is saved.
+
+Files are bounded by photo_cache_max_bytes and evicted least recently used
+first. Like the result cache, the index is a small SQLite file shared by
+pool workers.
+"""
+import hashlib
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .metrics import PHOTO_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS photos (
+    storage_path TEXT PRIMARY KEY,
+    file TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    fetched_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_photos_last_used ON photos (last_used);
+"""
+
+MD5_ETAG = re.compile(r"^[0-9a-f]{32}$")
+
+
+@dataclass
+class CachedPhoto:
+    """A validated cache entry"""
+    storage_path: str
+    path: Path
+    size: int
+    etag: Optional[str]
+
+
+class PhotoCache:
+    """Input photos by storage path, with size/ETag validation and LRU eviction"""
+
+    def __init__(self, directory: str, max_bytes: int = 1024 ** 3):
+        """
+        Args:
+            directory: Cache directory (index.db plus photo files)
+            max_bytes: Upper bound for cached photos
+        """
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.db_path = self.directory / "index.db"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def _file_name(storage_path: str) -> str:
+        return hashlib.sha256(storage_path.encode("utf-8")).hexdigest() + Path(storage_path).suffix.lower()
+
+    @staticmethod
+    def _valid(path: Path, size: int, etag: Optional[str]) -> bool:
+        try:
+            if path.stat().st_size != size:
+                return False
+        except OSError:
+            return False
+        normalized = (etag or "").strip('"').lower()
+        if MD5_ETAG.match(normalized):
+            digest = hashlib.md5()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            return digest.hexdigest() == normalized
+        return True
+
+    def lookup(self, storage_path: str) -> Optional[CachedPhoto]:
+        """Validated entry for a storage path (invalid entries are dropped)"""
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT file, size, etag FROM photos WHERE storage_path = ?", (storage_path,)
+                ).fetchone()
+                if row is None:
+                    PHOTO_CACHE_LOOKUPS.inc(result="miss")
+                    return None
+                file, size, etag = row
+                path = self.directory / file
+                if not self._valid(path, size, etag):
+                    logger.warning(f"Cached photo for {storage_path} failed validation, downloading again")
+                    conn.execute("DELETE FROM photos WHERE storage_path = ?", (storage_path,))
+                    path.unlink(missing_ok=True)
+                    PHOTO_CACHE_LOOKUPS.inc(result="invalid")
+                    return None
+                conn.execute("UPDATE photos SET last_used = ? WHERE storage_path = ?", (time.time(), storage_path))
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Photo cache lookup failed: {e}")
+            return None
+        PHOTO_CACHE_LOOKUPS.inc(result="hit")
+        return CachedPhoto(storage_path, path, size, etag)
+
+    def copy_to(self, photo: CachedPhoto, dest_path: str) -> bool:
+        """Copy a cached photo into the task workspace (False if it vanished meanwhile)"""
+        try:
+            Path(dest_path).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(photo.path, dest_path)
+            return True
+        except OSError as e:
+            logger.warning(f"Cached photo {photo.path} unavailable: {e}")
+            return False
+
+    def put(self, storage_path: str, src_path: str, etag: Optional[str] = None):
+        """Keep a freshly downloaded photo"""
+        file = self._file_name(storage_path)
+        tmp_path = self.directory / f"{file}.{os.getpid()}.tmp"
+        try:
+            shutil.copyfile(src_path, tmp_path)
+            tmp_path.replace(self.directory / file)
+            size = (self.directory / file).stat().st_size
+            now = time.time()
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO photos (storage_path, file, size, etag, fetched_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (storage_path, file, size, etag, now, now)
+                )
+            self.evict()
+        except (OSError, sqlite3.Error) as e:
+            tmp_path.unlink(missing_ok=True)
+            logger.warning(f"Failed to cache input photo {storage_path}: {e}")
+
+    def evict(self):
+        """Delete least recently used photos until they fit in max_bytes"""
+        with closing(self._connect()) as conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM photos").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            for storage_path, file, size in conn.execute(
+                "SELECT storage_path, file, size FROM photos ORDER BY last_used"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                (self.directory / file).unlink(missing_ok=True)
+                conn.execute("DELETE FROM photos WHERE storage_path = ?", (storage_path,))
+                total -= size
@@ -0,0 +1,169 @@
+"""
+Arrival-rate-aware polling interval
+
+Models how often tasks arrive from two sources and polls accordingly:
+- recent inter-arrival times (EWMA of gaps between leased tasks), which fade
+  as the silence since the last task grows
+- hour-of-day buckets of arrivals per observed second, decayed over days so
+  daily patterns are learned but old habits fade
+
+The interval is target_fraction / rate, clamped to [min_interval,
+max_interval], with random jitter once the queue is quiet so several workers
+do not poll in lockstep. The model is persisted as JSON so restarts do not
+throw the learned daily pattern away.
+"""
+import json
+import math
+import random
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+class ArrivalRatePolicy:
+    """Chooses the next polling interval from a model of task arrivals"""
+
+    def __init__(
+        self,
+        min_interval: float = 5.0,
+        max_interval: float = 60.0,
+        target_fraction: float = 0.2,
+        jitter: float = 0.2,
+        gap_smoothing: float = 0.3,
+        bucket_half_life_days: float = 7.0,
+        state_path: Optional[str] = None
+    ):
+        """
+        Args:
+            min_interval: Shortest polling interval in seconds
+            max_interval: Longest polling interval in seconds
+            target_fraction: Poll every this fraction of the expected gap between arrivals
+            jitter: Random +/- fraction applied to intervals above min_interval
+            gap_smoothing: EWMA weight of the newest inter-arrival gap
+            bucket_half_life_days: Half-life of the hour-of-day statistics
+            state_path: JSON file the model is loaded from and saved to (optional)
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_fraction = target_fraction
+        self.jitter = jitter
+        self.gap_smoothing = gap_smoothing
+        self.bucket_half_life = bucket_half_life_days * 86400
+        self.state_path = Path(state_path) if state_path else None
+
+        self.last_arrival_at: Optional[float] = None
+        self.gap_ewma: Optional[float] = None
+        # Per hour of day: decayed arrival count and observed seconds
+        self.bucket_arrivals = [0.0] * 24
+        self.bucket_exposure = [0.0] * 24
+        self.bucket_updated_at = [0.0] * 24
+        self._last_observed_at: Optional[float] = None
+
+        self.load()
+
+    def observe_poll(self, got_task: bool, now: Optional[float] = None):
+        """
+        Feed one poll result into the model
+
+        Args:
+            got_task: True if the poll returned a task
+            now: Timestamp (defaults to time.time())
+        """
+        now = now or time.time()
+        hour = datetime.fromtimestamp(now).hour
+
+        # Time since the previous poll counts as observed time for this hour
+        if self._last_observed_at is not None:
+            elapsed = min(now - self._last_observed_at, self.max_interval * 2)
+            self._decay_bucket(hour, now)
+            self.bucket_exposure[hour] += max(0.0, elapsed)
+        self._last_observed_at = now
+
+        if not got_task:
+            return
+
+        self._decay_bucket(hour, now)
+        self.bucket_arrivals[hour] += 1
+
+        if self.last_arrival_at is not None:
+            gap = max(1.0, now - self.last_arrival_at)
+            if self.gap_ewma is None:
+                self.gap_ewma = gap
+            else:
+                self.gap_ewma = self.gap_smoothing * gap + (1 - self.gap_smoothing) * self.gap_ewma
+        self.last_arrival_at = now
+
+    def arrival_rate(self, now: Optional[float] = None) -> float:
+        """Estimated arrivals per second right now"""
+        now = now or time.time()
+
+        recent_rate = 0.0
+        if self.gap_ewma is not None and self.last_arrival_at is not None:
+            # The longer it has been quiet, the less the recent gap is trusted
+            recent_rate = 1.0 / max(self.gap_ewma, now - self.last_arrival_at)
+
+        hour = datetime.fromtimestamp(now).hour
+        bucket_rate = 0.0
+        if self.bucket_exposure[hour] >= 600:  # need ~10 minutes of data for this hour
+            bucket_rate = self.bucket_arrivals[hour] / self.bucket_exposure[hour]
+
+        return max(recent_rate, bucket_rate)
+
+    def next_interval(self, now: Optional[float] = None) -> float:
+        """Polling interval in seconds for the next wait"""
+        rate = self.arrival_rate(now)
+        if rate <= 0:
+            interval = self.max_interval
+        else:
+            interval = self.target_fraction / rate
+        interval = max(self.min_interval, min(self.max_interval, interval))
+
+        if interval > self.min_interval and self.jitter > 0:
+            interval *= 1 + random.uniform(-self.jitter, self.jitter)
+            interval = max(self.min_interval, min(self.max_interval, interval))
+        return round(interval, 1)
+
+    def _decay_bucket(self, hour: int, now: float):
+        last = self.bucket_updated_at[hour]
+        if last and now > last:
+            factor = math.pow(0.5, (now - last) / self.bucket_half_life)
+            self.bucket_arrivals[hour] *= factor
+            self.bucket_exposure[hour] *= factor
+        self.bucket_updated_at[hour] = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "last_arrival_at": self.last_arrival_at,
+            "gap_ewma": self.gap_ewma,
+            "bucket_arrivals": self.bucket_arrivals,
+            "bucket_exposure": self.bucket_exposure,
+            "bucket_updated_at": self.bucket_updated_at,
+        }
+
+    def load(self):
+        """Restore the model from state_path if present (a corrupt file is ignored)"""
+        if not self.state_path or not self.state_path.exists():
+            return
+        try:
+            data = json.loads(self.state_path.read_text(encoding="utf-8"))
+            self.last_arrival_at = data.get("last_arrival_at")
+            self.gap_ewma = data.get("gap_ewma")
+            for key in ("bucket_arrivals", "bucket_exposure", "bucket_updated_at"):
+                values = data.get(key)
+                if isinstance(values, list) and len(values) == 24:
+                    setattr(self, key, [float(v) for v in values])
+        except (OSError, ValueError, TypeError):
+            pass
+
+    def save(self):
+        """Persist the model to state_path (atomic replace)"""
+        if not self.state_path:
+            return
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.state_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self.to_dict()), encoding="utf-8")
+            tmp_path.replace(self.state_path)
+        except OSError:
+            pass
@@ -0,0 +1,213 @@
+"""
+Opt-in profiling of the worker's hot paths
+
+Everything here is off by default and writes under {log_dir}/profiles:
+
+- Per-task cProfile: a sampled fraction of tasks (profile_task_sample_rate)
+  is run under cProfile; task_{item_id}_{time}.prof can be opened with
+  snakeviz/pstats, and a .txt next to it lists the top functions by
+  cumulative time. cProfile only sees the thread running the task.
+- tracemalloc between tasks (tracemalloc_enabled): after each task the
+  current allocations are compared with the first snapshot and the growth
+  by source line is appended to tracemalloc_{worker_id}.log, which shows
+  leaks in the long-running loop.
+- On demand (SIGUSR1 or POST /debug/profile): stacks of all threads are
+  written to stacks_{name}_{time}.txt, then every thread is sampled for
+  sample_seconds and the folded stacks go to sample_{name}_{time}.folded
+  (flamegraph.pl / speedscope format). Sampling uses sys._current_frames(), so it covers
+  every thread including the scheduler, log writer and SDK polling.
+"""
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import signal
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler:
+    """Task profiles, allocation tracking and on-demand stack sampling for one process"""
+
+    def __init__(self):
+        self.output_dir: Optional[Path] = None
+        self.name = "worker"
+        self.task_sample_rate = 0.0
+        self.sample_seconds = 30.0
+        self.sample_interval = 0.01
+        self.tracemalloc_top = 25
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._tasks_seen = 0
+        self._sampling = threading.Lock()
+
+    def configure(self, output_dir: str, name: str = "worker", task_sample_rate: float = 0.0,
+                  tracemalloc_enabled: bool = False, sample_seconds: float = 30.0):
+        """
+        Set where profiles go and which hooks are active
+
+        Args:
+            output_dir: Directory for profile files (created on first write)
+            name: Label for per-process files (worker_id)
+            task_sample_rate: Fraction of tasks run under cProfile (0 = off)
+            tracemalloc_enabled: Track allocations and log growth between tasks
+            sample_seconds: Default length of an on-demand sampling profile
+        """
+        self.output_dir = Path(output_dir)
+        self.name = name
+        self.task_sample_rate = task_sample_rate
+        self.sample_seconds = sample_seconds
+        if tracemalloc_enabled and not tracemalloc.is_tracing():
+            # 10 frames keeps the overhead moderate while still pointing past wrappers
+            tracemalloc.start(10)
+            self._baseline = tracemalloc.take_snapshot()
+
+    def _path(self, filename: str) -> Path:
+        directory = self.output_dir or Path("logs") / "profiles"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory / filename
+
+    @staticmethod
+    def _stamp() -> str:
+        return datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    @contextmanager
+    def task(self, item_id: str):
+        """Run the enclosed task under cProfile if it is sampled"""
+        if self.task_sample_rate <= 0 or random.random() >= self.task_sample_rate:
+            yield
+            return
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active in this thread
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            try:
+                self._write_task_profile(profile, item_id)
+            except OSError as e:
+                logger.warning(f"Failed to write task profile for {item_id}: {e}")
+
+    def _write_task_profile(self, profile: cProfile.Profile, item_id: str):
+        path = self._path(f"task_{item_id}_{self._stamp()}.prof")
+        profile.dump_stats(str(path))
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(40)
+        path.with_suffix(".txt").write_text(text.getvalue(), encoding="utf-8")
+        logger.info(f"Task profile written: {path}")
+
+    def after_task(self):
+        """Log allocation growth since the first snapshot (no-op unless tracemalloc is on)"""
+        if self._baseline is None or not tracemalloc.is_tracing():
+            return
+        self._tasks_seen += 1
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        stats = snapshot.compare_to(self._baseline, "lineno")[:self.tracemalloc_top]
+        lines = [f"=== {datetime.now().isoformat(timespec='seconds')} after task {self._tasks_seen}: "
+                 f"traced {current / 1024 / 1024:.1f} MiB (peak {peak / 1024 / 1024:.1f} MiB)"]
+        lines += [f"  {stat}" for stat in stats if stat.size_diff > 0]
+        try:
+            with open(self._path(f"tracemalloc_{self.name}.log"), "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            logger.warning(f"Failed to write tracemalloc report: {e}")
+
+    def dump_stacks(self) -> Path:
+        """Write the current stack of every thread"""
+        frames = sys._current_frames()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        parts = [f"pid {os.getpid()} at {datetime.now().isoformat(timespec='seconds')}\n"]
+        for ident, frame in frames.items():
+            parts.append(f"\n--- Thread {names.get(ident, '?')} ({ident}) ---\n")
+            parts.extend(traceback.format_stack(frame))
+        path = self._path(f"stacks_{self.name}_{self._stamp()}.txt")
+        path.write_text("".join(parts), encoding="utf-8")
+        return path
+
+    def sample(self, seconds: Optional[float] = None) -> Optional[Path]:
+        """
+        Sample every thread's stack for a while and write folded stacks
+
+        Returns:
+            Output path, or None if a sampling run is already in progress
+        """
+        if not self._sampling.acquire(blocking=False):
+            return None
+        try:
+            seconds = seconds or self.sample_seconds
+            me = threading.get_ident()
+            counts: Counter = Counter()
+            deadline = time.monotonic() + seconds
+            samples = 0
+            while time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})")
+                        frame = frame.f_back
+                    counts[";".join([names.get(ident, str(ident))] + stack[::-1])] += 1
+                samples += 1
+                time.sleep(self.sample_interval)
+
+            path = self._path(f"sample_{self.name}_{self._stamp()}.folded")
+            path.write_text("".join(f"{stack} {count}\n" for stack, count in counts.most_common()),
+                            encoding="utf-8")
+            logger.info(f"Sampling profile written: {path} ({samples} samples over {seconds:.0f}s)")
+            return path
+        finally:
+            self._sampling.release()
+
+    def trigger(self, seconds: Optional[float] = None) -> bool:
+        """
+        Dump stacks and run a sampling profile in a background thread
+
+        Safe to call from a signal handler: no file I/O happens on the caller.
+
+        Returns:
+            False if a sampling run is already in progress
+        """
+        if self._sampling.locked():
+            return False
+        threading.Thread(target=self._dump_and_sample, args=(seconds,), name="profile-sampler",
+                         daemon=True).start()
+        return True
+
+    def _dump_and_sample(self, seconds: Optional[float]):
+        try:
+            logger.info(f"Thread stacks written: {self.dump_stacks()}")
+            self.sample(seconds)
+        except OSError as e:
+            logger.warning(f"Failed to write profile: {e}")
+
+    def install_signal_handler(self):
+        """Trigger a dump and sampling run on SIGUSR1 (no-op where it does not exist)"""
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.trigger())
+
+
+PROFILER = Profiler()
@@ -0,0 +1,229 @@
+"""
+Generation result cache
+
+Identical requests (same input image bytes, prompt, model, duration and
+ratio) are common: users re-submit a photo with the same prompt, and a task
+whose report failed is retried from the start. With the cache on, the
+second request reuses the first result instead of paying Runway again.
+
+Two modes (result_cache_mode):
+
+- "local": the generated MP4 is kept under the cache directory and copied
+  into the next identical task, which then uploads it to its own storage
+  path. Local files are bounded by result_cache_max_bytes and evicted
+  least recently used first.
+- "storage_path": no video is kept locally; the next identical task reports
+  the storage path the first one uploaded to (no generation, no upload).
+  Both items then point at the same object, so deleting one item's video in
+  the app also removes the other's.
+
+Entries older than result_cache_ttl_days are dropped by compact(). The index
+is a small SQLite file next to the videos; every call opens its own short
+connection, so pool workers sharing the directory see each other's results.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .metrics import RESULT_CACHE_LOOKUPS
+from .tracing import TRACER
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    runway_task_id TEXT,
+    storage_path TEXT,
+    local_file TEXT,
+    local_bytes INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_last_used ON results (last_used);
+"""
+
+
+@dataclass
+class CachedResult:
+    """A reusable earlier generation"""
+    key: str
+    runway_task_id: Optional[str]
+    storage_path: Optional[str]
+
+
+class ResultCache:
+    """Content-addressed index of finished generations"""
+
+    def __init__(self, directory: str, mode: str = "local", max_bytes: int = 2 * 1024 ** 3,
+                 ttl_days: float = 7):
+        """
+        Args:
+            directory: Cache directory (index.db plus retained videos)
+            mode: "local" or "storage_path" (see module docstring)
+            max_bytes: Upper bound for retained videos in local mode
+            ttl_days: Entries older than this are not reused
+        """
+        if mode not in ("local", "storage_path"):
+            raise ValueError(f"Unsupported result cache mode: {mode}")
+        self.directory = Path(directory)
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.ttl_days = ttl_days
+        self.db_path = self.directory / "index.db"
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def key_for(image_path: str, prompt: str, model: str, duration: float, ratio: str) -> str:
+        """Cache key of a request: SHA-256 over the image bytes and the generation parameters"""
+        digest = hashlib.sha256()
+        with open(image_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        params = json.dumps([digest.hexdigest(), prompt or "", model, round(float(duration), 3), ratio],
+                            ensure_ascii=False)
+        return hashlib.sha256(params.encode("utf-8")).hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return time.time() - created_at > self.ttl_days * 86400
+
+    def fetch(self, key: str, output_path: str) -> Optional[CachedResult]:
+        """
+        Look up a request and make its result available
+
+        In local mode the retained video is copied to output_path; in
+        storage_path mode the returned storage_path is the result.
+
+        Returns:
+            CachedResult on a hit, None on a miss
+        """
+        try:
+            with TRACER.span("result_cache.fetch"):
+                result = self._fetch(key, output_path)
+        except sqlite3.Error as e:
+            logger.warning(f"Result cache lookup failed, generating normally: {e}")
+            result = None
+        RESULT_CACHE_LOOKUPS.inc(result="hit" if result is not None else "miss")
+        return result
+
+    def _fetch(self, key: str, output_path: str) -> Optional[CachedResult]:
+        with closing(self._connect()) as conn:
+            row = conn.execute(
+                "SELECT runway_task_id, storage_path, local_file, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            runway_task_id, storage_path, local_file, created_at = row
+            if self._expired(created_at):
+                return None
+
+            if self.mode == "storage_path":
+                if not storage_path:
+                    return None
+                result = CachedResult(key, runway_task_id, storage_path)
+            else:
+                if not local_file:
+                    return None
+                try:
+                    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(self.directory / local_file, output_path)
+                except OSError as e:
+                    # Evicted by another worker in between, or the disk is full
+                    logger.warning(f"Cached video {local_file} unavailable: {e}")
+                    return None
+                result = CachedResult(key, runway_task_id, None)
+
+            conn.execute("UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key))
+            return result
+
+    def store_video(self, key: str, video_path: str, model: str, runway_task_id: Optional[str]):
+        """Record a finished generation (local mode keeps a copy of the video)"""
+        local_file, local_bytes = None, 0
+        if self.mode == "local":
+            local_file = f"{key}.mp4"
+            tmp_path = self.directory / f"{key}.{os.getpid()}.tmp"
+            try:
+                shutil.copyfile(video_path, tmp_path)
+                tmp_path.replace(self.directory / local_file)
+                local_bytes = (self.directory / local_file).stat().st_size
+            except OSError as e:
+                tmp_path.unlink(missing_ok=True)
+                logger.warning(f"Failed to retain generated video in the result cache: {e}")
+                return
+
+        now = time.time()
+        try:
+            with closing(self._connect()) as conn:
+                conn.execute(
+                    "INSERT INTO results (key, model, runway_task_id, local_file, local_bytes, created_at, last_used) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET model = excluded.model, runway_task_id = excluded.runway_task_id, "
+                    "storage_path = NULL, local_file = excluded.local_file, local_bytes = excluded.local_bytes, "
+                    "created_at = excluded.created_at, last_used = excluded.last_used",
+                    (key, model, runway_task_id, local_file, local_bytes, now, now)
+                )
+            if local_file:
+                self.evict()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Failed to record generation in the result cache: {e}")
+
+    def store_storage_path(self, key: str, storage_path: str):
+        """Record where the result of a stored generation was uploaded"""
+        try:
+            with closing(self._connect()) as conn:
+                conn.execute("UPDATE results SET storage_path = ? WHERE key = ?", (storage_path, key))
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to record storage path in the result cache: {e}")
+
+    def evict(self):
+        """Delete least recently used local videos until they fit in max_bytes"""
+        with closing(self._connect()) as conn:
+            total = conn.execute("SELECT COALESCE(SUM(local_bytes), 0) FROM results").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = conn.execute(
+                "SELECT key, local_file, local_bytes FROM results WHERE local_file IS NOT NULL ORDER BY last_used"
+            ).fetchall()
+            for key, local_file, local_bytes in rows:
+                if total <= self.max_bytes:
+                    break
+                (self.directory / local_file).unlink(missing_ok=True)
+                conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                total -= local_bytes
+                logger.debug(f"Evicted cached video {local_file} ({local_bytes} bytes)")
+
+    def compact(self):
+        """Drop expired entries, their videos, and files the index no longer knows (scheduler job)"""
+        cutoff = time.time() - self.ttl_days * 86400
+        try:
+            with closing(self._connect()) as conn:
+                for key, local_file in conn.execute(
+                    "SELECT key, local_file FROM results WHERE created_at < ?", (cutoff,)
+                ).fetchall():
+                    if local_file:
+                        (self.directory / local_file).unlink(missing_ok=True)
+                    conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                known = {row[0] for row in conn.execute("SELECT local_file FROM results WHERE local_file IS NOT NULL")}
+            # Leave recent files alone: another worker may be between writing and indexing one
+            for path in list(self.directory.glob("*.mp4")) + list(self.directory.glob("*.tmp")):
+                if path.name not in known and time.time() - path.stat().st_mtime > 3600:
+                    path.unlink(missing_ok=True)
+            self.evict()
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"Result cache compaction failed: {e}")
@@ -2,16 +2,38 @@
 Runway ML API Client for I2V Generation (using official SDK)
 """
 import base64
+import time
 import requests
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional
-from runwayml import RunwayML
+from typing import Callable, Optional
+
+from .metrics import STEP_DURATION, BYTES_TRANSFERRED
+from .runway_keys import RunwayKey, RunwayKeyPool
+from .tracing import TRACER
+
+DEFAULT_BASE_URL = "https://api.dev.runwayml.com"
+
+# Runway task statuses
+WAITING_STATUSES = ("PENDING", "THROTTLED")
+FAILED_STATUSES = ("FAILED", "CANCELLED")
+
+
+class GenerationInterrupted(Exception):
+    """Raised when polling a Runway task is abandoned (worker drain); the task keeps running"""
+
+    def __init__(self, task_id: str, key_label: Optional[str] = None):
+        super().__init__(f"Stopped waiting for Runway task {task_id}")
+        self.task_id = task_id
+        self.key_label = key_label
 
 
 class RunwayClient:
     """Client for Runway ML Gen-4 / Veo 3.1 API (using official SDK)"""
 
-    def __init__(self, api_key: str, model: str = "gen4_turbo", timeout: int = 600):
+    def __init__(self, api_key: str, model: str = "gen4_turbo", timeout: int = 600,
+                 poll_interval: float = 5.0, base_url: Optional[str] = None,
+                 key_pool: Optional[RunwayKeyPool] = None):
         """
         Initialize Runway client
 
@@ -19,19 +41,49 @@ class RunwayClient:
             api_key: Runway API key
             model: Model name ('gen4_turbo', 'gen4.5_turbo', 'gen3a_turbo', 'veo3', 'veo3.1', 'veo3.1_fast')
             timeout: Task completion timeout in seconds
+            poll_interval: Seconds between task status checks
+            base_url: API base URL (defaults to Runway's; a local fake for load tests)
+            key_pool: Several keys to spread generations over (defaults to api_key alone)
         """
         self.api_key = api_key
+        self.keys = key_pool or RunwayKeyPool([(api_key, 1)])
         self.model = model
         self.timeout = timeout
-        self.client = RunwayML(api_key=api_key)
-        self.upload_url = "https://api.dev.runwayml.com/v1/uploads"
-
-    def upload_image(self, image_path: str) -> str:
+        self.poll_interval = poll_interval
+        self.base_url = (base_url or DEFAULT_BASE_URL).rstrip("/")
+        self.upload_url = f"{self.base_url}/v1/uploads"
+
+    @property
+    def client(self):
+        """SDK client of the primary key"""
+        return self._client_for(self.keys.keys[0])
+
+    @contextmanager
+    def _api_call(self, key: RunwayKey, task_id: Optional[str] = None):
+        """Feed errors of a Runway API call authenticated with key into the key's health"""
+        try:
+            yield
+        except Exception as e:
+            self.keys.record_error(key, e, task_id)
+            raise
+
+    def _client_for(self, key: RunwayKey):
+        """SDK client of a key, created on first use so importing runwayml does not delay startup"""
+        if key.client is None:
+            from runwayml import RunwayML
+            key.client = RunwayML(api_key=key.api_key, base_url=self.base_url)
+        return key.client
+
+    def upload_image(self, image_path: str, model: Optional[str] = None,
+                     key: Optional[RunwayKey] = None) -> str:
         """
         Upload image to Runway's ephemeral storage
 
         Args:
             image_path: Path to local image file
+            model: Model label for metrics (defaults to client model)
+            key: Account to upload to; the task using the URI must be created
+                with the same key (defaults to the primary key)
 
         Returns:
             runway:// URI for the uploaded image
@@ -45,17 +97,26 @@ class RunwayClient:
         filename = Path(image_path).name
 
         try:
-            # Step 1: Request upload URL
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "X-Runway-Version": "2024-11-06",
-                "Content-Type": "application/json"
-            }
-            payload = {
-                "filename": filename,
-                "type": "ephemeral"
-            }
+            with TRACER.span("runway.upload"), STEP_DURATION.time(step="runway_upload", model=model or self.model):
+                return self._upload_image(image_path, filename, key or self.keys.keys[0])
+
+        except Exception as e:
+            raise Exception(f"Runway image upload failed: {str(e)}")
+
+    def _upload_image(self, image_path: str, filename: str, key: RunwayKey) -> str:
+        """Request an ephemeral upload slot and post the file to it"""
+        # Step 1: Request upload URL
+        headers = {
+            "Authorization": f"Bearer {key.api_key}",
+            "X-Runway-Version": "2024-11-06",
+            "Content-Type": "application/json"
+        }
+        payload = {
+            "filename": filename,
+            "type": "ephemeral"
+        }
 
+        with TRACER.span("http.runway_upload_slot"), self._api_call(key):
             response = requests.post(
                 self.upload_url,
                 json=payload,
@@ -63,27 +124,26 @@ class RunwayClient:
                 timeout=30
             )
             response.raise_for_status()
-            upload_data = response.json()
-
-            upload_url = upload_data["uploadUrl"]
-            fields = upload_data["fields"]
-            runway_uri = upload_data["runwayUri"]
-
-            # Step 2: Upload file using multipart form data
-            with open(image_path, 'rb') as f:
-                files = {'file': (filename, f)}
-                upload_response = requests.post(
-                    upload_url,
-                    data=fields,
-                    files=files,
-                    timeout=60
-                )
-                upload_response.raise_for_status()
+        upload_data = response.json()
+
+        upload_url = upload_data["uploadUrl"]
+        fields = upload_data["fields"]
+        runway_uri = upload_data["runwayUri"]
+
+        # Step 2: Upload file using multipart form data
+        size = Path(image_path).stat().st_size
+        with TRACER.span("http.runway_upload_post", bytes=size), open(image_path, 'rb') as f:
+            files = {'file': (filename, f)}
+            upload_response = requests.post(
+                upload_url,
+                data=fields,
+                files=files,
+                timeout=60
+            )
+            upload_response.raise_for_status()
 
-            return runway_uri
-
-        except Exception as e:
-            raise Exception(f"Runway image upload failed: {str(e)}")
+        BYTES_TRANSFERRED.inc(size, operation="runway_upload")
+        return runway_uri
 
     def generate_video(
         self,
@@ -92,7 +152,10 @@ class RunwayClient:
         prompt: str,
         duration: float = 5.0,
         ratio: str = "1280:720",
-        model_override: Optional[str] = None
+        model_override: Optional[str] = None,
+        on_task_created: Optional[Callable[[str], None]] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        on_queue_wait: Optional[Callable[[float], None]] = None
     ) -> str:
         """
         Generate video from image using Runway I2V
@@ -104,11 +167,17 @@ class RunwayClient:
             duration: Video duration in seconds (2-10)
             ratio: Video ratio (e.g., "1280:720")
             model_override: Override default model
+            on_task_created: Called with the Runway task ID once the task exists
+            should_stop: Checked between status polls; when it returns True
+                polling stops with GenerationInterrupted (see resume_video)
+            on_queue_wait: Called with the seconds the task was PENDING/THROTTLED
+                once it leaves the queue
 
         Returns:
             Path to generated video file
 
         Raises:
+            GenerationInterrupted if should_stop asked to stop waiting
             Exception if generation fails
         """
         # Validate input file
@@ -118,32 +187,174 @@ class RunwayClient:
         # Ensure output directory exists
         Path(output_video_path).parent.mkdir(parents=True, exist_ok=True)
 
-        # Upload image to Runway and get runway:// URI
-        runway_uri = self.upload_image(input_image_path)
-
         # Use model override if provided
         model = model_override or self.model
 
-        # Create I2V task and wait for completion using SDK
+        # Least loaded healthy account; upload and task must use the same one
+        key = self.keys.acquire()
+        task_id = None
         try:
-            task = self.client.image_to_video.create(
-                model=model,
-                prompt_image=runway_uri,  # Use runway:// URI from upload
-                prompt_text=prompt,
-                duration=int(duration),
-                ratio=ratio
-            ).wait_for_task_output()
-
-            # Get video URL from task output
-            video_url = task.output[0]
-
-            # Download video
-            self._download_video(video_url, output_video_path)
+            # Upload image to Runway and get runway:// URI
+            runway_uri = self.upload_image(input_image_path, model=model, key=key)
+
+            # Create I2V task and poll until it finishes
+            try:
+                with TRACER.span("http.runway_create_task", key=key.label), self._api_call(key):
+                    created = self._client_for(key).image_to_video.create(
+                        model=model,
+                        prompt_image=runway_uri,  # Use runway:// URI from upload
+                        prompt_text=prompt,
+                        duration=int(duration),
+                        ratio=ratio
+                    )
+                task_id = created.id
+                self.keys.bind(task_id, key)
+                if on_task_created:
+                    on_task_created(task_id)
+
+                result = self._finish_task(task_id, output_video_path, model, should_stop, key, on_queue_wait)
+                self.keys.unbind(task_id)
+                return result
+
+            except GenerationInterrupted:
+                raise
+            except Exception as e:
+                if task_id:
+                    self.keys.unbind(task_id)
+                raise Exception(f"Runway video generation failed: {str(e)}")
+        finally:
+            self.keys.release(key)
+
+    def resume_video(self, task_id: str, output_video_path: str, model: Optional[str] = None,
+                     should_stop: Optional[Callable[[], bool]] = None,
+                     key_label: Optional[str] = None) -> str:
+        """
+        Wait for an existing Runway task and download its video
 
-            return output_video_path
+        Used for tasks created before a worker restart, so the generation is
+        not paid for twice.
 
+        Args:
+            task_id: Runway task ID returned when the task was created
+            output_video_path: Path where output video will be saved
+            model: Model label for metrics (defaults to client model)
+            should_stop: See generate_video
+            key_label: Label of the key that created the task (from the checkpoint)
+
+        Returns:
+            Path to generated video file
+        """
+        Path(output_video_path).parent.mkdir(parents=True, exist_ok=True)
+        key = self.keys.acquire(self.keys.key_for(task_id, key_label))
+        try:
+            result = self._finish_task(task_id, output_video_path, model or self.model, should_stop, key)
+            self.keys.unbind(task_id)
+            return result
+        except GenerationInterrupted:
+            raise
         except Exception as e:
+            self.keys.unbind(task_id)
             raise Exception(f"Runway video generation failed: {str(e)}")
+        finally:
+            self.keys.release(key)
+
+    def cancel_task(self, task_id: str) -> bool:
+        """
+        Cancel a running Runway task with the key that created it
+
+        Returns:
+            True if the cancellation was accepted
+        """
+        key = self.keys.key_for(task_id)
+        try:
+            with self._api_call(key, task_id):
+                self._client_for(key).tasks.delete(task_id)
+            return True
+        except Exception:
+            return False
+        finally:
+            self.keys.unbind(task_id)
+
+    def _finish_task(self, task_id: str, output_video_path: str, model: str,
+                     should_stop: Optional[Callable[[], bool]], key: RunwayKey,
+                     on_queue_wait: Optional[Callable[[float], None]] = None) -> str:
+        """Poll a created task to completion and download the result"""
+        task = self._wait_for_task(task_id, model, should_stop, key, on_queue_wait)
+
+        # Get video URL from task output
+        video_url = task.output[0]
+
+        # Download video
+        with TRACER.span("runway.video_download"), STEP_DURATION.time(step="video_download", model=model):
+            self._download_video(video_url, output_video_path)
+
+        return output_video_path
+
+    def _wait_for_task(self, task_id: str, model: str, should_stop: Optional[Callable[[], bool]] = None,
+                       key: Optional[RunwayKey] = None,
+                       on_queue_wait: Optional[Callable[[float], None]] = None):
+        """
+        Poll a Runway task until it reaches a terminal status
+
+        Queue time (PENDING/THROTTLED) and run time (RUNNING) are recorded
+        separately, which the SDK's wait_for_task_output() does not expose.
+
+        Args:
+            task_id: Runway task ID
+            model: Model label for metrics
+            should_stop: Checked before each wait between polls
+            key: Key that created the task (defaults to the primary key)
+            on_queue_wait: Called once with the queue time when the task leaves the queue
+
+        Returns:
+            Succeeded task object
+
+        Raises:
+            GenerationInterrupted if should_stop returned True
+            Exception if the task fails, is cancelled or times out (a timed
+            out task is cancelled so it stops using the account's concurrency)
+        """
+        key = key or self.keys.keys[0]
+        client = self._client_for(key)
+        started = time.monotonic()
+        running_since = None
+        throttled = False
+        polls = 0
+
+        while True:
+            with self._api_call(key, task_id):
+                task = client.tasks.retrieve(task_id)
+            now = time.monotonic()
+            polls += 1
+
+            if running_since is None and task.status not in WAITING_STATUSES:
+                running_since = now
+                STEP_DURATION.observe(now - started, step="generation_queue", model=model)
+                TRACER.record("runway.queue", now - started, task_id=task_id, polls=polls)
+                if on_queue_wait is not None:
+                    on_queue_wait(now - started)
+
+            if task.status == "THROTTLED" and not throttled:
+                throttled = True
+                self.keys.record_throttled(key)
+
+            if task.status == "SUCCEEDED":
+                STEP_DURATION.observe(now - running_since, step="generation_run", model=model)
+                TRACER.record("runway.run", now - running_since, task_id=task_id, polls=polls)
+                return task
+
+            if task.status in FAILED_STATUSES:
+                failure = getattr(task, "failure", None) or "unknown error"
+                raise Exception(f"Task {task_id} {task.status.lower()}: {failure}")
+
+            if now - started > self.timeout:
+                self.cancel_task(task_id)
+                raise TimeoutError(f"Task {task_id} did not finish within {self.timeout}s (status: {task.status})")
+
+            if should_stop is not None and should_stop():
+                raise GenerationInterrupted(task_id, key.label)
+
+            time.sleep(self.poll_interval)
 
     def _image_to_data_uri(self, image_path: str) -> str:
         """
@@ -189,5 +400,7 @@ class RunwayClient:
                 for chunk in response.iter_content(chunk_size=8192):
                     f.write(chunk)
 
+            BYTES_TRANSFERRED.inc(Path(dest_path).stat().st_size, operation="video_download")
+
         except Exception as e:
             raise Exception(f"Video download failed: {str(e)}")
@@ -0,0 +1,275 @@
+"""
+Pool of Runway API keys
+
+A Runway account runs a limited number of generations at once (its
+concurrency tier); the rest wait as THROTTLED. With several keys
+(runway_api_key plus runway_api_keys) one worker can spread submissions over
+several accounts:
+
+- Routing: a new generation goes to the healthy key with the lowest load,
+  in_flight / concurrency, plus a penalty while the account was recently
+  seen THROTTLED (busy with other workers' tasks). Ties go round-robin,
+  starting from the worker's pool index: one worker process holds at most
+  one generation at a time, so its keys are usually all idle when it picks,
+  and pool workers must start on different accounts for the pool to add
+  throughput beyond one account's concurrency.
+- Health: a 429 or an exhausted credit balance puts the key in cooldown
+  (Retry-After or runway_key_cooldown_seconds; credits get ten times that);
+  a 401/403 disables it until restart. Only errors of Runway API calls made
+  with the key count (upload slot, create, retrieve, cancel), not the
+  presigned upload POST or the video download. When every key is cooling
+  down, the one that recovers first is used rather than failing the task.
+- Binding: a Runway task can only be polled or cancelled with the key that
+  created it, so task IDs stay bound to their key. The key label is stored
+  in the drain checkpoint so a resumed task polls with the same account.
+
+Keys are only ever logged by label: "key-" plus the first 8 hex digits of
+their SHA-256, which stays stable across restarts.
+"""
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from .metrics import RUNWAY_KEY_IN_FLIGHT, RUNWAY_KEY_EVENTS
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_PENALTY_SECONDS = 60.0
+CREDIT_COOLDOWN_FACTOR = 10
+CREDIT_ERROR_CODES = ("INSUFFICIENT_CREDITS", "NOT_ENOUGH_CREDITS")
+
+
+def key_label(api_key: str) -> str:
+    return "key-" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:8]
+
+
+def parse_keys(primary: str, extra: Optional[str], default_concurrency: int) -> List[Tuple[str, int]]:
+    """
+    Keys from the config: the primary key plus comma-separated extra keys
+
+    An extra key may end in ":N" to give its account's concurrency.
+    Duplicates are dropped.
+    """
+    keys: List[Tuple[str, int]] = []
+    seen = set()
+    for entry in [primary] + (extra or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        key, _, concurrency = entry.partition(":")
+        if key in seen:
+            continue
+        seen.add(key)
+        keys.append((key, int(concurrency) if concurrency.isdigit() else default_concurrency))
+    return keys
+
+
+def _status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of an SDK or requests error, looking through wrapped exceptions"""
+    while error is not None:
+        status = getattr(error, "status_code", None)
+        if status is None:
+            status = getattr(getattr(error, "response", None), "status_code", None)
+        if isinstance(status, int):
+            return status
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def _error_body(error: BaseException) -> Optional[dict]:
+    """Parsed JSON body of a Runway API error (SDK APIStatusError.body or a requests response)"""
+    while error is not None:
+        body = getattr(error, "body", None)
+        if isinstance(body, dict):
+            return body
+        response = getattr(error, "response", None)
+        if response is not None:
+            try:
+                body = response.json()
+            except Exception:
+                body = None
+            return body if isinstance(body, dict) else None
+        error = error.__cause__ or error.__context__
+    return None
+
+
+def _out_of_credits(status: Optional[int], error: BaseException) -> bool:
+    """A 400/402 whose error code (or error field) says the account has no credits left"""
+    if status not in (400, 402):
+        return False
+    body = _error_body(error) or {}
+    code = str(body.get("code") or body.get("failureCode") or "").upper()
+    return code in CREDIT_ERROR_CODES or "credits" in str(body.get("error") or "").lower()
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    while error is not None:
+        headers = getattr(getattr(error, "response", None), "headers", None)
+        if headers is not None:
+            try:
+                return float(headers.get("retry-after"))
+            except (TypeError, ValueError):
+                return None
+        error = error.__cause__ or error.__context__
+    return None
+
+
+class RunwayKey:
+    """One account's key and what this process knows about its load and health"""
+
+    def __init__(self, api_key: str, concurrency: int):
+        self.api_key = api_key
+        self.label = key_label(api_key)
+        self.concurrency = max(1, concurrency)
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.throttled_until = 0.0
+        self.disabled_reason: Optional[str] = None
+        self.client = None
+
+    def load(self, now: float) -> float:
+        return self.in_flight / self.concurrency + (1.0 if now < self.throttled_until else 0.0)
+
+    def healthy(self, now: float) -> bool:
+        return self.disabled_reason is None and now >= self.cooldown_until
+
+
+class RunwayKeyPool:
+    """Routes generations to keys and remembers which key owns each Runway task"""
+
+    def __init__(self, keys: List[Tuple[str, int]], cooldown_seconds: float = 60.0, offset: int = 0):
+        """
+        Args:
+            keys: (api_key, concurrency) pairs, see parse_keys
+            cooldown_seconds: How long a rate-limited key is avoided
+            offset: Key index where round-robin tie-breaking starts (the
+                worker's pool position, so pool workers spread out)
+        """
+        if not keys:
+            raise ValueError("At least one Runway API key is required")
+        self.keys = [RunwayKey(api_key, concurrency) for api_key, concurrency in keys]
+        self.cooldown_seconds = cooldown_seconds
+        self._by_label = {key.label: key for key in self.keys}
+        self._tasks: Dict[str, RunwayKey] = {}
+        # Tasks polled with the primary key because their own key is unknown
+        self._guessed: Set[str] = set()
+        # Next key index preferred among equally loaded keys
+        self._cursor = offset % len(self.keys)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def acquire(self, key: Optional[RunwayKey] = None) -> RunwayKey:
+        """
+        Pick the key for a new generation and count it as in flight
+
+        Args:
+            key: Count this key instead of picking one (a resumed task is
+                bound to the key that created it)
+
+        Raises:
+            Exception if every key is disabled
+        """
+        now = time.monotonic()
+        with self._lock:
+            if key is not None:
+                key.in_flight += 1
+                RUNWAY_KEY_IN_FLIGHT.set(key.in_flight, key=key.label)
+                return key
+            usable = [key for key in self.keys if key.disabled_reason is None]
+            if not usable:
+                raise Exception("No usable Runway API key: " + ", ".join(
+                    f"{key.label} ({key.disabled_reason})" for key in self.keys))
+            healthy = [key for key in usable if key.healthy(now)]
+            if healthy:
+                count = len(self.keys)
+                key = min(healthy, key=lambda k: (k.load(now), (self.keys.index(k) - self._cursor) % count))
+            else:
+                key = min(usable, key=lambda k: k.cooldown_until)
+                logger.warning(f"All Runway keys are cooling down, using {key.label}")
+            self._cursor = (self.keys.index(key) + 1) % len(self.keys)
+            key.in_flight += 1
+            RUNWAY_KEY_IN_FLIGHT.set(key.in_flight, key=key.label)
+            return key
+
+    def release(self, key: RunwayKey):
+        """A generation on this key finished (or stopped being waited for)"""
+        with self._lock:
+            key.in_flight = max(0, key.in_flight - 1)
+            RUNWAY_KEY_IN_FLIGHT.set(key.in_flight, key=key.label)
+
+    def bind(self, task_id: str, key: RunwayKey):
+        with self._lock:
+            self._tasks[task_id] = key
+
+    def unbind(self, task_id: str):
+        with self._lock:
+            self._tasks.pop(task_id, None)
+            self._guessed.discard(task_id)
+
+    def key_for(self, task_id: str, label: Optional[str] = None) -> RunwayKey:
+        """
+        Key owning a Runway task
+
+        Falls back to the given label (from a checkpoint), then to the
+        primary key for tasks created before the pool existed.
+        """
+        with self._lock:
+            key = self._tasks.get(task_id) or (self._by_label.get(label) if label else None)
+            if key is None:
+                if label:
+                    logger.warning(f"Runway key {label} for task {task_id} is no longer configured, using the primary key")
+                key = self.keys[0]
+                self._guessed.add(task_id)
+            self._tasks[task_id] = key
+            return key
+
+    def record_throttled(self, key: RunwayKey):
+        """The account queued one of our tasks as THROTTLED: it is at its concurrency limit"""
+        key.throttled_until = time.monotonic() + THROTTLE_PENALTY_SECONDS
+        RUNWAY_KEY_EVENTS.inc(key=key.label, event="throttled")
+
+    def record_error(self, key: RunwayKey, error: BaseException, task_id: Optional[str] = None):
+        """
+        Update key health from a failed Runway API call made with this key
+
+        Args:
+            key: Key the call authenticated with
+            error: Raised by the call
+            task_id: Task the call was about (retrieve/cancel); a 401/403 on
+                a task polled with a guessed key says nothing about the key
+        """
+        status = _status_code(error)
+        now = time.monotonic()
+        if status in (401, 403) and task_id is not None and task_id in self._guessed:
+            logger.warning(f"Runway task {task_id} rejected for {key.label} (HTTP {status}), "
+                           "it probably belongs to a key that is no longer configured")
+        elif status in (401, 403):
+            key.disabled_reason = f"HTTP {status}"
+            RUNWAY_KEY_EVENTS.inc(key=key.label, event="auth_failed")
+            logger.error(f"Runway key {key.label} rejected (HTTP {status}), disabled until restart")
+        elif status == 429:
+            cooldown = _retry_after(error) or self.cooldown_seconds
+            key.cooldown_until = now + cooldown
+            RUNWAY_KEY_EVENTS.inc(key=key.label, event="rate_limited")
+            logger.warning(f"Runway key {key.label} rate limited, avoiding it for {cooldown:.0f}s")
+        elif _out_of_credits(status, error):
+            cooldown = self.cooldown_seconds * CREDIT_COOLDOWN_FACTOR
+            key.cooldown_until = now + cooldown
+            RUNWAY_KEY_EVENTS.inc(key=key.label, event="no_credits")
+            logger.warning(f"Runway key {key.label} looks out of credits, avoiding it for {cooldown:.0f}s")
+
+    def status(self) -> List[Dict[str, object]]:
+        """Per-key state for logs and debugging"""
+        now = time.monotonic()
+        return [{
+            "key": key.label,
+            "concurrency": key.concurrency,
+            "in_flight": key.in_flight,
+            "healthy": key.healthy(now),
+            "throttled": now < key.throttled_until,
+            "disabled": key.disabled_reason,
+        } for key in self.keys]
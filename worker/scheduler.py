@@ -0,0 +1,161 @@
+"""
+Single scheduler for periodic background jobs
+
+Healthcheck pings, IP checks and lease heartbeats used to run in their own
+threads around time.sleep(interval), so stopping them meant waiting out the
+sleep. Here one thread waits on a condition variable until the next job is
+due, which makes add/cancel/shutdown take effect immediately. Each run is
+dispatched to a short-lived daemon thread so a slow HTTP call in one job
+never delays another (e.g. an IP check never delays a lease heartbeat).
+"""
+import heapq
+import itertools
+import logging
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledJob:
+    """A periodic job registered with JobScheduler"""
+
+    def __init__(self, name: str, func: Callable[[], None], interval: float, next_run: float):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.next_run = next_run
+        self.cancelled = False
+        self._thread: Optional[threading.Thread] = None
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+
+class JobScheduler:
+    """Runs periodic jobs from one timer thread"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap: List[Tuple[float, int, ScheduledJob]] = []
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and not self._stopped
+
+    def start(self):
+        """Start the timer thread (idempotent)"""
+        with self._cond:
+            if self.running:
+                return
+            self._stopped = False
+            self._thread = threading.Thread(target=self._run, name="job-scheduler", daemon=True)
+            self._thread.start()
+
+    def add_job(self, name: str, func: Callable[[], None], interval: float,
+                initial_delay: float = 0.0) -> ScheduledJob:
+        """
+        Register a periodic job
+
+        Args:
+            name: Job name (for logs)
+            func: Callable run on every tick; exceptions are logged, not raised
+            interval: Seconds between runs
+            initial_delay: Seconds before the first run
+
+        Returns:
+            Job handle for cancel()
+        """
+        job = ScheduledJob(name, func, interval, time.monotonic() + initial_delay)
+        with self._cond:
+            heapq.heappush(self._heap, (job.next_run, next(self._seq), job))
+            self._cond.notify()
+        self.start()
+        return job
+
+    def cancel(self, job: Optional[ScheduledJob]):
+        """Stop a job from running again (an in-progress run is not interrupted)"""
+        if job is None:
+            return
+        with self._cond:
+            job.cancelled = True
+            self._cond.notify()
+
+    def shutdown(self, timeout: float = 1.0):
+        """Cancel every job and stop the timer thread"""
+        with self._cond:
+            self._stopped = True
+            for _, _, job in self._heap:
+                job.cancelled = True
+            self._heap.clear()
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+    def _run(self):
+        """Timer loop: sleep until the earliest job is due, then dispatch it"""
+        with self._cond:
+            while not self._stopped:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+
+                next_run, _, job = self._heap[0]
+                if job.cancelled:
+                    heapq.heappop(self._heap)
+                    continue
+
+                now = time.monotonic()
+                if next_run > now:
+                    self._cond.wait(next_run - now)
+                    continue
+
+                heapq.heappop(self._heap)
+                # Skip missed ticks instead of bursting to catch up
+                job.next_run = max(next_run + job.interval, now)
+                heapq.heappush(self._heap, (job.next_run, next(self._seq), job))
+                self._dispatch(job)
+
+    def _dispatch(self, job: ScheduledJob):
+        if job.is_running():
+            logger.debug(f"Job {job.name} still running, skipping this tick")
+            return
+        job._thread = threading.Thread(target=self._execute, args=(job,), name=f"job-{job.name}", daemon=True)
+        job._thread.start()
+
+    @staticmethod
+    def _execute(job: ScheduledJob):
+        if job.cancelled:
+            return
+        try:
+            job.func()
+        except Exception as e:
+            logger.error(f"Job {job.name} failed: {e}")
+
+
+# Process-wide scheduler shared by the worker and the monitors
+_scheduler: Optional[JobScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> JobScheduler:
+    """Return the shared scheduler, starting it if needed"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = JobScheduler()
+        _scheduler.start()
+        return _scheduler
+
+
+def shutdown_scheduler():
+    """Stop the shared scheduler and all of its jobs"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            _scheduler.shutdown()
+            _scheduler = None
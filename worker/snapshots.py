@@ -0,0 +1,74 @@
+"""
+Per-process state snapshots for supervisor mode
+
+With PROXY_MODE=process every RunwayWorker (one, or a pool) runs in its own
+process, so the proxy's /metrics, /worker/status and /health cannot read
+their in-memory registries. Each worker instead writes {worker_id}.json (metrics from REGISTRY.collect() plus
+its WORKER_STATUS snapshot) into a directory shared through the
+WORKER_SNAPSHOT_DIR environment variable, and the proxy merges the files,
+adding a worker label to every sample. Files of workers that stopped writing
+(crashed or exited) are ignored once they are older than max_age.
+"""
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .metrics import REGISTRY, Family
+from .worker_status import WORKER_STATUS
+
+SNAPSHOT_DIR_ENV = "WORKER_SNAPSHOT_DIR"
+
+
+def snapshot_dir() -> Optional[Path]:
+    """Shared snapshot directory, or None outside supervisor mode"""
+    value = os.getenv(SNAPSHOT_DIR_ENV)
+    return Path(value) if value else None
+
+
+def write_snapshot(directory: Path, worker_id: str):
+    """Write this process's metrics and status (atomic replace; scheduler job)"""
+    data = {
+        "worker_id": worker_id,
+        "pid": os.getpid(),
+        "written_at": time.time(),
+        "stalled": WORKER_STATUS.is_stalled(),
+        "status": WORKER_STATUS.snapshot(),
+        "metrics": REGISTRY.collect(include_sources=False),
+    }
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{worker_id}.json"
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(data, default=str), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+def read_snapshots(directory: Path, max_age: float = 60.0) -> List[Dict[str, Any]]:
+    """Snapshots written within max_age seconds, sorted by worker_id"""
+    now = time.time()
+    snapshots = []
+    for path in sorted(directory.glob("*.json")):
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            continue  # Being replaced or corrupt; the next read picks it up
+        if now - data.get("written_at", 0) <= max_age:
+            snapshots.append(data)
+    return snapshots
+
+
+def pool_metrics_source(directory: Path, max_age: float = 60.0):
+    """Build a REGISTRY source returning every live worker's families with a worker label"""
+    def source() -> List[Family]:
+        families: List[Family] = []
+        for snapshot in read_snapshots(directory, max_age):
+            worker_id = snapshot["worker_id"]
+            for name, type_name, help_text, samples in snapshot.get("metrics", []):
+                families.append((name, type_name, help_text, [
+                    (sample_name, {**labels, "worker": worker_id}, value)
+                    for sample_name, labels, value in samples
+                ]))
+        return families
+
+    return source
@@ -3,7 +3,17 @@ File download/upload utilities
 """
 import requests
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
+
+from .tracing import TRACER
+
+# Shared session so presigned transfers to the same storage host reuse connections
+_session = requests.Session()
+
+
+def get_session() -> requests.Session:
+    """Return the shared storage session"""
+    return _session
 
 
 def download_file(url: str, dest_path: str, timeout: int = 300) -> str:
@@ -21,19 +31,48 @@ def download_file(url: str, dest_path: str, timeout: int = 300) -> str:
     Raises:
         Exception if download fails
     """
+    download_file_conditional(url, dest_path, timeout=timeout)
+    return dest_path
+
+
+def download_file_conditional(url: str, dest_path: str, etag: Optional[str] = None,
+                              timeout: int = 300) -> Tuple[bool, Optional[str]]:
+    """
+    Download file unless the server still has the version with the given ETag
+
+    Args:
+        url: Download URL (typically presigned URL)
+        dest_path: Destination file path
+        etag: ETag of a copy already held; sent as If-None-Match
+        timeout: Request timeout in seconds
+
+    Returns:
+        (downloaded, etag): downloaded is False when the server answered
+        304 Not Modified and dest_path was not written
+
+    Raises:
+        Exception if download fails
+    """
+    headers = {'If-None-Match': etag} if etag else None
     try:
-        response = requests.get(url, timeout=timeout, stream=True)
-        response.raise_for_status()
+        with TRACER.span("http.storage_download") as span:
+            with _session.get(url, timeout=timeout, stream=True, headers=headers) as response:
+                if etag and response.status_code == 304:
+                    span["not_modified"] = True
+                    return False, etag
+                response.raise_for_status()
+
+                # Ensure directory exists
+                Path(dest_path).parent.mkdir(parents=True, exist_ok=True)
 
-        # Ensure directory exists
-        Path(dest_path).parent.mkdir(parents=True, exist_ok=True)
+                # Write to file
+                with open(dest_path, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=8192):
+                        f.write(chunk)
 
-        # Write to file
-        with open(dest_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+                span["bytes"] = Path(dest_path).stat().st_size
 
-        return dest_path
+        return True, response.headers.get('ETag')
 
     except Exception as e:
         raise Exception(f"File download failed: {str(e)}")
@@ -56,8 +95,8 @@ def upload_file(file_path: str, presigned_url: str, content_type: str, timeout:
         Exception if upload fails
     """
     try:
-        with open(file_path, 'rb') as f:
-            response = requests.put(
+        with TRACER.span("http.storage_upload", bytes=Path(file_path).stat().st_size), open(file_path, 'rb') as f:
+            response = _session.put(
                 presigned_url,
                 data=f,
                 headers={'Content-Type': content_type},
@@ -0,0 +1,213 @@
+"""
+프로세스 슈퍼바이저
+
+Runway Worker와 알리고 프록시를 별도 프로세스로 실행하고 관리합니다.
+- 자식 프로세스가 비정상 종료되면 지수 백오프로 재시작
+- SIGINT/SIGTERM 수신 시 모든 자식에게 종료 신호를 보내고 제한 시간 내 정리
+  (Worker처럼 드레인이 필요한 프로세스는 프로세스별 제한 시간 지정 가능,
+  프록시처럼 나중에 멈출 프로세스는 다른 자식이 모두 끝난 뒤 종료)
+- 자식은 별도 프로세스 그룹에서 실행되어 터미널의 Ctrl-C(SIGINT)를 직접 받지 않음
+  (슈퍼바이저가 SIGTERM 한 번으로 전달하므로 Worker 드레인이 두 번째 신호로 끊기지 않음)
+- SIGHUP(설정 재로드)/SIGUSR1(프로파일 덤프) 수신 시 이를 지원하는 자식에게만 전달
+"""
+import os
+import time
+import signal
+import threading
+import multiprocessing
+import logging
+from typing import Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 자식 프로세스는 항상 spawn으로 생성 (스레드가 있는 부모에서 fork 방지)
+_mp_context = multiprocessing.get_context("spawn")
+
+
+def _run_child(target: Callable, args: Tuple):
+    """자식 프로세스 진입점: 슈퍼바이저의 프로세스 그룹에서 분리한 뒤 target 실행"""
+    if hasattr(os, "setpgid"):
+        os.setpgid(0, 0)
+    target(*args)
+
+
+class ManagedProcess:
+    """
+    슈퍼바이저가 관리하는 자식 프로세스 하나
+    """
+
+    def __init__(self, name: str, target: Callable, args: Tuple = (), forward_sighup: bool = False,
+                 shutdown_timeout: Optional[float] = None, stop_last: bool = False,
+                 log: Optional[logging.Logger] = None):
+        """
+        Args:
+            name: 프로세스 이름 (로그 표시용)
+            target: 자식 프로세스에서 실행할 최상위 함수 (spawn 가능해야 함)
+            args: target 인자
+            forward_sighup: SIGHUP(설정 재로드)과 SIGUSR1(프로파일 덤프)을 이 프로세스에 전달할지 여부
+            shutdown_timeout: 종료 신호 후 강제 종료까지 대기 시간 (초, None이면 슈퍼바이저 기본값)
+            stop_last: 종료 시 다른 자식이 모두 끝난 뒤에 종료 신호를 보낼지 여부
+            log: 시작 로그를 남길 로거 (기본값: 이 모듈의 로거)
+        """
+        self.name = name
+        self.target = target
+        self.args = args
+        self.forward_sighup = forward_sighup
+        self.shutdown_timeout = shutdown_timeout
+        self.stop_last = stop_last
+        self.process: Optional[multiprocessing.Process] = None
+        self.started_at: Optional[float] = None
+        self.restart_count = 0
+        self.consecutive_failures = 0
+        self.next_start_at = 0.0
+        self.log = log or logger
+
+    def start(self):
+        """자식 프로세스 시작"""
+        self.process = _mp_context.Process(target=_run_child, args=(self.target, self.args), name=self.name)
+        self.process.start()
+        self.started_at = time.monotonic()
+        self.log.info(f"▶️ {self.name} 프로세스 시작 (pid={self.process.pid})")
+
+    def is_alive(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+
+class ProcessSupervisor:
+    """
+    여러 자식 프로세스를 실행하고 크래시 시 재시작하는 슈퍼바이저
+    """
+
+    def __init__(
+        self,
+        restart_backoff_initial: float = 1.0,
+        restart_backoff_max: float = 60.0,
+        stable_after_seconds: float = 60.0,
+        shutdown_timeout: float = 30.0,
+        log: Optional[logging.Logger] = None
+    ):
+        """
+        Args:
+            restart_backoff_initial: 첫 재시작 대기 시간 (초)
+            restart_backoff_max: 최대 재시작 대기 시간 (초)
+            stable_after_seconds: 이 시간 이상 실행되면 백오프 초기화 (초)
+            shutdown_timeout: 종료 신호 후 강제 종료까지 대기 시간 (초)
+            log: 시작/크래시/재시작/종료 로그를 남길 로거 (기본값: 이 모듈의 로거)
+        """
+        self.restart_backoff_initial = restart_backoff_initial
+        self.restart_backoff_max = restart_backoff_max
+        self.stable_after_seconds = stable_after_seconds
+        self.shutdown_timeout = shutdown_timeout
+        self.processes: Dict[str, ManagedProcess] = {}
+        self._stop_event = threading.Event()
+        self.log = log or logger
+
+    @staticmethod
+    def create_queue(maxsize: int = 0):
+        """자식 프로세스에 인자로 넘길 수 있는 큐 생성 (spawn 컨텍스트)"""
+        return _mp_context.Queue(maxsize)
+
+    def add(self, name: str, target: Callable, args: Tuple = (), forward_sighup: bool = False,
+            shutdown_timeout: Optional[float] = None, stop_last: bool = False):
+        """관리할 프로세스 등록"""
+        self.processes[name] = ManagedProcess(
+            name, target, args, forward_sighup, shutdown_timeout, stop_last, self.log
+        )
+
+    def forward_signal(self, signum=None, frame=None):
+        """SIGHUP/SIGUSR1을 이를 지원하는 자식 프로세스에 전달 (시그널 핸들러)"""
+        for managed in self.processes.values():
+            if managed.forward_sighup and managed.is_alive():
+                try:
+                    os.kill(managed.process.pid, signum)
+                except OSError:
+                    pass
+
+    def request_stop(self, signum=None, frame=None):
+        """종료 요청 (시그널 핸들러로도 사용)"""
+        if not self._stop_event.is_set():
+            self.log.info("⚠️ 종료 신호 수신됨. 자식 프로세스를 종료합니다...")
+        self._stop_event.set()
+
+    def run(self, on_tick: Optional[Callable[[], None]] = None):
+        """
+        모든 프로세스를 시작하고 종료 요청이 올 때까지 감시
+
+        Args:
+            on_tick: 감시 루프마다 호출할 콜백 (선택)
+        """
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGTERM, self.request_stop)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self.forward_signal)
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, self.forward_signal)
+
+        for managed in self.processes.values():
+            managed.start()
+
+        try:
+            while not self._stop_event.is_set():
+                for managed in self.processes.values():
+                    self._check(managed)
+                if on_tick:
+                    on_tick()
+                self._stop_event.wait(0.5)
+        finally:
+            self.shutdown()
+
+    def _check(self, managed: ManagedProcess):
+        """종료된 자식 프로세스를 백오프 후 재시작"""
+        if managed.is_alive():
+            return
+
+        now = time.monotonic()
+
+        # 방금 종료를 감지한 경우: 다음 시작 시각 계산
+        if managed.process is not None:
+            exitcode = managed.process.exitcode
+            uptime = now - (managed.started_at or now)
+            managed.process = None
+
+            if uptime >= self.stable_after_seconds:
+                managed.consecutive_failures = 0
+            managed.consecutive_failures += 1
+
+            backoff = min(
+                self.restart_backoff_max,
+                self.restart_backoff_initial * (2 ** (managed.consecutive_failures - 1))
+            )
+            managed.next_start_at = now + backoff
+            self.log.error(
+                f"❌ {managed.name} 프로세스 종료됨 (exitcode={exitcode}, 실행 {uptime:.0f}초). "
+                f"{backoff:.1f}초 후 재시작"
+            )
+
+        if now >= managed.next_start_at:
+            managed.restart_count += 1
+            managed.start()
+
+    def shutdown(self):
+        """
+        모든 자식에게 SIGTERM을 보내고 제한 시간 내 종료되지 않으면 강제 종료
+
+        stop_last로 등록한 프로세스(프록시)는 나머지 자식(드레인 중인 Worker)이 끝난 뒤 종료합니다.
+        """
+        self._stop([m for m in self.processes.values() if not m.stop_last])
+        self._stop([m for m in self.processes.values() if m.stop_last])
+
+    def _stop(self, processes):
+        """프로세스들에 SIGTERM을 보내고 각자의 제한 시간까지 기다림"""
+        alive = [m for m in processes if m.is_alive()]
+        for managed in alive:
+            managed.process.terminate()
+
+        started = time.monotonic()
+        for managed in alive:
+            timeout = managed.shutdown_timeout if managed.shutdown_timeout is not None else self.shutdown_timeout
+            managed.process.join(timeout=max(0.0, started + timeout - time.monotonic()))
+            if managed.process.is_alive():
+                self.log.warning(f"⚠️ {managed.name} 프로세스가 {timeout:.0f}초 안에 종료되지 않아 강제 종료합니다")
+                managed.process.kill()
+                managed.process.join(timeout=5)
+            self.log.info(f"{managed.name} 프로세스 종료됨 (exitcode={managed.process.exitcode})")
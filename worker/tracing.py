@@ -0,0 +1,186 @@
+"""
+Per-task trace spans exported to local JSONL files
+
+Each task is a trace (trace_id = item_id) with a root "task" span, one
+"step.*" span per pipeline step and "http.*" / "runway.*" spans for the
+calls made inside them. Finished spans are queued and appended by a
+background thread to {trace_dir}/trace_YYYYMMDD.jsonl, so tracing never
+blocks the pipeline on disk I/O. scripts/trace_report.py summarizes them.
+"""
+import json
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from .metrics import DROPPED_RECORDS
+
+# (trace_id, shared trace state, parent span id) of the span active in this context.
+# Spans copy this dict, but they all share the trace's state dict, so set_model()
+# called anywhere inside the task applies to every span opened afterwards and to
+# the root "task" span, which takes its model when it closes.
+_current: ContextVar[Optional[Dict[str, Any]]] = ContextVar("trace_current", default=None)
+
+
+class Tracer:
+    """Records spans and writes them as JSON lines off the calling thread"""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace_dir: Optional[Path] = None
+        self.retention_days = 14
+        self.file_suffix = ""
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=10000)
+        self._writer: Optional[threading.Thread] = None
+        self.dropped = 0
+
+    def configure(self, trace_dir: str, enabled: bool = True, retention_days: int = 14,
+                  file_suffix: str = ""):
+        """
+        Enable export to trace_dir
+
+        Args:
+            trace_dir: Directory for trace_YYYYMMDD.jsonl files
+            enabled: False turns every span into a no-op
+            retention_days: Trace files older than this are deleted
+            file_suffix: Appended to file names (trace_YYYYMMDD_{suffix}.jsonl) so
+                processes sharing trace_dir never append to the same file
+        """
+        self.enabled = enabled
+        self.trace_dir = Path(trace_dir)
+        self.retention_days = retention_days
+        self.file_suffix = f"_{file_suffix}" if file_suffix else ""
+        if not enabled:
+            return
+        self.trace_dir.mkdir(parents=True, exist_ok=True)
+        self._cleanup_old_files()
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+            self._writer.start()
+
+    @contextmanager
+    def trace(self, trace_id: str, model: Optional[str] = None, **attrs):
+        """Root span of one task; nested span() calls become its children"""
+        token = _current.set({"trace_id": trace_id, "trace": {"model": model}, "span_id": None})
+        try:
+            with self.span("task", **attrs) as span_attrs:
+                yield span_attrs
+        finally:
+            _current.reset(token)
+
+    def set_model(self, model: str):
+        """Change the model label of the root span and of spans opened (or recorded) after this call"""
+        current = _current.get()
+        if current is not None:
+            current["trace"]["model"] = model
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """
+        Time a block as a child of the current span
+
+        Yields a dict; keys added to it are stored as span attributes.
+        Exceptions are recorded (status "error") and re-raised.
+        """
+        parent = _current.get()
+        if not self.enabled or parent is None:
+            yield attrs
+            return
+
+        span_id = uuid.uuid4().hex[:16]
+        model = parent["trace"]["model"]
+        token = _current.set({**parent, "span_id": span_id})
+        started_at = time.time()
+        started = time.perf_counter()
+        status, error = "ok", None
+        try:
+            yield attrs
+        except BaseException as e:
+            status, error = "error", type(e).__name__
+            raise
+        finally:
+            _current.reset(token)
+            self._emit({
+                "trace_id": parent["trace_id"],
+                "span_id": span_id,
+                "parent_id": parent["span_id"],
+                "name": name,
+                # The root span covers the whole task, so it reports the model finally used
+                "model": parent["trace"]["model"] if parent["span_id"] is None else model,
+                "start": round(started_at, 3),
+                "duration": round(time.perf_counter() - started, 4),
+                "status": status,
+                "error": error,
+                "attrs": attrs,
+            })
+
+    def record(self, name: str, duration: float, **attrs):
+        """Record an interval that was measured elsewhere (e.g. Runway queue time)"""
+        parent = _current.get()
+        if not self.enabled or parent is None:
+            return
+        self._emit({
+            "trace_id": parent["trace_id"],
+            "span_id": uuid.uuid4().hex[:16],
+            "parent_id": parent["span_id"],
+            "name": name,
+            "model": parent["trace"]["model"],
+            "start": round(time.time() - duration, 3),
+            "duration": round(duration, 4),
+            "status": "ok",
+            "error": None,
+            "attrs": attrs,
+        })
+
+    def _emit(self, record: Dict[str, Any]):
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            DROPPED_RECORDS.inc(sink="trace")
+
+    def flush(self, timeout: float = 2.0):
+        """Wait until queued spans are written (best effort)"""
+        deadline = time.monotonic() + timeout
+        while not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def _write_loop(self):
+        while True:
+            record = self._queue.get()
+            if record is None:
+                return
+            try:
+                day = datetime.fromtimestamp(record['start']).strftime('%Y%m%d')
+                path = self.trace_dir / f"trace_{day}{self.file_suffix}.jsonl"
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, default=str) + "\n")
+                    # Drain whatever else is queued into the same open file
+                    while True:
+                        try:
+                            record = self._queue.get_nowait()
+                        except queue.Empty:
+                            break
+                        if record is None:
+                            return
+                        f.write(json.dumps(record, default=str) + "\n")
+            except OSError:
+                self.dropped += 1
+                DROPPED_RECORDS.inc(sink="trace")
+
+    def _cleanup_old_files(self):
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).strftime("%Y%m%d")
+        for path in self.trace_dir.glob("trace_*.jsonl"):
+            if path.stem[len("trace_"):len("trace_") + 8] < cutoff:
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+
+
+TRACER = Tracer()
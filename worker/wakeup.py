@@ -0,0 +1,121 @@
+"""
+Wakeup channel for the polling loop
+
+The worker binds a UDP socket on localhost and waits on it instead of
+sleeping. Any datagram (sent by POST /worker/wake on the FastAPI server, by a
+local stand-in, or by the worker itself on shutdown) ends the wait at once,
+so a newly enqueued task is picked up without waiting out the polling
+interval. UDP on loopback works the same whether the proxy runs in a thread
+or in its own process. If the port cannot be bound the channel falls back to
+a plain threading.Event and the loop keeps polling on its timer.
+"""
+import select
+import socket
+import threading
+from typing import Optional
+
+DEFAULT_WAKEUP_HOST = "127.0.0.1"
+DEFAULT_WAKEUP_PORT = 8001
+
+
+class WakeupChannel:
+    """Interruptible wait used by RunwayWorker between polls"""
+
+    def __init__(self, host: str = DEFAULT_WAKEUP_HOST, port: int = DEFAULT_WAKEUP_PORT):
+        """
+        Args:
+            host: Address to bind (loopback only by default)
+            port: UDP port to bind (0 disables the socket and uses the Event fallback)
+        """
+        self.host = host
+        self.port = port
+        self._sock: Optional[socket.socket] = None
+        self._event = threading.Event()
+
+    def open(self) -> bool:
+        """
+        Bind the wakeup socket
+
+        Returns:
+            True if push wakeups are available, False if only the fallback is
+        """
+        if not self.port:
+            return False
+        try:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.bind((self.host, self.port))
+            sock.setblocking(False)
+        except OSError:
+            return False
+        self._sock = sock
+        return True
+
+    @property
+    def push_enabled(self) -> bool:
+        return self._sock is not None
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Wait until woken or until timeout
+
+        Returns:
+            True if woken up, False on timeout
+        """
+        if self._event.is_set():
+            # notify() also sent a datagram; drain it (and any other pending
+            # wakeup) so the next wait() does not return at once
+            if self._sock is not None:
+                self._drain()
+            self._event.clear()
+            return True
+
+        if self._sock is None:
+            woken = self._event.wait(timeout)
+            self._event.clear()
+            return woken
+
+        readable, _, _ = select.select([self._sock], [], [], max(0.0, timeout))
+        if not readable:
+            return False
+        self._drain()
+        self._event.clear()
+        return True
+
+    def notify(self):
+        """Wake up a waiter in this process (safe to call from a signal handler)"""
+        self._event.set()
+        if self._sock is not None:
+            try:
+                self._sock.sendto(b"wake", (self.host, self.port))
+            except OSError:
+                pass
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _drain(self):
+        """Collapse a burst of wakeups into one"""
+        while True:
+            try:
+                self._sock.recv(64)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+
+
+def send_wakeup(host: str = DEFAULT_WAKEUP_HOST, port: int = DEFAULT_WAKEUP_PORT) -> bool:
+    """
+    Nudge a worker listening on host:port
+
+    Returns:
+        True if the datagram was sent (delivery is not acknowledged)
+    """
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(b"wake", (host, port))
+        return True
+    except OSError:
+        return False
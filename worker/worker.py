@@ -1,38 +1,115 @@
 """
 Runway Worker - Main polling loop for task processing
 """
-import os
 import sys
+import json
 import time
 import signal
-import threading
-import yaml
+import logging
+from contextlib import contextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any
-
-# Add worker directory to path
-sys.path.insert(0, str(Path(__file__).parent))
-
-from logger import setup_logger, log_task_start, log_task_complete, log_step, log_error
-from api_client import VercelAPIClient
-from storage import download_file, upload_file, cleanup_file
-from runway_client import RunwayClient
+from typing import Dict, Any, List, Optional
+
+from .logger import (
+    setup_logger, log_task_start, log_task_complete, log_step, log_error,
+    set_log_context, clear_log_context, set_log_level, RateLimitedLog
+)
+from .api_client import VercelAPIClient
+from .storage import download_file_conditional, upload_file, get_session
+from .runway_client import RunwayClient, GenerationInterrupted
+from .runway_keys import RunwayKeyPool, parse_keys
+from .model_routing import ModelRouter, parse_fallbacks
+from .metrics import (
+    REGISTRY, STEP_DURATION, TASKS_IN_FLIGHT, TASKS_TOTAL, LEASE_EXTENSIONS,
+    BYTES_TRANSFERRED, POLLS_TOTAL, POLLING_INTERVAL, EXPECTED_PICKUP_LATENCY, ARRIVAL_RATE,
+    session_pool_collector
+)
+from .worker_status import WORKER_STATUS
+from .scheduler import get_scheduler
+from .wakeup import WakeupChannel
+from .polling import ArrivalRatePolicy
+from .tracing import TRACER
+from .history import TaskHistory
+from .config import ConfigWatcher, load_config
+from .snapshots import snapshot_dir, write_snapshot
+from .profiling import PROFILER
+from .result_cache import ResultCache
+from .local_queue import JobEstimator, LocalTaskQueue
+from .workspace import Workspace, WorkspaceFull
+from .photo_cache import PhotoCache
+
+
+class TaskReleased(Exception):
+    """Raised inside the pipeline to hand a not-yet-generating task back during drain"""
 
 
 class RunwayWorker:
     """Main worker class for polling and processing tasks"""
 
-    def __init__(self, config_path: str = "worker/config.yaml"):
-        """Initialize worker"""
-        # Load configuration
-        self.config = self._load_config(config_path)
+    def __init__(self, config_path: str = "worker/config.yaml", worker_index: Optional[int] = None,
+                 log_queue=None):
+        """
+        Initialize worker
+
+        Args:
+            config_path: Path to config.yaml
+            worker_index: Position in a worker pool (1..N); derives worker_id
+                "{worker_id}-{index}" and wakeup port wakeup_port + index
+            log_queue: Queue of the pool's shared log sink (see logger.start_log_sink)
+        """
+        # Load and validate configuration
+        base_config = load_config(config_path)
+        self.config = dict(base_config)
+        self.worker_index = worker_index
+        if worker_index is not None:
+            self.config["worker_id"] = f"{self.config['worker_id']}-{worker_index}"
+            if self.config["wakeup_port"]:
+                self.config["wakeup_port"] += worker_index
 
         # Setup logger
         self.logger = setup_logger(
             log_dir=self.config["log_dir"],
-            worker_id=self.config["worker_id"]
+            worker_id=self.config["worker_id"],
+            log_level=getattr(logging, self.config["log_level"]),
+            log_format=self.config.get("log_format", "text"),
+            rotation=self.config.get("log_rotation", "time"),
+            retention=self.config.get("log_retention", 14),
+            max_bytes=self.config.get("log_max_bytes", 50 * 1024 * 1024),
+            log_queue=log_queue
+        )
+        # Per-task trace spans (JSONL under log_dir/traces, one file per pool worker)
+        TRACER.configure(
+            str(Path(self.config["log_dir"]) / "traces"),
+            enabled=self.config.get("tracing_enabled", True),
+            retention_days=self.config.get("trace_retention_days", 14),
+            file_suffix=self.config["worker_id"] if worker_index is not None else ""
         )
 
+        # Opt-in profiling hooks (log_dir/profiles)
+        PROFILER.configure(
+            str(Path(self.config["log_dir"]) / "profiles"),
+            name=self.config["worker_id"],
+            task_sample_rate=self.config["profile_task_sample_rate"],
+            tracemalloc_enabled=self.config["tracemalloc_enabled"],
+            sample_seconds=self.config["profile_sample_seconds"]
+        )
+
+        # Pool mode: publish metrics and status for the proxy process
+        self.snapshot_dir = snapshot_dir()
+
+        # Task outcome history (SQLite, written off the hot path)
+        self.history = None
+        if self.config.get("history_enabled", True):
+            self.history = TaskHistory(
+                self.config["history_db"] or str(Path(self.config["log_dir"]) / "task_history.db"),
+                retention_days=self.config.get("history_retention_days", 90)
+            )
+            self.history.start()
+
+        # Idle polling logs at INFO at most once per interval
+        self.idle_log = RateLimitedLog(self.logger, self.config.get("idle_log_interval", 120))
+
         # Initialize API client
         self.api_client = VercelAPIClient(
             base_url=self.config["vercel_api_url"],
@@ -42,88 +119,417 @@ class RunwayWorker:
             timeout=self.config["api_timeout"]
         )
 
-        # Initialize Runway client
+        # Initialize Runway client (generations are spread over every configured key)
+        self.runway_keys = RunwayKeyPool(
+            parse_keys(
+                self.config["runway_api_key"],
+                self.config.get("runway_api_keys"),
+                self.config.get("runway_key_concurrency", 1)
+            ),
+            cooldown_seconds=self.config.get("runway_key_cooldown_seconds", 60),
+            offset=(worker_index or 1) - 1
+        )
+        if len(self.runway_keys) > 1:
+            self.logger.info(f"Runway key pool: {self.runway_keys.status()}")
         self.runway_client = RunwayClient(
             api_key=self.config["runway_api_key"],
             model=self.config.get("runway_model", "gen4_turbo"),
-            timeout=self.config.get("runway_timeout", 600)
+            timeout=self.config.get("runway_timeout", 600),
+            poll_interval=self.config.get("runway_poll_interval", 5),
+            base_url=self.config.get("runway_base_url"),
+            key_pool=self.runway_keys
+        )
+
+        # Opt-in fallback to an equivalent model while the requested one is degraded
+        self.model_router = ModelRouter(
+            parse_fallbacks(self.config.get("model_fallbacks")),
+            queue_seconds=self.config.get("model_fallback_queue_seconds", 300),
+            error_rate=self.config.get("model_fallback_error_rate", 0.5),
+            window_seconds=self.config.get("model_fallback_window_seconds", 900),
+            min_samples=self.config.get("model_fallback_min_samples", 3)
         )
 
-        # Setup temp directory
+        # Expose HTTP connection reuse on /metrics
+        REGISTRY.register_collector(session_pool_collector("next_api", lambda: self.api_client.session))
+        REGISTRY.register_collector(session_pool_collector("storage", get_session))
+
+        # Expose live state on /worker/status
+        WORKER_STATUS.attach(self.config["worker_id"])
+
+        # Setup temp directory; task files go to per-task directories under temp_dir/work
         Path(self.config["temp_dir"]).mkdir(parents=True, exist_ok=True)
+        self.workspace = Workspace(
+            self.config["temp_dir"], self.config["worker_id"],
+            quota_bytes=self.config["workspace_quota_bytes"],
+            task_reserve_bytes=self.config["workspace_task_reserve_bytes"],
+            tmpfs_dir=self.config["workspace_tmpfs_dir"],
+            tmpfs_max_input_bytes=self.config["workspace_tmpfs_max_input_bytes"]
+        )
+
+        # Opt-in local copies of input photos by storage path
+        self.photo_cache = None
+        if self.config["photo_cache_enabled"]:
+            self.photo_cache = PhotoCache(
+                self.config["photo_cache_dir"] or str(Path(self.config["temp_dir"]) / "photo_cache"),
+                max_bytes=self.config["photo_cache_max_bytes"]
+            )
+
+        # Opt-in reuse of earlier generations for identical requests
+        self.result_cache = None
+        if self.config["result_cache_mode"] != "off":
+            self.result_cache = ResultCache(
+                self.config["result_cache_dir"] or str(Path(self.config["temp_dir"]) / "result_cache"),
+                mode=self.config["result_cache_mode"],
+                max_bytes=self.config["result_cache_max_bytes"],
+                ttl_days=self.config["result_cache_ttl_days"]
+            )
 
-        # Shutdown flag
+        # Shutdown flag; during drain no new work is leased and running
+        # generations get drain_grace_seconds before they are checkpointed
         self.shutdown_requested = False
+        self.drain_deadline: Optional[float] = None
+        self.checkpoint_path = Path(self.config["log_dir"]) / f"drain_checkpoint_{self.config['worker_id']}.json"
+
+        # Push wakeup: POST /worker/wake (or any local datagram) ends the idle wait early
+        self.wakeup = WakeupChannel(port=self.config.get("wakeup_port", 8001))
+        self.long_poll_seconds = self.config.get("next_task_long_poll_seconds", 0)
 
         # Heartbeat control
-        self.heartbeat_active = False
         self.heartbeat_interval = self.config.get("heartbeat_interval", 120)
 
+        # Leased tasks held locally; the policy picks which one runs next
+        self.job_estimator = JobEstimator(default_duration=self.config["runway_default_duration"])
+        self.local_queue = LocalTaskQueue(
+            policy=self.config["local_queue_policy"],
+            estimator=self.job_estimator,
+            max_wait_seconds=self.config["local_queue_max_wait_seconds"]
+        )
+        self.queue_heartbeat_job = None
+
         # Adaptive polling control
         self.last_task_time = None
         self.polling_interval_slow = self.config.get("polling_interval_slow", 60)
         self.polling_interval_fast = self.config.get("polling_interval_fast", 5)
         self.fast_polling_duration = self.config.get("fast_polling_duration", 1800)
 
+        # Polling strategy: "fast_after_task" (fixed fast/slow switch) or "arrival_rate"
+        self.polling_strategy = self.config.get("polling_strategy", "fast_after_task")
+        self.arrival_policy = None
+        if self.polling_strategy == "arrival_rate":
+            self.arrival_policy = ArrivalRatePolicy(
+                min_interval=self.polling_interval_fast,
+                max_interval=self.polling_interval_slow,
+                target_fraction=self.config.get("polling_target_fraction", 0.2),
+                jitter=self.config.get("polling_jitter", 0.2),
+                state_path=str(Path(self.config["log_dir"]) / f"polling_model_{self.config['worker_id']}.json")
+            )
+
+        # Runtime-tunable settings are re-read on SIGHUP or when the file changes
+        self.config_watcher = ConfigWatcher(config_path, base_config, self._apply_config_changes, log=self.logger)
+
         self.logger.info("="*60)
         self.logger.info(f"Worker initialized: {self.config['worker_id']}")
         self.logger.info(f"Next.js API: {self.config['vercel_api_url']}")
         self.logger.info(f"Runway Model: {self.config.get('runway_model', 'gen4_turbo')}")
         self.logger.info(f"Polling: {self.polling_interval_slow}s (slow) / {self.polling_interval_fast}s (fast after task)")
+        self.logger.info(f"Polling strategy: {self.polling_strategy}")
+        if self.config["local_queue_size"] > 1:
+            self.logger.info(f"Local queue: up to {self.config['local_queue_size']} leases, "
+                             f"policy {self.local_queue.policy}")
+        if self.long_poll_seconds:
+            self.logger.info(f"Long-poll next-task: up to {self.long_poll_seconds}s")
+        if self.result_cache is not None:
+            self.logger.info(f"Result cache: {self.result_cache.mode} ({self.result_cache.directory})")
         self.logger.info("="*60)
 
-    def _load_config(self, config_path: str) -> Dict[str, Any]:
-        """Load configuration from YAML file"""
-        config_file = Path(config_path)
-        if not config_file.exists():
-            raise FileNotFoundError(f"Config file not found: {config_path}")
-
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+    def _apply_config_changes(self, changed: Dict[str, Any]):
+        """
+        Apply reloaded settings (called from the config-watch job)
 
-        # Replace environment variables
-        for key, value in config.items():
-            if isinstance(value, str) and value.startswith("${") and value.endswith("}"):
-                env_var = value[2:-1]
-                config[key] = os.environ.get(env_var, value)
+        Values read from self.config per task take effect on the next task;
+        the rest are pushed into the objects that cache them. A task in
+        flight keeps running with the timeouts it started with.
+        """
+        self.config = {**self.config, **changed}
+
+        if "api_timeout" in changed:
+            self.api_client.timeout = changed["api_timeout"]
+        if "runway_timeout" in changed:
+            self.runway_client.timeout = changed["runway_timeout"]
+        if "runway_poll_interval" in changed:
+            self.runway_client.poll_interval = changed["runway_poll_interval"]
+        if "runway_key_cooldown_seconds" in changed:
+            self.runway_keys.cooldown_seconds = changed["runway_key_cooldown_seconds"]
+        if "model_fallbacks" in changed:
+            self.model_router.fallbacks = parse_fallbacks(changed["model_fallbacks"])
+        if "model_fallback_queue_seconds" in changed:
+            self.model_router.queue_seconds = changed["model_fallback_queue_seconds"]
+        if "model_fallback_error_rate" in changed:
+            self.model_router.error_rate = changed["model_fallback_error_rate"]
+        if "model_fallback_window_seconds" in changed:
+            self.model_router.window_seconds = changed["model_fallback_window_seconds"]
+        if "model_fallback_min_samples" in changed:
+            self.model_router.min_samples = changed["model_fallback_min_samples"]
+        if "heartbeat_interval" in changed:
+            self.heartbeat_interval = changed["heartbeat_interval"]
+            if self.queue_heartbeat_job is not None:
+                self.queue_heartbeat_job.interval = self.heartbeat_interval
+        if "next_task_long_poll_seconds" in changed:
+            self.long_poll_seconds = changed["next_task_long_poll_seconds"]
+        if "idle_log_interval" in changed:
+            self.idle_log.interval_seconds = changed["idle_log_interval"]
+        if "log_level" in changed:
+            set_log_level(self.logger, getattr(logging, changed["log_level"]))
+        if "profile_task_sample_rate" in changed:
+            PROFILER.task_sample_rate = changed["profile_task_sample_rate"]
+        if "profile_sample_seconds" in changed:
+            PROFILER.sample_seconds = changed["profile_sample_seconds"]
+        if "workspace_quota_bytes" in changed:
+            self.workspace.quota_bytes = changed["workspace_quota_bytes"]
+        if "workspace_task_reserve_bytes" in changed:
+            self.workspace.task_reserve_bytes = changed["workspace_task_reserve_bytes"]
+        if "workspace_tmpfs_max_input_bytes" in changed:
+            self.workspace.tmpfs_max_input_bytes = changed["workspace_tmpfs_max_input_bytes"]
+        if "local_queue_policy" in changed:
+            self.local_queue.policy = changed["local_queue_policy"]
+        if "local_queue_max_wait_seconds" in changed:
+            self.local_queue.max_wait_seconds = changed["local_queue_max_wait_seconds"]
+        if "runway_default_duration" in changed:
+            self.job_estimator.default_duration = changed["runway_default_duration"]
+        if self.photo_cache is not None:
+            self.photo_cache.max_bytes = self.config["photo_cache_max_bytes"]
+        if self.result_cache is not None:
+            self.result_cache.max_bytes = self.config["result_cache_max_bytes"]
+            self.result_cache.ttl_days = self.config["result_cache_ttl_days"]
+
+        self.polling_interval_slow = self.config["polling_interval_slow"]
+        self.polling_interval_fast = self.config["polling_interval_fast"]
+        self.fast_polling_duration = self.config["fast_polling_duration"]
+        if self.arrival_policy is not None:
+            self.arrival_policy.min_interval = self.polling_interval_fast
+            self.arrival_policy.max_interval = self.polling_interval_slow
+            self.arrival_policy.target_fraction = self.config["polling_target_fraction"]
+            self.arrival_policy.jitter = self.config["polling_jitter"]
+
+        # Let the idle wait pick up new polling intervals right away
+        self.wakeup.notify()
+
+    def _write_snapshot(self):
+        """Write metrics and status for the proxy's /metrics and /worker/status (pool mode)"""
+        try:
+            write_snapshot(self.snapshot_dir, self.config["worker_id"])
+        except OSError as e:
+            self.logger.warning(f"Failed to write pool snapshot: {e}")
 
-        return config
+    def _handle_reload(self, signum, frame):
+        """Handle SIGHUP: reload config on the next config-watch tick"""
+        self.config_watcher.request_reload()
 
     def _handle_shutdown(self, signum, frame):
-        """Handle shutdown signal"""
-        self.logger.info("Shutdown signal received, finishing current task...")
-        self.shutdown_requested = True
-
-    def _heartbeat_loop(self, item_id: str):
-        """Background heartbeat loop to extend task lease"""
-        while self.heartbeat_active:
-            time.sleep(self.heartbeat_interval)
-            if not self.heartbeat_active:
-                break
+        """
+        Handle shutdown signal: start draining
+
+        The first signal stops leasing, hands back tasks that are not
+        generating yet and gives a running generation drain_grace_seconds to
+        finish. A second signal ends the grace period right away.
+        """
+        now = time.monotonic()
+        if self.shutdown_requested:
+            self.logger.info("Second shutdown signal received, checkpointing running generation now...")
+            self.drain_deadline = now
+        else:
+            grace = self.config.get("drain_grace_seconds", 240)
+            self.logger.info(f"Shutdown signal received, draining (running generation gets up to {grace:.0f}s)...")
+            self.shutdown_requested = True
+            self.drain_deadline = now + grace
+        self.wakeup.notify()
+
+    def _drain_expired(self) -> bool:
+        """True once the drain grace period is over (polled by the Runway client)"""
+        return self.drain_deadline is not None and time.monotonic() >= self.drain_deadline
+
+    def _check_handoff(self):
+        """Give the task back instead of starting work on it while draining"""
+        if self.shutdown_requested:
+            raise TaskReleased()
+
+    def _load_checkpoint(self) -> List[Dict[str, Any]]:
+        """Generations left running by a previous drain"""
+        try:
+            return json.loads(self.checkpoint_path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Ignoring unreadable drain checkpoint {self.checkpoint_path}: {e}")
+            return []
+
+    def _save_checkpoint(self, entries: List[Dict[str, Any]]):
+        """Replace the checkpoint file (removed when empty)"""
+        if not entries:
+            self.checkpoint_path.unlink(missing_ok=True)
+            return
+        self.checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.checkpoint_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(entries, default=str), encoding="utf-8")
+        tmp_path.replace(self.checkpoint_path)
+
+    def _checkpoint_generation(self, task: Dict[str, Any], runway_task_id: str, key_label: Optional[str] = None):
+        """Remember a Runway task that is still generating so the next start can finish it"""
+        entries = [e for e in self._load_checkpoint() if e["task"]["item_id"] != task["item_id"]]
+        entries.append({
+            "task": task, "runway_task_id": runway_task_id, "runway_key": key_label,
+            "checkpointed_at": time.time()
+        })
+        self._save_checkpoint(entries)
+
+    def _resume_checkpointed(self):
+        """
+        Finish generations checkpointed by the previous drain
+
+        The item stays leased to this worker_id, so a heartbeat both checks
+        and extends the lease; if it was lost meanwhile the item has gone
+        back to the queue and the entry is dropped.
+        """
+        entries = self._load_checkpoint()
+        if not entries:
+            return
+        self._save_checkpoint([])
+        self.logger.info(f"Resuming {len(entries)} checkpointed generation(s)")
+
+        for index, entry in enumerate(entries):
+            if self.shutdown_requested:
+                # Keep what is left (plus anything checkpointed again) for the next start
+                self._save_checkpoint(self._load_checkpoint() + entries[index:])
+                return
+            task = entry["task"]
+            if not self.api_client.heartbeat(task["item_id"], extend_seconds=300):
+                self.logger.warning(f"[RESUME] Lease for item {task['item_id']} is gone, dropping checkpoint")
+                continue
+            self.logger.info(f"[RESUME] item_id: {task['item_id']}, Runway task: {entry['runway_task_id']}")
+            self.process_task(task, resume_task_id=entry["runway_task_id"], resume_key=entry.get("runway_key"))
+
+    def _wait(self, seconds: float) -> bool:
+        """
+        Sleep that returns as soon as a wakeup arrives or shutdown is requested
+
+        Returns:
+            True if woken up early
+        """
+        return self.wakeup.wait(seconds)
+
+    def _send_heartbeat(self, item_id: str):
+        """Extend task lease (run periodically by the shared scheduler)"""
+        try:
+            success = self.api_client.heartbeat(item_id, extend_seconds=300)
+            LEASE_EXTENSIONS.inc(result="success" if success else "failure")
+            if success:
+                WORKER_STATUS.set_lease_expiry(item_id, time.time() + 300)
+                self.logger.info(f"[HEARTBEAT] Lease extended for item {item_id}")
+        except Exception as e:
+            LEASE_EXTENSIONS.inc(result="failure")
+            self.logger.warning(f"[HEARTBEAT] Failed: {e}")
+
+    def _heartbeat_queued(self):
+        """Extend the leases of tasks waiting in the local queue (scheduler job)"""
+        for item_id in self.local_queue.item_ids():
+            self._send_heartbeat(item_id)
+
+    def _refresh_job_estimates(self):
+        """Feed measured per-model processing rates from the history into the job estimator"""
+        try:
+            rates = self.history.seconds_per_video_second(since=time.time() - 7 * 86400)
+        except Exception as e:
+            self.logger.warning(f"Could not read job estimates from history: {e}")
+            return
+        if rates:
+            self.job_estimator.update(rates)
+            self.logger.debug("Job estimates (s per video s): " + ", ".join(f"{m}={r:.1f}" for m, r in sorted(rates.items())))
+
+    def _lease_tasks(self):
+        """
+        Lease tasks until the local queue holds local_queue_size or the API has none
+
+        Only a request made with nothing held long-polls. When tasks are
+        already held, a failed request ends the round instead of delaying them.
+        Only the round's first request feeds the arrival model: the prefetch
+        requests after it return a backlog that was already waiting, not new
+        arrivals, and would pull the learned gap far below the real one.
+        """
+        first_request = True
+        while len(self.local_queue) < self.config["local_queue_size"] and not self.shutdown_requested:
+            held = len(self.local_queue)
+            if not self.workspace.can_admit():
+                # Admission control: no lease while the workspace quota or the disk is exhausted
+                self.idle_log.log("[WORKSPACE] Not enough space for another task, not leasing", time.time())
+                return
+            wait_seconds = 0 if held else self.long_poll_seconds
+            WORKER_STATUS.progress("polling", self.config["api_timeout"] + wait_seconds + 60)
+            self.logger.debug("[POLLING] Requesting next task...")
             try:
-                success = self.api_client.heartbeat(item_id, extend_seconds=300)
-                if success:
-                    self.logger.info(f"[HEARTBEAT] Lease extended for item {item_id}")
+                task = self.api_client.get_next_task(
+                    lease_duration_seconds=self.config.get("lease_duration_seconds", 600),
+                    wait_seconds=wait_seconds
+                )
             except Exception as e:
-                self.logger.warning(f"[HEARTBEAT] Failed: {e}")
+                if not held:
+                    raise
+                self.logger.warning(f"[POLLING] Prefetch failed, continuing with {held} held task(s): {e}")
+                return
+
+            self._record_poll(task is not None, observe=first_request)
+            first_request = False
+            if task is None:
+                return
+
+            self.idle_log.reset()
+            self.logger.info(f"[TASK RECEIVED] item_id: {task['item_id']}")
+            self.logger.info("")
+            self.local_queue.add(task)
+            WORKER_STATUS.queued = self.local_queue.item_ids()
+
+    def _release_queued(self):
+        """Hand back every task still waiting in the local queue (drain)"""
+        for task in self.local_queue.drain():
+            if self.api_client.release_task(task["item_id"], reason="drain"):
+                self.logger.info(f"[DRAIN] Released queued item {task['item_id']}")
+            else:
+                self.logger.warning(f"[DRAIN] Release not accepted, queued item {task['item_id']} returns to the queue when its lease expires")
+        WORKER_STATUS.queued = []
+
+    def _enter_step(self, item_id: str, step: str, budget_seconds: float):
+        """Mark a pipeline step on /worker/status and expect it to finish within budget"""
+        WORKER_STATUS.set_step(item_id, step)
+        WORKER_STATUS.progress("processing", budget_seconds)
+
+    @staticmethod
+    def _parse_lease_expiry(leased_until: Optional[str]) -> Optional[float]:
+        """Parse the API's ISO-8601 leased_until into a UNIX timestamp"""
+        if not leased_until:
+            return None
+        try:
+            return datetime.fromisoformat(leased_until.replace("Z", "+00:00")).timestamp()
+        except (TypeError, ValueError):
+            return None
 
-    def process_task(self, task: Dict[str, Any]) -> bool:
+    def process_task(self, task: Dict[str, Any], resume_task_id: Optional[str] = None,
+                     resume_key: Optional[str] = None) -> bool:
         """
         Process a single task
 
         Args:
             task: Task dictionary from API
+            resume_task_id: Runway task created before a restart; steps 1-2
+                are skipped and step 3 waits for this task instead
+            resume_key: Label of the Runway key that created resume_task_id
 
         Returns:
             True if task completed successfully, False otherwise
         """
         item_id = task["item_id"]
         group_id = task.get("group_id", "unknown")
-        photo_storage_path = task["photo_storage_path"]
-        prompt = task.get("prompt", "")
-        frame_num = task.get("frame_num")
         inference_provider = task.get("inference_provider", "gen4_turbo")
 
+        set_log_context(item_id=item_id, model=inference_provider, step=None)
         log_task_start(self.logger, item_id, group_id)
 
         # Model mapping based on inference_provider
@@ -142,121 +548,331 @@ class RunwayWorker:
         if model is None:
             # This task is for WAN worker, skip
             self.logger.warning(f"Task {item_id} is for WAN worker, skipping")
+            clear_log_context()
             return False
 
+        set_log_context(model=model)
+
+        with TRACER.trace(item_id, model=model, group_id=group_id) as trace_attrs, PROFILER.task(item_id):
+            status = self._run_task(task, model, resume_task_id)
+            trace_attrs["status"] = status
+        PROFILER.after_task()
+        return status == "completed"
+
+    @contextmanager
+    def _timed_step(self, step: str, model: str, timings: Dict[str, float]):
+        """Record a pipeline step as a metric, a trace span and a history timing"""
+        started = time.perf_counter()
+        try:
+            with TRACER.span(f"step.{step}"), STEP_DURATION.time(step=step, model=model):
+                yield
+        finally:
+            timings[step] = time.perf_counter() - started
+
+    def _run_task(self, task: Dict[str, Any], model: str, resume_task_id: Optional[str] = None) -> str:
+        """
+        Run the six pipeline steps for a task whose model is resolved
+
+        Args:
+            task: Task dictionary from API
+            model: Runway model the task asks for (model_routing may pick an
+                equivalent one; the choice is kept in task["routed_model"])
+            resume_task_id: See process_task
+
+        Returns:
+            Final status: "completed", "failed", "released" (handed back
+            during drain) or "checkpointed" (generation left running)
+        """
+        item_id = task["item_id"]
+        group_id = task.get("group_id", "unknown")
+        photo_storage_path = task["photo_storage_path"]
+        prompt = task.get("prompt", "")
+        frame_num = task.get("frame_num")
+
         # Calculate duration from frame_num (24fps)
         if frame_num:
             duration = frame_num / 24.0
             duration = max(2.0, min(10.0, duration))  # Clamp to 2-10 seconds
         else:
             duration = self.config.get("runway_default_duration", 5.0)
+        ratio = self.config.get("runway_default_ratio", "1280:720")
+
+        # A resumed generation keeps the model it was routed to before the restart
+        requested_model = model
+        model = task.get("routed_model", model)
+        if model != requested_model:
+            TRACER.set_model(model)
 
-        # Define temp file paths
+        # Temp file paths come from the task's workspace directory (opened below)
         input_filename = Path(photo_storage_path).name
-        temp_input = Path(self.config["temp_dir"]) / f"{item_id}_input{Path(input_filename).suffix}"
-        temp_output = Path(self.config["temp_dir"]) / f"{item_id}_output.mp4"
 
-        # Start heartbeat thread
-        self.heartbeat_active = True
-        heartbeat_thread = threading.Thread(target=self._heartbeat_loop, args=(item_id,))
-        heartbeat_thread.daemon = True
-        heartbeat_thread.start()
+        # Start heartbeat job
+        heartbeat_job = get_scheduler().add_job(
+            f"heartbeat-{item_id}",
+            lambda: self._send_heartbeat(item_id),
+            interval=self.heartbeat_interval,
+            initial_delay=self.heartbeat_interval
+        )
 
         runway_task_id = None
+        video_storage_path = None
+        cache_key = None
+        queue_wait = None
+
+        def remember_task_id(task_id: str):
+            nonlocal runway_task_id
+            runway_task_id = task_id
+            WORKER_STATUS.set_runway_task_id(item_id, task_id)
+            self.logger.info(f"Runway task created: {task_id}")
+
+        def remember_queue_wait(seconds: float):
+            nonlocal queue_wait
+            queue_wait = seconds
+
+        api_budget = self.config["api_timeout"] + 60
+        transfer_budget = 300 + 60
+        generation_budget = self.config.get("runway_timeout", 600) + transfer_budget
+
+        TASKS_IN_FLIGHT.inc()
+        WORKER_STATUS.start_item(item_id, group_id, model, self._parse_lease_expiry(task.get("leased_until")))
+        final_status = "failed"
+        started_at = time.time()
+        step_timings: Dict[str, float] = {}
+        input_bytes = output_bytes = None
+        error_message = None
 
         try:
-            # Step 1: Get presigned download URL
-            log_step(self.logger, 1, "Getting download URL...")
-            presign_data = self.api_client.get_presigned_download_url(photo_storage_path)
-            download_url = presign_data["url"]
-
-            # Step 2: Download input image
-            log_step(self.logger, 2, f"Downloading input image: {input_filename}")
-            download_file(download_url, str(temp_input))
-            self.logger.info(f"Downloaded to: {temp_input}")
-
-            # Step 3: Run Runway I2V generation (uploads to Runway, then generates)
-            log_step(self.logger, 3, "Uploading to Runway and generating video...")
-            self.logger.info(f"Prompt: {prompt}")
-            self.logger.info(f"Model: {model}")
-            self.logger.info(f"Duration: {duration:.2f}s")
-            self.logger.info(f"Ratio: {self.config.get('runway_default_ratio', '1280:720')}")
-
-            self.runway_client.generate_video(
-                input_image_path=str(temp_input),
-                output_video_path=str(temp_output),
-                prompt=prompt,
-                duration=duration,
-                ratio=self.config.get("runway_default_ratio", "1280:720"),
-                model_override=model
-            )
-            self.logger.info(f"Generation complete: {temp_output}")
-
-            # Step 4: Get presigned upload URL
-            log_step(self.logger, 4, "Getting upload URL...")
-            presign_data = self.api_client.get_presigned_upload_url(
-                video_item_id=item_id,
-                file_extension="mp4"
-            )
-            upload_url = presign_data["url"]
-            video_storage_path = presign_data["storage_path"]
-
-            # Step 5: Upload result
-            log_step(self.logger, 5, "Uploading result video...")
-            upload_file(str(temp_output), upload_url, "video/mp4")
-            self.logger.info(f"Uploaded to: {video_storage_path}")
+            workspace = self.workspace.open(item_id)
+            temp_input = workspace.input_path(Path(input_filename).suffix)
+            temp_output = workspace.output_path()
+
+            if resume_task_id is None:
+                # Steps 1-2 are skipped when the photo is in the local cache
+                self._check_handoff()
+                cached_photo = self.photo_cache.lookup(photo_storage_path) if self.photo_cache is not None else None
+                if (cached_photo is not None and not self.config["photo_cache_revalidate"]
+                        and self.photo_cache.copy_to(cached_photo, str(temp_input))):
+                    log_step(self.logger, 1, f"Input image cached, skipping presign and download: {input_filename}")
+                else:
+                    # Step 1: Get presigned download URL
+                    log_step(self.logger, 1, "Getting download URL...")
+                    self._enter_step(item_id, "presign_download", api_budget)
+                    with self._timed_step("presign_download", model, step_timings):
+                        presign_data = self.api_client.get_presigned_download_url(photo_storage_path)
+                    download_url = presign_data["url"]
+
+                    # Step 2: Download input image (If-None-Match when revalidating a cached copy)
+                    self._check_handoff()
+                    log_step(self.logger, 2, f"Downloading input image: {input_filename}")
+                    self._enter_step(item_id, "download_input", transfer_budget)
+                    with self._timed_step("download_input", model, step_timings):
+                        downloaded, etag = download_file_conditional(
+                            download_url, str(temp_input), etag=cached_photo.etag if cached_photo else None
+                        )
+                        if not downloaded and not self.photo_cache.copy_to(cached_photo, str(temp_input)):
+                            downloaded, etag = download_file_conditional(download_url, str(temp_input))
+                    if downloaded:
+                        BYTES_TRANSFERRED.inc(temp_input.stat().st_size, operation="download_input")
+                        self.logger.info(f"Downloaded to: {temp_input}")
+                        if self.photo_cache is not None:
+                            self.photo_cache.put(photo_storage_path, str(temp_input), etag)
+                    else:
+                        self.logger.info("Input image not modified, using cached copy")
+                temp_input = workspace.settle_input(temp_input)
+                input_bytes = temp_input.stat().st_size
+
+                # Step 3: Run Runway I2V generation (uploads to Runway, then generates)
+                self._check_handoff()
+                cached = None
+                if self.result_cache is not None:
+                    cache_key = self.result_cache.key_for(str(temp_input), prompt, model, duration, ratio)
+                    cached = self.result_cache.fetch(cache_key, str(temp_output))
+
+                if cached is None:
+                    routed_model, reason = self.model_router.route(model)
+                    if reason is not None:
+                        self.logger.warning(f"[FALLBACK] {model} -> {routed_model}: {reason}")
+                        model = task["routed_model"] = routed_model
+                        set_log_context(model=model)
+                        TRACER.set_model(routed_model)
+                        if cache_key is not None:
+                            # The same request may already have been generated on the fallback
+                            cache_key = self.result_cache.key_for(str(temp_input), prompt, model, duration, ratio)
+                            cached = self.result_cache.fetch(cache_key, str(temp_output))
+
+                if cached is not None:
+                    log_step(self.logger, 3, f"Reusing cached generation (Runway task {cached.runway_task_id})")
+                    runway_task_id = cached.runway_task_id
+                    video_storage_path = cached.storage_path
+                else:
+                    log_step(self.logger, 3, "Uploading to Runway and generating video...")
+                    self._enter_step(item_id, "generation", generation_budget)
+                    self.logger.info(f"Prompt: {prompt}")
+                    self.logger.info(f"Model: {model}")
+                    self.logger.info(f"Duration: {duration:.2f}s")
+                    self.logger.info(f"Ratio: {ratio}")
+
+                    try:
+                        with self._timed_step("generation", model, step_timings):
+                            self.runway_client.generate_video(
+                                input_image_path=str(temp_input),
+                                output_video_path=str(temp_output),
+                                prompt=prompt,
+                                duration=duration,
+                                ratio=ratio,
+                                model_override=model,
+                                on_task_created=remember_task_id,
+                                should_stop=self._drain_expired,
+                                on_queue_wait=remember_queue_wait
+                            )
+                    except GenerationInterrupted:
+                        raise
+                    except Exception:
+                        self.model_router.record(model, queue_wait, failed=True)
+                        raise
+                    self.model_router.record(model, queue_wait, failed=False)
+                    if self.result_cache is not None:
+                        self.result_cache.store_video(cache_key, str(temp_output), model, runway_task_id)
+            else:
+                # Step 3 (resumed): the Runway task already exists
+                log_step(self.logger, 3, f"Waiting for checkpointed Runway task {resume_task_id}...")
+                self._enter_step(item_id, "generation", generation_budget)
+                runway_task_id = resume_task_id
+                WORKER_STATUS.set_runway_task_id(item_id, resume_task_id)
+                with self._timed_step("generation", model, step_timings):
+                    self.runway_client.resume_video(
+                        resume_task_id, str(temp_output), model=model, should_stop=self._drain_expired,
+                        key_label=resume_key
+                    )
+
+            if video_storage_path is not None:
+                # Cached in storage_path mode: the video is already uploaded
+                self.logger.info(f"Reusing stored video: {video_storage_path}")
+            else:
+                self.logger.info(f"Generation complete: {temp_output}")
+
+                # Step 4: Get presigned upload URL
+                log_step(self.logger, 4, "Getting upload URL...")
+                self._enter_step(item_id, "presign_upload", api_budget)
+                with self._timed_step("presign_upload", model, step_timings):
+                    presign_data = self.api_client.get_presigned_upload_url(
+                        video_item_id=item_id,
+                        file_extension="mp4"
+                    )
+                upload_url = presign_data["url"]
+                video_storage_path = presign_data["storage_path"]
+
+                # Step 5: Upload result
+                log_step(self.logger, 5, "Uploading result video...")
+                self._enter_step(item_id, "upload_output", transfer_budget)
+                with self._timed_step("upload_output", model, step_timings):
+                    upload_file(str(temp_output), upload_url, "video/mp4")
+                output_bytes = temp_output.stat().st_size
+                BYTES_TRANSFERRED.inc(output_bytes, operation="upload_output")
+                self.logger.info(f"Uploaded to: {video_storage_path}")
+                if cache_key is not None:
+                    self.result_cache.store_storage_path(cache_key, video_storage_path)
 
             # Step 6: Report success
             log_step(self.logger, 6, "Reporting task completion...")
-            self.api_client.report_task_result(
-                item_id=item_id,
-                status="completed",
-                video_storage_path=video_storage_path,
-                runway_task_id=runway_task_id
-            )
+            self._enter_step(item_id, "report", api_budget)
+            with self._timed_step("report", model, step_timings):
+                self.api_client.report_task_result(
+                    item_id=item_id,
+                    status="completed",
+                    video_storage_path=video_storage_path,
+                    runway_task_id=runway_task_id,
+                    model=model,
+                    requested_model=requested_model
+                )
 
             log_task_complete(self.logger, item_id, "SUCCESS")
-
-            # Cleanup temp files
-            if self.config.get("auto_cleanup_temp", True):
-                cleanup_file(str(temp_input))
-                cleanup_file(str(temp_output))
-
-            return True
+            TASKS_TOTAL.inc(model=model, status="completed")
+            final_status = "completed"
+            return final_status
+
+        except (TaskReleased, WorkspaceFull) as e:
+            # Draining before generation started, or no disk space for the task: give the lease back
+            reason = "drain" if isinstance(e, TaskReleased) else "workspace_full"
+            if reason == "workspace_full":
+                self.logger.warning(f"[WORKSPACE] {e}")
+            if self.api_client.release_task(item_id, reason=reason):
+                self.logger.info(f"[RELEASE] Released lease for item {item_id} ({reason})")
+            else:
+                self.logger.warning(f"[RELEASE] Release not accepted, item {item_id} returns to the queue when its lease expires")
+            log_task_complete(self.logger, item_id, "RELEASED")
+            TASKS_TOTAL.inc(model=model, status="released")
+            final_status = "released"
+            return final_status
+
+        except GenerationInterrupted as e:
+            # Drain grace period over: the lease stays ours and the next start resumes the Runway task
+            self._checkpoint_generation(task, e.task_id, e.key_label)
+            self.logger.info(f"[DRAIN] Checkpointed item {item_id} (Runway task {e.task_id}) to {self.checkpoint_path}")
+            log_task_complete(self.logger, item_id, "CHECKPOINTED")
+            TASKS_TOTAL.inc(model=model, status="checkpointed")
+            final_status = "checkpointed"
+            return final_status
 
         except Exception as e:
             # Report failure
             log_error(self.logger, f"Task {item_id} failed", e)
+            WORKER_STATUS.record_error(e)
+            error_message = str(e)
 
             try:
                 self.api_client.report_task_result(
                     item_id=item_id,
                     status="failed",
-                    error_message=f"Runway: {str(e)}"
+                    error_message=f"Runway: {str(e)}",
+                    model=model,
+                    requested_model=requested_model
                 )
             except Exception as report_error:
                 log_error(self.logger, "Failed to report task failure", report_error)
 
             log_task_complete(self.logger, item_id, "FAILED")
-
-            # Cleanup temp files
-            cleanup_file(str(temp_input))
-            cleanup_file(str(temp_output))
-
-            return False
+            TASKS_TOTAL.inc(model=model, status="failed")
+            return final_status
 
         finally:
-            # Stop heartbeat thread
-            self.heartbeat_active = False
-            heartbeat_thread.join(timeout=1)
+            # Remove the task's files (completed ones are kept with auto_cleanup_temp: false)
+            self.workspace.close(
+                item_id, keep=final_status == "completed" and not self.config.get("auto_cleanup_temp", True)
+            )
+            TASKS_IN_FLIGHT.dec()
+            WORKER_STATUS.finish_item(item_id, final_status)
+            if self.history is not None:
+                self.history.record_task(
+                    item_id, model, final_status, started_at, time.time(),
+                    steps=step_timings,
+                    group_id=group_id,
+                    worker_id=self.config["worker_id"],
+                    video_seconds=duration,
+                    input_bytes=input_bytes,
+                    output_bytes=output_bytes,
+                    runway_task_id=runway_task_id,
+                    error=error_message
+                )
 
-    def _get_polling_interval(self) -> int:
+            # Stop heartbeat job
+            get_scheduler().cancel(heartbeat_job)
+            clear_log_context()
+
+    def _get_polling_interval(self) -> float:
         """
-        Calculate current polling interval based on last task time
+        Calculate current polling interval
+
+        With the "arrival_rate" strategy the interval comes from the arrival
+        model; otherwise it is fast for fast_polling_duration after the last
+        task and slow the rest of the time.
 
         Returns:
-            Polling interval in seconds (fast or slow)
+            Polling interval in seconds
         """
+        if self.arrival_policy is not None:
+            return self.arrival_policy.next_interval()
+
         if self.last_task_time is None:
             return self.polling_interval_slow
 
@@ -266,45 +882,127 @@ class RunwayWorker:
         else:
             return self.polling_interval_slow
 
+    def _record_poll(self, got_task: bool, observe: bool = True):
+        """
+        Update polling metrics and the arrival model after a next-task call
+
+        Args:
+            got_task: True if the call returned a task
+            observe: False to leave the arrival model out (prefetch within a lease round)
+        """
+        POLLS_TOTAL.inc(result="task" if got_task else "empty")
+        if self.arrival_policy is not None and observe:
+            self.arrival_policy.observe_poll(got_task)
+            ARRIVAL_RATE.set(self.arrival_policy.arrival_rate() * 3600)
+            if got_task:
+                self.arrival_policy.save()
+
+    def _set_polling_interval(self, interval: float):
+        """Publish the interval the loop is about to wait"""
+        WORKER_STATUS.polling_interval = interval
+        POLLING_INTERVAL.set(interval)
+        # A task arriving at a random moment waits half an interval on average
+        EXPECTED_PICKUP_LATENCY.set(interval / 2)
+
     def run(self):
         """Main polling loop"""
         # Register signal handlers
         signal.signal(signal.SIGINT, self._handle_shutdown)
         signal.signal(signal.SIGTERM, self._handle_shutdown)
+        if hasattr(signal, "SIGHUP"):
+            signal.signal(signal.SIGHUP, self._handle_reload)
+        # SIGUSR1: thread stacks + sampling profile into log_dir/profiles
+        PROFILER.install_signal_handler()
+
+        if self.wakeup.open():
+            self.logger.info(f"Push wakeup listening on udp://{self.wakeup.host}:{self.wakeup.port}")
+        else:
+            self.logger.info("Push wakeup unavailable, using timed polling only")
+
+        # Watch config.yaml for runtime-tunable changes (and serve SIGHUP requests)
+        self.config_job = get_scheduler().add_job(
+            "config-watch", self.config_watcher.check,
+            interval=self.config["config_watch_interval"],
+            initial_delay=self.config["config_watch_interval"]
+        )
+
+        # Apply the history retention policy shortly after start, then every 6 hours
+        self.history_job = None
+        if self.history is not None:
+            self.history_job = get_scheduler().add_job(
+                "history-compact", self.history.compact, interval=6 * 3600, initial_delay=60
+            )
+
+        # Expire old cached results on the same schedule
+        self.result_cache_job = None
+        if self.result_cache is not None:
+            self.result_cache_job = get_scheduler().add_job(
+                "result-cache-compact", self.result_cache.compact, interval=6 * 3600, initial_delay=90
+            )
+
+        # Keep leases of locally queued tasks alive, and learn job sizes from the history
+        self.queue_heartbeat_job = get_scheduler().add_job(
+            "local-queue-heartbeat", self._heartbeat_queued,
+            interval=self.heartbeat_interval, initial_delay=self.heartbeat_interval
+        )
+        self.estimate_job = None
+        if self.history is not None:
+            self.estimate_job = get_scheduler().add_job(
+                "job-estimates", self._refresh_job_estimates, interval=3600, initial_delay=5
+            )
+
+        # Pool mode: publish metrics and status for the proxy process
+        self.snapshot_job = None
+        if self.snapshot_dir is not None:
+            self.snapshot_job = get_scheduler().add_job(
+                "pool-snapshot", self._write_snapshot, interval=5
+            )
+
+        # Remove task files a crash or kill left behind (nothing is active yet)
+        removed = self.workspace.sweep()
+        if removed:
+            self.logger.info(f"Workspace: removed {removed} leftover file(s)/director(ies) from earlier runs")
+
+        # Finish generations the previous run left running when it drained
+        self._resume_checkpointed()
 
         self.logger.info("Starting polling loop...")
         self.logger.info("")
 
         while not self.shutdown_requested:
             try:
-                # Calculate current polling interval
-                current_interval = self._get_polling_interval()
-
-                # Get next task
-                self.logger.info("[POLLING] Requesting next task...")
-                task = self.api_client.get_next_task(
-                    lease_duration_seconds=self.config.get("lease_duration_seconds", 600)
-                )
+                # Top up the local queue, then let the policy pick the next task
+                self._lease_tasks()
+                task = self.local_queue.pop()
+                WORKER_STATUS.queued = self.local_queue.item_ids()
 
                 if task is None:
-                    self.logger.info("[IDLE] No task available")
-                    self.logger.info(f"Waiting {current_interval} seconds...")
-                    self.logger.info("")
-                    time.sleep(current_interval)
+                    # Calculate current polling interval
+                    current_interval = self._get_polling_interval()
+                    self._set_polling_interval(current_interval)
+
+                    self.idle_log.log(f"[IDLE] No task available, next poll in {current_interval}s", time.time())
+                    WORKER_STATUS.progress("idle", current_interval + 60)
+                    if self._wait(current_interval) and not self.shutdown_requested:
+                        self.logger.info("[WAKEUP] Woken up, polling now")
                     continue
 
                 # Process task
-                self.logger.info(f"[TASK RECEIVED] item_id: {task['item_id']}")
-                self.logger.info("")
                 success = self.process_task(task)
+                group_seconds = self.local_queue.task_finished(task)
+                if group_seconds is not None:
+                    self.logger.info(f"[GROUP] {task.get('group_id')} finished locally in {group_seconds:.0f}s "
+                                     f"(policy {self.local_queue.policy})")
 
                 # Update last task time after processing
                 self.last_task_time = time.time()
-                self.logger.info(f"Task completed. Switching to fast polling ({self.polling_interval_fast}s) for {self.fast_polling_duration}s")
-                self.logger.info("")
+                if self.arrival_policy is None:
+                    self.logger.info(f"Task completed. Switching to fast polling ({self.polling_interval_fast}s) for {self.fast_polling_duration}s")
+                    self.logger.info("")
 
-                # Brief pause before next poll
-                time.sleep(1)
+                # Brief pause before next poll (none while draining)
+                if not self.shutdown_requested:
+                    self._wait(1)
 
             except KeyboardInterrupt:
                 self.logger.info("KeyboardInterrupt received, shutting down...")
@@ -312,10 +1010,31 @@ class RunwayWorker:
 
             except Exception as e:
                 log_error(self.logger, "Error in main loop", e)
+                WORKER_STATUS.record_error(e)
                 current_interval = self._get_polling_interval()
+                WORKER_STATUS.progress("error_backoff", current_interval + 60)
                 self.logger.info(f"Retrying in {current_interval} seconds...")
-                time.sleep(current_interval)
-
+                self._wait(current_interval)
+
+        self._release_queued()
+        self.wakeup.close()
+        if self.arrival_policy is not None:
+            self.arrival_policy.save()
+        TRACER.flush()
+        get_scheduler().cancel(self.config_job)
+        get_scheduler().cancel(self.queue_heartbeat_job)
+        if self.estimate_job is not None:
+            get_scheduler().cancel(self.estimate_job)
+        if self.history is not None:
+            get_scheduler().cancel(self.history_job)
+            self.history.stop()
+        if self.result_cache_job is not None:
+            get_scheduler().cancel(self.result_cache_job)
+        WORKER_STATUS.state = "stopped"
+        WORKER_STATUS.expect_progress_by = None
+        if self.snapshot_dir is not None:
+            get_scheduler().cancel(self.snapshot_job)
+            self._write_snapshot()
         self.logger.info("Worker shutdown complete")
 
 
@@ -0,0 +1,154 @@
+"""
+Live worker state shared with the FastAPI server
+
+Only the worker's own threads write here. Every update is a single attribute
+assignment or a copy-on-write dict swap, both atomic under the GIL, so the
+server can read a consistent-enough snapshot without taking any lock on the
+worker's hot path.
+"""
+import time
+from collections import Counter, deque
+from typing import Any, Dict, List, Optional
+
+
+class InFlightItem:
+    """State of one task being processed"""
+
+    def __init__(self, item_id: str, group_id: str, model: str, lease_expires_at: Optional[float]):
+        self.item_id = item_id
+        self.group_id = group_id
+        self.model = model
+        self.started_at = time.time()
+        self.step = "starting"
+        self.step_started_at = self.started_at
+        self.runway_task_id: Optional[str] = None
+        self.lease_expires_at = lease_expires_at
+
+    def to_dict(self, now: float) -> Dict[str, Any]:
+        return {
+            "item_id": self.item_id,
+            "group_id": self.group_id,
+            "model": self.model,
+            "step": self.step,
+            "elapsed_seconds": round(now - self.started_at, 1),
+            "step_elapsed_seconds": round(now - self.step_started_at, 1),
+            "runway_task_id": self.runway_task_id,
+            "lease_expires_in_seconds": (
+                round(self.lease_expires_at - now, 1) if self.lease_expires_at else None
+            ),
+        }
+
+
+class WorkerStatus:
+    """Snapshot-able state of the running RunwayWorker"""
+
+    def __init__(self, history_size: int = 500, error_history_size: int = 50):
+        self.attached = False
+        self.worker_id: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.state = "stopped"
+        self.polling_interval: Optional[float] = None
+        self.last_progress_at: Optional[float] = None
+        self.expect_progress_by: Optional[float] = None
+        self.queued: List[str] = []  # leased item_ids held in the local queue
+        self._in_flight: Dict[str, InFlightItem] = {}
+        self._completions = deque(maxlen=history_size)  # (finished_at, status, duration)
+        self._errors = deque(maxlen=error_history_size)  # (at, error class, message)
+
+    def attach(self, worker_id: str):
+        """Called once by RunwayWorker on startup"""
+        self.attached = True
+        self.worker_id = worker_id
+        self.started_at = time.time()
+        self.state = "starting"
+
+    def progress(self, state: str, budget_seconds: float):
+        """
+        Record that the main loop made progress
+
+        Args:
+            state: Current loop state (e.g. "polling", "idle", "processing")
+            budget_seconds: Time within which the next progress is expected
+        """
+        now = time.time()
+        self.state = state
+        self.last_progress_at = now
+        self.expect_progress_by = now + budget_seconds
+
+    def start_item(self, item_id: str, group_id: str, model: str, lease_expires_at: Optional[float] = None):
+        self._in_flight = {**self._in_flight, item_id: InFlightItem(item_id, group_id, model, lease_expires_at)}
+
+    def set_step(self, item_id: str, step: str):
+        item = self._in_flight.get(item_id)
+        if item is not None:
+            item.step_started_at = time.time()
+            item.step = step
+
+    def set_runway_task_id(self, item_id: str, runway_task_id: str):
+        item = self._in_flight.get(item_id)
+        if item is not None:
+            item.runway_task_id = runway_task_id
+
+    def set_lease_expiry(self, item_id: str, lease_expires_at: float):
+        item = self._in_flight.get(item_id)
+        if item is not None:
+            item.lease_expires_at = lease_expires_at
+
+    def finish_item(self, item_id: str, status: str):
+        item = self._in_flight.get(item_id)
+        remaining = {k: v for k, v in self._in_flight.items() if k != item_id}
+        self._in_flight = remaining
+        if item is not None:
+            now = time.time()
+            self._completions.append((now, status, now - item.started_at))
+
+    def record_error(self, error: BaseException):
+        self._errors.append((time.time(), type(error).__name__, str(error)[:200]))
+
+    def is_stalled(self, now: Optional[float] = None) -> bool:
+        """True when the main loop missed its own progress deadline"""
+        if not self.attached or self.expect_progress_by is None:
+            return False
+        return (now or time.time()) > self.expect_progress_by
+
+    def snapshot(self, window_seconds: float = 3600) -> Dict[str, Any]:
+        """Read-only view for the /worker/status endpoint"""
+        now = time.time()
+        in_flight = list(self._in_flight.values())
+        completions = [c for c in list(self._completions) if now - c[0] <= window_seconds]
+        errors = list(self._errors)
+
+        completed = [c for c in completions if c[1] == "completed"]
+        durations = sorted(c[2] for c in completed)
+
+        return {
+            "worker_id": self.worker_id,
+            "state": self.state,
+            "stalled": self.is_stalled(now),
+            "uptime_seconds": round(now - self.started_at, 1) if self.started_at else None,
+            "polling_interval_seconds": self.polling_interval,
+            "last_progress_seconds_ago": (
+                round(now - self.last_progress_at, 1) if self.last_progress_at else None
+            ),
+            "in_flight": [item.to_dict(now) for item in in_flight],
+            "queued": list(self.queued),
+            "throughput": {
+                "window_seconds": window_seconds,
+                "completed": len(completed),
+                "failed": sum(1 for c in completions if c[1] == "failed"),
+                "tasks_per_hour": round(len(completed) * 3600 / window_seconds, 2),
+                "median_duration_seconds": (
+                    round(durations[len(durations) // 2], 1) if durations else None
+                ),
+            },
+            "recent_errors": {
+                "by_class": dict(Counter(e[1] for e in errors)),
+                "latest": [
+                    {"seconds_ago": round(now - at, 1), "class": cls, "message": msg}
+                    for at, cls, msg in errors[-10:]
+                ],
+            },
+        }
+
+
+WORKER_STATUS = WorkerStatus()
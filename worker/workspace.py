@@ -0,0 +1,233 @@
+"""
+Managed temp workspace for task files
+
+Every task gets its own directory, temp_dir/work/{worker_id}/{item_id}/,
+instead of loose {item_id}_input.* / {item_id}_output.mp4 files in temp_dir.
+That makes cleanup a single rmtree and lets the worker tell its own live
+files from leftovers:
+
+- Quota and admission: opening a task reserves workspace_task_reserve_bytes.
+  If the reservation does not fit in workspace_quota_bytes (or in the free
+  disk space), finished task directories kept for debugging
+  (auto_cleanup_temp: false) are evicted, least recently used first; if it
+  still does not fit, open() raises WorkspaceFull and the worker hands the
+  lease back instead of failing halfway through a download.
+- Orphan sweep: at startup every task directory of this worker that was not
+  deliberately retained is removed (nothing is active yet), as are loose
+  files from the old flat layout. Other pool workers have their own
+  directories, so they are never touched.
+- tmpfs: with workspace_tmpfs_dir set (e.g. /dev/shm), input photos are
+  downloaded to RAM when there is room; one larger than
+  workspace_tmpfs_max_input_bytes is moved to disk after the download.
+  Generated videos always go to disk.
+
+Caches under temp_dir (result_cache, photo_cache) are not part of the
+workspace and have their own size limits.
+"""
+import logging
+import re
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from .metrics import WORKSPACE_BYTES
+
+logger = logging.getLogger(__name__)
+
+# Loose files written before task directories existed
+LEGACY_PATTERN = re.compile(r".+_(input\.[A-Za-z0-9]+|output\.mp4)$")
+
+# Marks a finished task directory kept on purpose (auto_cleanup_temp: false)
+RETAINED_MARKER = ".retained"
+
+
+class WorkspaceFull(Exception):
+    """Raised when a task cannot get its disk reservation"""
+
+
+def _tree_bytes(path: Path) -> int:
+    total = 0
+    for child in path.rglob("*"):
+        try:
+            if child.is_file():
+                total += child.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+class TaskWorkspace:
+    """Files of one task"""
+
+    def __init__(self, item_id: str, directory: Path, tmpfs_directory: Optional[Path],
+                 tmpfs_max_input_bytes: int):
+        self.item_id = item_id
+        self.directory = directory
+        self.tmpfs_directory = tmpfs_directory
+        self.tmpfs_max_input_bytes = tmpfs_max_input_bytes
+
+    def input_path(self, suffix: str) -> Path:
+        """Where to download the input photo (tmpfs when enabled and it has room)"""
+        if self.tmpfs_directory is not None:
+            try:
+                self.tmpfs_directory.mkdir(parents=True, exist_ok=True)
+                if shutil.disk_usage(self.tmpfs_directory).free >= 2 * self.tmpfs_max_input_bytes:
+                    return self.tmpfs_directory / f"input{suffix}"
+            except OSError as e:
+                logger.debug(f"tmpfs unavailable for {self.item_id}: {e}")
+        return self.directory / f"input{suffix}"
+
+    def settle_input(self, path: Path) -> Path:
+        """Move a downloaded input that is too large for tmpfs to disk"""
+        if self.tmpfs_directory is None or path.parent != self.tmpfs_directory:
+            return path
+        if path.stat().st_size <= self.tmpfs_max_input_bytes:
+            return path
+        target = self.directory / path.name
+        shutil.move(str(path), str(target))
+        return target
+
+    def output_path(self) -> Path:
+        return self.directory / "output.mp4"
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        if self.tmpfs_directory is not None:
+            shutil.rmtree(self.tmpfs_directory, ignore_errors=True)
+
+
+class Workspace:
+    """Per-worker task directories with a byte quota"""
+
+    def __init__(self, temp_dir: str, worker_id: str, quota_bytes: int = 5 * 1024 ** 3,
+                 task_reserve_bytes: int = 100 * 1024 * 1024, tmpfs_dir: Optional[str] = None,
+                 tmpfs_max_input_bytes: int = 20 * 1024 * 1024):
+        """
+        Args:
+            temp_dir: Configured temp_dir
+            worker_id: Namespace of this worker's directories
+            quota_bytes: Upper bound for this worker's task files (0 = no quota)
+            task_reserve_bytes: Space reserved when a task starts
+            tmpfs_dir: RAM-backed directory for input photos (None = disk only)
+            tmpfs_max_input_bytes: Inputs larger than this are moved to disk
+        """
+        self.temp_dir = Path(temp_dir)
+        self.root = self.temp_dir / "work" / worker_id
+        self.tmpfs_root = Path(tmpfs_dir) / "runway-work" / worker_id if tmpfs_dir else None
+        self.quota_bytes = quota_bytes
+        self.task_reserve_bytes = task_reserve_bytes
+        self.tmpfs_max_input_bytes = tmpfs_max_input_bytes
+        self._active: Dict[str, TaskWorkspace] = {}
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def _task(self, item_id: str) -> TaskWorkspace:
+        return TaskWorkspace(
+            item_id, self.root / item_id,
+            self.tmpfs_root / item_id if self.tmpfs_root is not None else None,
+            self.tmpfs_max_input_bytes
+        )
+
+    def _retained(self) -> Set[str]:
+        """Finished task directories still on disk"""
+        return {path.name for path in self.root.iterdir() if path.is_dir()} - set(self._active)
+
+    def bytes_used(self) -> int:
+        """Bytes on disk plus what active tasks may still write within their reservation"""
+        used = _tree_bytes(self.root)
+        for task in self._active.values():
+            used += max(0, self.task_reserve_bytes - _tree_bytes(task.directory))
+        return used
+
+    def open(self, item_id: str) -> TaskWorkspace:
+        """
+        Create the task directory after checking the quota
+
+        Raises:
+            WorkspaceFull if the reservation does not fit even after evicting
+            retained task directories
+        """
+        self._make_room(self.task_reserve_bytes)
+        task = self._task(item_id)
+        task.directory.mkdir(parents=True, exist_ok=True)
+        self._active[item_id] = task
+        WORKSPACE_BYTES.set(self.bytes_used())
+        return task
+
+    def close(self, item_id: str, keep: bool = False):
+        """Finish a task: remove its files, or keep them for inspection (evicted LRU under pressure)"""
+        task = self._active.pop(item_id, None) or self._task(item_id)
+        try:
+            if keep:
+                task.directory.mkdir(parents=True, exist_ok=True)
+                (task.directory / RETAINED_MARKER).write_text(str(time.time()), encoding="utf-8")
+                if task.tmpfs_directory is not None and task.tmpfs_directory.exists():
+                    # RAM is not for keeping things around
+                    for path in task.tmpfs_directory.iterdir():
+                        shutil.move(str(path), str(task.directory / path.name))
+                    shutil.rmtree(task.tmpfs_directory, ignore_errors=True)
+            else:
+                task.remove()
+        except OSError as e:
+            logger.warning(f"Workspace cleanup for {item_id} failed: {e}")
+        WORKSPACE_BYTES.set(self.bytes_used())
+
+    def can_admit(self) -> bool:
+        """True if one more task would get its reservation (evicting retained directories if needed)"""
+        try:
+            self._make_room(self.task_reserve_bytes)
+            return True
+        except WorkspaceFull:
+            return False
+
+    def _make_room(self, needed: int):
+        def fits() -> bool:
+            if self.quota_bytes and self.bytes_used() + needed > self.quota_bytes:
+                return False
+            return shutil.disk_usage(self.root).free >= needed
+
+        if fits():
+            return
+        retained = sorted(self._retained(), key=lambda name: (self.root / name).stat().st_mtime)
+        for name in retained:
+            shutil.rmtree(self.root / name, ignore_errors=True)
+            logger.info(f"Workspace: evicted retained task directory {name}")
+            if fits():
+                return
+        raise WorkspaceFull(
+            f"Workspace full: {self.bytes_used()} bytes used of quota {self.quota_bytes}, "
+            f"{shutil.disk_usage(self.root).free} bytes free on disk, {needed} needed"
+        )
+
+    def sweep(self, legacy_min_age_seconds: float = 3600) -> int:
+        """
+        Remove leftovers of earlier runs (call before any task is opened)
+
+        Returns:
+            Number of files and directories removed
+        """
+        removed = 0
+        for root in (self.root, self.tmpfs_root):
+            if root is None or not root.exists():
+                continue
+            for path in root.iterdir():
+                if path.name in self._active or (path / RETAINED_MARKER).exists():
+                    continue
+                if path.is_dir():
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    path.unlink(missing_ok=True)
+                removed += 1
+
+        # Old flat layout: shared by every worker, so only files nobody can still be writing
+        cutoff = time.time() - legacy_min_age_seconds
+        for path in self.temp_dir.iterdir():
+            try:
+                if path.is_file() and LEGACY_PATTERN.match(path.name) and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+
+        WORKSPACE_BYTES.set(self.bytes_used())
+        return removed